@@ -85,12 +85,23 @@ function App() {
           setScreen('menu')
           setGameOver(false)
           break
-        case 'dialogue':
+        case 'dialogue': {
+          const partialId = `partial-${msg.data.speakerId}`
           setSnapshot((prev) => ({
             ...prev,
-            dialogues: [...prev.dialogues, msg.data],
+            dialogues: [...prev.dialogues.filter((d) => d.id !== partialId), msg.data],
           }))
           break
+        }
+        case 'dialogue_partial':
+          setSnapshot((prev) => {
+            const index = prev.dialogues.findIndex((d) => d.id === msg.data.id)
+            const dialogues = index < 0
+              ? [...prev.dialogues, msg.data]
+              : prev.dialogues.map((d, i) => (i === index ? msg.data : d))
+            return { ...prev, dialogues }
+          })
+          break
         case 'vote':
           setSnapshot((prev) => ({
             ...prev,
@@ -4,6 +4,7 @@ export type WsMessage =
   | { type: 'connected'; data: { message: string } }
   | { type: 'game_snapshot'; data: GameSnapshot }
   | { type: 'dialogue'; data: GameSnapshot['dialogues'][number] }
+  | { type: 'dialogue_partial'; data: GameSnapshot['dialogues'][number] }
   | { type: 'vote'; data: GameSnapshot['votes'][number] }
   | { type: 'game_over'; data: GameSnapshot & { winner: string } }
   | { type: 'log'; data: string }
@@ -66,8 +66,22 @@ class LiveGameEngine(GameEngine):
     # Log interceptor – builds dialogue / vote / event entries
     # ------------------------------------------------------------------
 
+    def _on_speech_partial(self, agent_id: int, text: str):
+        self._on_game_log("day", agent_id, "speech_partial", text)
+
     def _on_game_log(self, phase: str, agent_id: Optional[int], log_type: str, content: Any):
-        if log_type == "speech" and isinstance(content, str) and agent_id is not None:
+        if log_type == "speech_partial" and isinstance(content, str) and agent_id is not None:
+            # Streaming preview; replaced by the final "speech" entry, never accumulated
+            entry = {
+                "id": f"partial-{agent_id}",
+                "speakerId": agent_id,
+                "tone": DIALOGUE_TONE_MAP.get(phase, "public"),
+                "text": content,
+                "timestamp": f"Day {self.game_state.get('day', 1)} {datetime.now().strftime('%H:%M')}",
+            }
+            self._queue.put({"type": "dialogue_partial", "data": entry})
+
+        elif log_type == "speech" and isinstance(content, str) and agent_id is not None:
             tone = DIALOGUE_TONE_MAP.get(phase, "public")
             self._dialogue_seq += 1
             entry = {
@@ -476,14 +490,18 @@ class ConnectionManager:
         message_queue.put({"type": "game_reset", "data": {}})
 
     def _run_engine(self):
+        # stop_game 可能在对局进行中清空 self.engine，这里持有本局引擎以便结束时关闭
+        engine = self.engine
         try:
             message_queue.put({"type": "log", "data": "游戏引擎启动..."})
-            self.engine.run_game()
+            engine.run_game()
         except Exception as e:
             import traceback
             traceback.print_exc()
             message_queue.put({"type": "log", "data": f"引擎错误: {e}"})
         finally:
+            # 写出本局日志并停止写线程和事件循环，避免常驻后端每局泄漏线程
+            engine.close()
             self.game_running = False
 
 
@@ -1,8 +1,10 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 try:
+    from game_control import MemoryStore, MemoryView
     from rulebook import build_agent_system_prompt
 except ImportError:
+    from .game_control import MemoryStore, MemoryView
     from .rulebook import build_agent_system_prompt
 try:
     from loguru import logger
@@ -22,8 +24,9 @@ class WerewolfAgent:
         team: Agent所属阵营
         model_config: 模型配置字典
         prompt_template: 提示词模板
-        short_memory: 短期记忆列表
+        short_memory: 短期记忆，对局共享 MemoryStore 上的只读视图（MemoryView）
         prediction_memory: 预测/信念内存字典
+        memory_version: 记忆版本号，update_memory 或可见记忆增加后递增
         system_memory: 系统内存，存储固定信息
         game_engine_ref: 对游戏引擎的引用，用于获取游戏状态
     """
@@ -42,8 +45,10 @@ class WerewolfAgent:
         self.team = team
         self.model_config = model_config
         self.prompt_template = prompt_template
-        self.short_memory: List[str] = []
+        # 未接入对局时使用自己的存储，引擎初始化时通过 attach_memory_store 换成共享存储
+        self._short_memory = MemoryView(MemoryStore(), agent_id, role)
         self.prediction_memory: Dict[str, Any] = {}
+        self._memory_version = 0
         self.system_memory: Dict[str, Any] = {
             "role": role,
             "team": team,
@@ -57,6 +62,41 @@ class WerewolfAgent:
         )
         self.game_engine_ref = None
 
+    @property
+    def short_memory(self) -> MemoryView:
+        return self._short_memory
+
+    @short_memory.setter
+    def short_memory(self, items: List[str]):
+        # 兼容整体赋值：写入一个新的私有存储，换视图时递增本地版本
+        view = MemoryView(MemoryStore(), self.agent_id, self.role)
+        for item in items:
+            view.append(item)
+        self._short_memory = view
+        self._memory_version += 1
+
+    @property
+    def memory_version(self) -> Tuple[int, int]:
+        """
+        (本地版本, 记忆视图版本)：本地版本在更换视图或 update_memory 时递增，视图版本由共享存储
+        追加本 Agent 可见的记忆时推进；提示词中的记忆段落缓存据此失效
+        """
+        return self._memory_version, self._short_memory.version
+
+    def attach_memory_store(self, store: MemoryStore):
+        """
+        接入对局共享的记忆存储
+        """
+        self._short_memory = MemoryView(store, self.agent_id, self.role)
+        self._memory_version += 1
+
+    def close_memory(self):
+        """
+        出局时调用：记录记忆截止游标，此后写入的 alive_only 记忆对本 Agent 不可见
+        """
+        if self._short_memory.end is None:
+            self._short_memory.end = len(self._short_memory.store)
+
     def update_memory(self, settlement_info: Dict[str, Any], when: str):
         """
         系统在夜/日结算后调用，用来更新short_memory与prediction_memory
@@ -65,13 +105,14 @@ class WerewolfAgent:
             settlement_info: 结算信息
             when: "night" 或 "day"
         """
+        self._memory_version += 1
         try:
             # 更新短期记忆
             if "memory_updates" in settlement_info:
                 memory_updates = settlement_info["memory_updates"]
                 if "short_memory_add" in memory_updates:
                     for item in memory_updates["short_memory_add"]:
-                        self.short_memory.append(item)
+                        self._short_memory.append(item, when)
                 
                 # 更新预测区
                 if "prediction_adjust" in memory_updates:
@@ -103,7 +144,7 @@ class WerewolfAgent:
             "role": self.role,
             "team": self.team,
             "system_memory": self.system_memory,
-            "short_memory": self.short_memory,
+            "short_memory": list(self._short_memory),
             "prediction_memory": self.prediction_memory
         }
 
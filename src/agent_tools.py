@@ -1,8 +1,14 @@
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 import json
 import re
 
+try:
+    from prompt_builder import SectionCache, compact_json, estimate_tokens, join_json_fields
+except ImportError:
+    from .prompt_builder import SectionCache, compact_json, estimate_tokens, join_json_fields
+
 try:
     from loguru import logger
 except ImportError:
@@ -37,6 +43,19 @@ class ToolExecution:
     error: Optional[str] = None
 
 
+@dataclass(frozen=True)
+class ToolRequest:
+    agent: Any
+    intent: str
+    tools: List[ToolSpec]
+    prompt: str
+    model_tools: List[Dict[str, Any]]
+    eligible_targets: Optional[List[int]] = None
+    eligible_targets_by_tool: Optional[Dict[str, List[int]]] = None
+    prompt_tokens: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
 ALL_TOOL_SPECS: Dict[str, ToolSpec] = {
     "speak_public": ToolSpec(
         name="speak_public",
@@ -152,9 +171,86 @@ INTENT_INSTRUCTIONS: Dict[str, str] = {
 }
 
 
+PROMPT_HISTORY_WINDOWS = (8, 4, 2, 0)
+# 当天只追加的记忆段落最多增长到窗口的这么多倍，超过后重新从最近 window 条开始
+MEMORY_REANCHOR_FACTOR = 2
+
+# 已在“可见游戏状态”中给出的字段；extra_context 中取值相同的同名字段不再重复输出
+STATE_CONTEXT_KEYS = {"day", "alive_agents", "eliminated_agents", "werewolf_private_chat", "public_speeches"}
+EXTRA_CONTEXT_ALIASES = {"private_chat_history": "werewolf_private_chat"}
+
+PROMPT_RULES = """你必须通过本轮提供的工具完成行动，不要在普通文本里输出行动结果。
+
+要求：
+- 一次只能调用一个工具。发言也是工具调用，不允许在 tool_call 外输出发言。
+- 如果工具有 target，target 必须来自该工具自己的 eligible_targets。
+- 白天投票不能投自己；不要因为“第一天信息少”自动弃票，必须根据发言、身份收益、票型或风险选出最高嫌疑人。
+- 公开发言不能泄漏夜间私聊、队友、刀口、未公开查验/用药等不可见信息；狼人公开发言必须伪装好人。
+- speech/reason 使用简体中文，具体、有行动倾向；发言控制在 120 字以内，避免所有人重复同一句“信息不足”。"""
+
+TOOL_SCHEMA_CACHE_SIZE = 256
+
+
+def _tool_schema(tool: ToolSpec, target_pool: List[int]) -> Dict[str, Any]:
+    properties: Dict[str, Any] = {}
+    required: List[str] = []
+
+    if tool.action_type in {"speech", "private_chat"}:
+        properties["speech"] = {
+            "type": "string",
+            "description": f"{tool.parameters.get('speech', '发言内容')}。必须填写；只有本参数会被游戏系统采纳，普通 assistant content 会被忽略。",
+            "maxLength": 120,
+        }
+        required.append("speech")
+    if tool.requires_target:
+        properties["target"] = {
+            "type": "integer",
+            "description": f"{tool.parameters.get('target', '目标玩家编号')}；只能从 eligible_targets 中选择；普通 assistant content 中的目标不会执行",
+            "enum": target_pool,
+        }
+        required.append("target")
+    if "reason" in tool.parameters or tool.action_type not in {"speech", "private_chat"}:
+        properties["reason"] = {
+            "type": "string",
+            "description": f"{tool.parameters.get('reason', '行动理由')}。必须填写；只有本参数会被记录，普通 assistant content 会被忽略。",
+            "maxLength": 120,
+        }
+        if tool.action_type not in {"speech", "private_chat"}:
+            required.append("reason")
+
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": f"{tool.description} 必须调用此 MCP tool 才能完成该行为；不要把行动写在普通 assistant content。eligible_targets={target_pool}",
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": required,
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+@lru_cache(maxsize=TOOL_SCHEMA_CACHE_SIZE)
+def _cached_model_tools(
+    tool_names: Tuple[str, ...],
+    target_pools: Tuple[Tuple[int, ...], ...],
+) -> Tuple[Dict[str, Any], ...]:
+    return tuple(
+        _tool_schema(ALL_TOOL_SPECS[name], list(pool))
+        for name, pool in zip(tool_names, target_pools)
+    )
+
+
 class AgentToolRuntime:
-    def __init__(self, agents: List[Any]):
+    def __init__(self, agents: List[Any], token_budget: Optional[int] = None):
         self.agents = agents
+        self.token_budget = token_budget
+        self._sections = SectionCache()
+        # (agent_id, window) -> (day, 起始下标)：记忆段落在一天内从固定下标开始渲染，只追加不滑动
+        self._memory_starts: Dict[Tuple[int, int], Tuple[Any, int]] = {}
 
     def available_tools(
         self,
@@ -186,14 +282,53 @@ class AgentToolRuntime:
         extra_context: Optional[Dict[str, Any]] = None,
         eligible_targets_by_tool: Optional[Dict[str, List[int]]] = None,
     ) -> str:
-        extra_context = extra_context or {}
-        role_info = self._role_allocation_info()
-        teammates = self._werewolf_teammates(agent, game_state)
-        public_speeches = game_state.get("public_speeches", [])[-8:]
-        private_chat = game_state.get("werewolf_private_chat", [])[-8:]
-        short_memory = "\n".join(agent.short_memory[-8:]) if getattr(agent, "short_memory", None) else "无"
-        prediction_memory = json.dumps(getattr(agent, "prediction_memory", {}) or {}, ensure_ascii=False)
-        eligible_targets_by_tool = eligible_targets_by_tool or {}
+        """
+        组装本轮行动提示词
+
+        超出 token_budget 时依次缩短历史窗口（公开发言、狼人私聊、短期记忆），
+        最短窗口下仍超出预算时按最短窗口返回。发生裁剪时记录日志，便于排查模型看到的上下文变短。
+        短期记忆的起始下标按（Agent, 窗口）每天定下一次，同一窗口下当天的记忆段落只在末尾追加。
+        """
+        prompt = ""
+        tokens = 0
+        for window in PROMPT_HISTORY_WINDOWS:
+            prompt = self._assemble_prompt(
+                agent,
+                intent,
+                game_state,
+                tools,
+                eligible_targets or [],
+                extra_context or {},
+                eligible_targets_by_tool or {},
+                window,
+            )
+            if self.token_budget is None:
+                return prompt
+            tokens = estimate_tokens(prompt)
+            if tokens <= self.token_budget:
+                break
+        if window != PROMPT_HISTORY_WINDOWS[0]:
+            message = (
+                f"Prompt for agent {agent.agent_id} ({intent}) trimmed to history window {window}: "
+                f"~{tokens} tokens, budget {self.token_budget}"
+            )
+            if tokens > self.token_budget:
+                logger.warning(f"{message} (still over budget)")
+            else:
+                logger.info(message)
+        return prompt
+
+    def _assemble_prompt(
+        self,
+        agent: Any,
+        intent: str,
+        game_state: Dict[str, Any],
+        tools: List[ToolSpec],
+        eligible_targets: List[int],
+        extra_context: Dict[str, Any],
+        eligible_targets_by_tool: Dict[str, List[int]],
+        window: int,
+    ) -> str:
         engine_phase = str(game_state.get("phase") or "unknown")
         phase_context = {
             "day": game_state.get("day"),
@@ -202,100 +337,125 @@ class AgentToolRuntime:
             "current_task": intent,
             "current_task_label": INTENT_PHASE_LABELS.get(intent, intent),
             "must_call_one_of": [tool.name for tool in tools],
-            "eligible_targets": eligible_targets or [],
-            "eligible_targets_by_tool": eligible_targets_by_tool,
+            "eligible_targets": eligible_targets,
         }
-        context_payload = {
-            "day": game_state.get("day"),
-            "phase": engine_phase,
-            "phase_label": PHASE_LABELS.get(engine_phase, engine_phase),
-            "current_task": INTENT_PHASE_LABELS.get(intent, intent),
-            "alive_agents": game_state.get("alive_agents", []),
-            "eliminated_agents": game_state.get("eliminated_agents", []),
-            "eligible_targets": eligible_targets or [],
-            "role_allocation": role_info,
-            "known_werewolf_teammates": teammates,
-            "public_speeches": public_speeches,
-            "werewolf_private_chat": private_chat if agent.role == "werewolf" else [],
-            "extra": extra_context,
+        # 与 eligible_targets 相同的按工具目标池不再重复输出
+        targets_by_tool = {
+            name: targets for name, targets in eligible_targets_by_tool.items()
+            if list(targets) != list(eligible_targets)
         }
+        if targets_by_tool:
+            phase_context["eligible_targets_by_tool"] = targets_by_tool
+
+        # 整局不变的字段在前，按天追加的发言记录其次，随时变化的存活/出局名单最后
+        state_fields = [
+            ("role_allocation", self._sections.get(
+                ("role_allocation",), len(self.agents), lambda: compact_json(self._role_allocation_info())
+            )),
+            ("known_werewolf_teammates", compact_json(self._werewolf_teammates(agent, game_state))),
+            ("public_speeches", self._history_section("public_speeches", game_state, window)),
+            ("werewolf_private_chat",
+             self._history_section("werewolf_private_chat", game_state, window) if agent.role == "werewolf" else "[]"),
+            ("alive_agents", compact_json(game_state.get("alive_agents", []))),
+            ("eliminated_agents", compact_json(game_state.get("eliminated_agents", []))),
+        ]
+        extra = self._dedupe_extra_context(extra_context, game_state)
+        if extra:
+            state_fields.append(("extra", compact_json(extra)))
+
+        day = game_state.get("day")
+        memory_version = getattr(agent, "memory_version", None)
+        memory_section = self._sections.get(
+            ("memory", agent.agent_id, window),
+            (memory_version, day),
+            lambda: self._memory_section(agent, window, day),
+        )
+        prediction_memory = compact_json(getattr(agent, "prediction_memory", {}) or {})
+        # 缓存友好的顺序：固定说明在前，当天只追加的记忆其次，易变的任务、信念、阶段与状态最后，
+        # 让服务商的提示词前缀缓存在同一 Agent 的相邻回合之间尽量命中
         return f"""
 你是狼人杀游戏中的 Agent {agent.agent_id}，身份 {agent.role}，阵营 {agent.team}。固定规则已在 system prompt 中给出。
 
-当前阶段注入：
-{json.dumps(phase_context, ensure_ascii=False, indent=2)}
+{PROMPT_RULES}
 
-当前任务：{INTENT_INSTRUCTIONS.get(intent, intent)}
+{memory_section}
 
-可见游戏状态：
-{json.dumps(context_payload, ensure_ascii=False, indent=2)}
-
-你的短期记忆：
-{short_memory}
+当前任务：{INTENT_INSTRUCTIONS.get(intent, intent)}
 
 你的预测/信念：
 {prediction_memory}
 
-你必须通过本轮提供的工具完成行动，不要在普通文本里输出行动结果。
+当前阶段注入：
+{compact_json(phase_context)}
 
-要求：
-- 一次只能调用一个工具。发言也是工具调用，不允许在 tool_call 外输出发言。
-- 如果工具有 target，target 必须来自该工具自己的 eligible_targets。
-- 白天投票不能投自己；不要因为“第一天信息少”自动弃票，必须根据发言、身份收益、票型或风险选出最高嫌疑人。
-- 公开发言不能泄漏夜间私聊、队友、刀口、未公开查验/用药等不可见信息；狼人公开发言必须伪装好人。
-- speech/reason 使用简体中文，具体、有行动倾向；发言控制在 120 字以内，避免所有人重复同一句“信息不足”。
+可见游戏状态：
+{join_json_fields(state_fields)}
 """.strip()
 
+    def _history_section(self, key: str, game_state: Dict[str, Any], window: int) -> str:
+        history = game_state.get(key, [])
+        # 公开发言和私聊只会追加，或在新的一天/一夜整体替换为新列表
+        return self._sections.get(
+            (key, window),
+            (id(history), len(history), game_state.get("day")),
+            lambda: compact_json(history[-window:] if window else []),
+        )
+
+    def _memory_section(self, agent: Any, window: int, day: Any) -> str:
+        """
+        渲染短期记忆：每天第一次渲染时定下起始下标（当时最近 window 条），之后只在末尾追加，
+        记忆段落在相邻回合之间只增长，前缀缓存保持命中；新的一天重新定下起始下标。
+        为了让窗口仍能限制提示词长度，段落超过 MEMORY_REANCHOR_FACTOR × window 条时
+        重新定下起始下标为最近 window 条，因此任何时候最多渲染 MEMORY_REANCHOR_FACTOR × window 条
+        """
+        short_memory = getattr(agent, "short_memory", None) or []
+        if not window:
+            recent: List[str] = []
+        else:
+            key = (agent.agent_id, window)
+            cached = self._memory_starts.get(key)
+            length = len(short_memory)
+            if (
+                cached is None
+                or cached[0] != day
+                or cached[1] > length
+                or length - cached[1] > MEMORY_REANCHOR_FACTOR * window
+            ):
+                cached = (day, max(0, length - window))
+                self._memory_starts[key] = cached
+            recent = list(short_memory[cached[1]:])
+        return f"""你的短期记忆：
+{chr(10).join(recent) if recent else "无"}"""
+
+    def _dedupe_extra_context(self, extra_context: Dict[str, Any], game_state: Dict[str, Any]) -> Dict[str, Any]:
+        deduped = {}
+        for key, value in extra_context.items():
+            state_key = EXTRA_CONTEXT_ALIASES.get(key, key)
+            if state_key in STATE_CONTEXT_KEYS and game_state.get(state_key) == value:
+                continue
+            deduped[key] = value
+        return deduped
+
     def to_model_tools(
         self,
         tools: List[ToolSpec],
         eligible_targets: Optional[List[int]] = None,
         eligible_targets_by_tool: Optional[Dict[str, List[int]]] = None,
     ) -> List[Dict[str, Any]]:
+        """
+        生成 OpenAI 兼容的 tools schema
+
+        标准工具按（工具名, 目标池）缓存，同一局里重复的阶段直接复用已生成的 schema；
+        返回的 schema 字典在调用之间共享，调用方不应修改。
+        """
         eligible_targets_by_tool = eligible_targets_by_tool or {}
-        model_tools: List[Dict[str, Any]] = []
-        for tool in tools:
-            properties: Dict[str, Any] = {}
-            required: List[str] = []
-            target_pool = eligible_targets_by_tool.get(tool.name, eligible_targets or [])
-
-            if tool.action_type in {"speech", "private_chat"}:
-                properties["speech"] = {
-                    "type": "string",
-                    "description": f"{tool.parameters.get('speech', '发言内容')}。必须填写；只有本参数会被游戏系统采纳，普通 assistant content 会被忽略。",
-                    "maxLength": 120,
-                }
-                required.append("speech")
-            if tool.requires_target:
-                properties["target"] = {
-                    "type": "integer",
-                    "description": f"{tool.parameters.get('target', '目标玩家编号')}；只能从 eligible_targets 中选择；普通 assistant content 中的目标不会执行",
-                    "enum": target_pool,
-                }
-                required.append("target")
-            if "reason" in tool.parameters or tool.action_type not in {"speech", "private_chat"}:
-                properties["reason"] = {
-                    "type": "string",
-                    "description": f"{tool.parameters.get('reason', '行动理由')}。必须填写；只有本参数会被记录，普通 assistant content 会被忽略。",
-                    "maxLength": 120,
-                }
-                if tool.action_type not in {"speech", "private_chat"}:
-                    required.append("reason")
-
-            model_tools.append({
-                "type": "function",
-                "function": {
-                    "name": tool.name,
-                    "description": f"{tool.description} 必须调用此 MCP tool 才能完成该行为；不要把行动写在普通 assistant content。eligible_targets={target_pool}",
-                    "parameters": {
-                        "type": "object",
-                        "properties": properties,
-                        "required": required,
-                        "additionalProperties": False,
-                    },
-                },
-            })
-        return model_tools
+        target_pools = tuple(
+            tuple(eligible_targets_by_tool.get(tool.name, eligible_targets or []))
+            for tool in tools
+        )
+        if all(ALL_TOOL_SPECS.get(tool.name) is tool for tool in tools):
+            return list(_cached_model_tools(tuple(tool.name for tool in tools), target_pools))
+        return [_tool_schema(tool, list(pool)) for tool, pool in zip(tools, target_pools)]
 
     def execute(
         self,
@@ -0,0 +1,387 @@
+"""
+对局日志离线分析：从日志目录读取每局结束时写入的 game_summary 事件，整理成列式表
+（games / agents / votes / actions），计算 模型 × 角色 胜率、存活率、投票准确率和模型 Elo 分
+
+每局只读取日志末尾的汇总事件：事件日志按索引直接读取 end 分段，文本日志只读取文件尾部，
+上万局的目录也只需要数秒；workers > 1 时在进程池中并行读取
+
+用法:
+    python -m src.analytics logs/batch_20250101_120000 --workers 8 --csv-dir logs/analytics
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+# 源码模块之间使用无前缀导入（from agent import ...），需要把 src 加入路径
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from event_log import EventLogReader
+
+
+GAME_COLUMNS = ("game_id", "seed", "winner", "days", "players", "log_file")
+AGENT_COLUMNS = ("game_id", "agent_id", "role", "team", "model", "survived", "won")
+VOTE_COLUMNS = (
+    "game_id", "day", "kind", "voter", "voter_role", "voter_team", "voter_model",
+    "target", "target_role", "target_team", "correct",
+)
+ACTION_COLUMNS = ("game_id", "day", "phase", "agent_id", "model", "type", "target")
+# 行动类型 -> 投票种类；abstain 只出现在白天投票
+VOTE_ACTION_KINDS = {"vote": "day_elimination", "abstain": "day_elimination", "night_kill": "werewolf_kill"}
+SUMMARY_KEY = "game_summary"
+# 文本日志每次从尾部多读取的字节数
+TAIL_CHUNK_BYTES = 64 * 1024
+DEFAULT_ELO = 1500.0
+DEFAULT_ELO_K = 32.0
+
+
+class Table:
+    """
+    列式表：每列一个列表，行按追加顺序对齐
+
+    Attributes:
+        columns: {列名: 值列表}
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.columns: Dict[str, List[Any]] = {name: [] for name in names}
+
+    def append(self, row: Dict[str, Any]) -> None:
+        for name, values in self.columns.items():
+            values.append(row.get(name))
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), []))
+
+    def __getitem__(self, name: str) -> List[Any]:
+        return self.columns[name]
+
+    def extend(self, other: "Table") -> None:
+        for name, values in self.columns.items():
+            values.extend(other.columns[name])
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        names = list(self.columns)
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, values))
+
+    def to_csv(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            writer.writerows(zip(*self.columns.values()))
+
+
+@dataclass
+class GameTables:
+    """
+    一批对局的列式表
+
+    Attributes:
+        games: 每局一行
+        agents: 每局每个 Agent 一行
+        votes: 每张白天放逐票 / 狼人击杀票一行（弃票的 target 为 None）
+        actions: 每个行动一行
+    """
+
+    games: Table = field(default_factory=lambda: Table(GAME_COLUMNS))
+    agents: Table = field(default_factory=lambda: Table(AGENT_COLUMNS))
+    votes: Table = field(default_factory=lambda: Table(VOTE_COLUMNS))
+    actions: Table = field(default_factory=lambda: Table(ACTION_COLUMNS))
+
+    def add_game(self, summary: Dict[str, Any]) -> None:
+        """
+        追加一局的 game_summary
+        """
+        game_id = summary.get("game_id")
+        winner = summary.get("winner")
+        agents = {agent["agent_id"]: agent for agent in summary.get("agents", [])}
+        self.games.append({**summary, "players": len(agents)})
+        for agent in agents.values():
+            self.agents.append({
+                **agent,
+                "game_id": game_id,
+                "won": None if winner in (None, "draw") else agent.get("team") == winner,
+            })
+        for action in summary.get("actions", []):
+            actor = agents.get(action.get("agent_id"), {})
+            self.actions.append({**action, "game_id": game_id, "model": actor.get("model")})
+            kind = VOTE_ACTION_KINDS.get(action.get("type"))
+            if kind is None:
+                continue
+            target = agents.get(action.get("target"), {})
+            self.votes.append({
+                "game_id": game_id,
+                "day": action.get("day"),
+                "kind": kind,
+                "voter": action.get("agent_id"),
+                "voter_role": actor.get("role"),
+                "voter_team": actor.get("team"),
+                "voter_model": actor.get("model"),
+                "target": action.get("target"),
+                "target_role": target.get("role"),
+                "target_team": target.get("team"),
+                # 投给对方阵营视为正确；弃票为 None
+                "correct": None if not target else target.get("team") != actor.get("team"),
+            })
+
+    def extend(self, other: "GameTables") -> None:
+        for name in ("games", "agents", "votes", "actions"):
+            getattr(self, name).extend(getattr(other, name))
+
+    @classmethod
+    def from_summaries(cls, summaries: Iterable[Optional[Dict[str, Any]]]) -> "GameTables":
+        """
+        由 game_summary 构建列式表，跳过 None（没有汇总的日志）
+        """
+        tables = cls()
+        for summary in summaries:
+            if summary is not None:
+                tables.add_game(summary)
+        return tables
+
+    def to_csv(self, directory: str) -> None:
+        """
+        每张表写成 directory 下的 {表名}.csv
+        """
+        for name in ("games", "agents", "votes", "actions"):
+            getattr(self, name).to_csv(os.path.join(directory, f"{name}.csv"))
+
+
+def find_game_logs(directory: str) -> List[str]:
+    """
+    列出目录下每局一个日志文件：优先事件日志（.events.jsonl / .events.zst），
+    没有事件日志的对局使用文本日志（.log）
+
+    Returns:
+        按文件名排序的日志路径
+    """
+    games: Dict[str, str] = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith((".events.jsonl", ".events.zst")):
+            games[name.rsplit(".events.", 1)[0]] = path
+        elif name.endswith(".log"):
+            games.setdefault(name[:-len(".log")], path)
+    return [games[stem] for stem in sorted(games)]
+
+
+def read_game_summary(path: str) -> Optional[Dict[str, Any]]:
+    """
+    读取一局日志中的 game_summary 事件；对局未正常结束（没有汇总）时返回 None
+    """
+    if ".events." in os.path.basename(path):
+        summary = _summary_from_event_log(path)
+    else:
+        summary = _summary_from_text_log(path)
+    if summary is not None:
+        summary.setdefault("log_file", path)
+    return summary
+
+
+def _summary_content(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    content = entry.get("content")
+    if isinstance(content, dict) and SUMMARY_KEY in content:
+        return content[SUMMARY_KEY]
+    return None
+
+
+def _summary_from_event_log(path: str) -> Optional[Dict[str, Any]]:
+    reader = EventLogReader(path)
+    if reader.sections is None:
+        records = list(reader.records())
+    else:
+        end_days = [section.day for section in reader.sections if section.phase == "end"]
+        records = reader.read(end_days[-1], phase="end") if end_days else []
+    for entry in reversed(records):
+        summary = _summary_content(entry)
+        if summary is not None:
+            return summary
+    return None
+
+
+def _summary_from_text_log(path: str) -> Optional[Dict[str, Any]]:
+    marker = f'"{SUMMARY_KEY}"'.encode("utf-8")
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        read = 0
+        while read < size:
+            # 汇总在日志末尾附近，逐步向前扩大读取范围
+            read = min(size, read + TAIL_CHUNK_BYTES)
+            f.seek(size - read)
+            tail = f.read(read)
+            position = tail.rfind(marker)
+            if position < 0:
+                continue
+            start = tail.rfind(b"\n", 0, position) + 1
+            if start == 0 and read < size:
+                continue
+            end = tail.find(b"\n", position)
+            line = tail[start:end if end >= 0 else len(tail)].decode("utf-8")
+            # loguru 文本格式为 "时间 | 级别 | 位置 - {json}"
+            entry = json.loads(line[line.index("{"):])
+            return _summary_content(entry)
+    return None
+
+
+def _load_chunk(paths: Sequence[str]) -> GameTables:
+    return GameTables.from_summaries(read_game_summary(path) for path in paths)
+
+
+def load_tables(directory: str, workers: int = 1, chunk_size: int = 500) -> GameTables:
+    """
+    读取日志目录并整理成列式表；没有汇总（未正常结束）的对局被跳过
+
+    Args:
+        directory: 日志目录
+        workers: 进程数，大于 1 时每个进程读取一批日志并构建该批的列式表，主进程只按列拼接
+        chunk_size: 每个任务包含的日志数
+
+    Returns:
+        列式表，对局按日志文件名排序
+    """
+    paths = find_game_logs(directory)
+    if workers <= 1 or len(paths) <= chunk_size:
+        return _load_chunk(paths)
+    tables = GameTables()
+    chunks = [paths[start:start + chunk_size] for start in range(0, len(paths), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_tables in pool.map(_load_chunk, chunks):
+            tables.extend(chunk_tables)
+    return tables
+
+
+def win_rates(tables: GameTables, group_by: Sequence[str] = ("model", "role")) -> Dict[str, Dict[str, float]]:
+    """
+    按 Agent 表字段分组统计胜率与存活率
+
+    Args:
+        tables: 列式表
+        group_by: AGENT_COLUMNS 中的字段，多个字段的取值以 "/" 连接作为键
+
+    Returns:
+        {分组键: {"games", "wins", "draws", "win_rate", "survival_rate"}}，win_rate 以非平局对局为分母
+    """
+    groups: Dict[str, Dict[str, float]] = {}
+    columns = [tables.agents[name] for name in group_by]
+    for index, (won, survived) in enumerate(zip(tables.agents["won"], tables.agents["survived"])):
+        key = "/".join(str(column[index]) for column in columns) or "total"
+        totals = groups.setdefault(key, {"games": 0, "wins": 0, "draws": 0, "survived": 0})
+        totals["games"] += 1
+        totals["wins"] += bool(won)
+        totals["draws"] += won is None
+        totals["survived"] += bool(survived)
+    for totals in groups.values():
+        decided = totals["games"] - totals["draws"]
+        totals["win_rate"] = round(totals["wins"] / decided, 4) if decided else 0.0
+        totals["survival_rate"] = round(totals.pop("survived") / totals["games"], 4)
+    return groups
+
+
+def vote_accuracy(tables: GameTables, group_by: Sequence[str] = ("voter_model", "voter_team"),
+                  kind: Optional[str] = "day_elimination") -> Dict[str, Dict[str, float]]:
+    """
+    投票准确率：投给对方阵营的票数 / 有效票数
+
+    Args:
+        tables: 列式表
+        group_by: VOTE_COLUMNS 中的字段
+        kind: 只统计该种投票，None 表示全部
+
+    Returns:
+        {分组键: {"votes", "abstains", "correct", "accuracy"}}
+    """
+    groups: Dict[str, Dict[str, float]] = {}
+    columns = [tables.votes[name] for name in group_by]
+    for index, (vote_kind, correct) in enumerate(zip(tables.votes["kind"], tables.votes["correct"])):
+        if kind is not None and vote_kind != kind:
+            continue
+        key = "/".join(str(column[index]) for column in columns) or "total"
+        totals = groups.setdefault(key, {"votes": 0, "abstains": 0, "correct": 0})
+        totals["votes"] += 1
+        totals["abstains"] += correct is None
+        totals["correct"] += bool(correct)
+    for totals in groups.values():
+        cast = totals["votes"] - totals["abstains"]
+        totals["accuracy"] = round(totals["correct"] / cast, 4) if cast else 0.0
+    return groups
+
+
+def elo_ratings(tables: GameTables, k: float = DEFAULT_ELO_K, initial: float = DEFAULT_ELO) -> Dict[str, float]:
+    """
+    按对局在表中的顺序计算模型 Elo 分：每局视为狼人阵营与好人阵营的对战，阵营分为阵营内 Agent 所用模型分数的均值，
+    每个 Agent 按 K * (实际 - 期望) / 阵营人数 更新其模型的分数；平局记 0.5
+
+    Returns:
+        {模型: Elo 分}
+    """
+    ratings = {model: initial for model in tables.agents["model"]}
+    teams, models = tables.agents["team"], tables.agents["model"]
+    start = 0
+    # Agent 表按对局顺序追加，每局占 players 行
+    for winner, players in zip(tables.games["winner"], tables.games["players"]):
+        rows = range(start, start + players)
+        start += players
+        wolves = [models[row] for row in rows if teams[row] == "werewolves"]
+        villagers = [models[row] for row in rows if teams[row] == "villagers"]
+        if not wolves or not villagers or winner is None:
+            continue
+        wolf_rating = sum(ratings[model] for model in wolves) / len(wolves)
+        villager_rating = sum(ratings[model] for model in villagers) / len(villagers)
+        expected = 1.0 / (1.0 + 10 ** ((villager_rating - wolf_rating) / 400))
+        score = {"werewolves": 1.0, "villagers": 0.0}.get(winner, 0.5)
+        deltas: Dict[str, float] = {}
+        for side, delta in ((wolves, score - expected), (villagers, expected - score)):
+            for model in side:
+                deltas[model] = deltas.get(model, 0.0) + k * delta / len(side)
+        for model, delta in deltas.items():
+            ratings[model] += delta
+    return {model: round(rating, 2) for model, rating in sorted(ratings.items(), key=lambda item: -item[1])}
+
+
+def analyze(tables: GameTables) -> Dict[str, Any]:
+    """
+    汇总报告：对局数、胜方分布、模型 × 角色胜率、模型存活率、投票准确率和 Elo 分
+    """
+    winners: Dict[str, int] = {}
+    for winner in tables.games["winner"]:
+        winners[str(winner)] = winners.get(str(winner), 0) + 1
+    return {
+        "games": len(tables.games),
+        "winners": winners,
+        "win_rate_by_model_role": win_rates(tables, ("model", "role")),
+        "win_rate_by_model": win_rates(tables, ("model",)),
+        "vote_accuracy": vote_accuracy(tables),
+        "elo": elo_ratings(tables),
+    }
+
+
+def main():
+    """
+    离线分析入口
+    """
+    parser = argparse.ArgumentParser(description='Multi-Agent 狼人杀 对局日志分析')
+    parser.add_argument('log_dir', type=str, help='日志目录（如 batch 的输出目录）')
+    parser.add_argument('--workers', type=int, default=1, help='并行读取日志的进程数')
+    parser.add_argument('--csv-dir', type=str, default=None, help='导出 games/agents/votes/actions 列式表的目录')
+
+    args = parser.parse_args()
+
+    tables = load_tables(args.log_dir, workers=max(1, args.workers))
+    if args.csv_dir:
+        tables.to_csv(args.csv_dir)
+    print(json.dumps(analyze(tables), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+同步游戏引擎共用的后台 asyncio 事件循环
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Optional
+
+
+class EventLoopThread:
+    """
+    在守护线程中常驻的 asyncio 事件循环。
+
+    引擎本身是同步代码；需要并发等待多个 LLM 请求时，把协程提交到这里，
+    所有在途请求共享同一个事件循环和同一批异步 HTTP 连接。
+    """
+
+    def __init__(self, name: str = "maws-engine-loop"):
+        self._loop = asyncio.new_event_loop()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def submit(self, coro: Awaitable[Any]) -> Future:
+        if self._closed:
+            raise RuntimeError("Event loop thread is closed")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        return self.submit(coro).result(timeout=timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+        pending = [task for task in asyncio.all_tasks(self._loop) if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self._loop.close()
@@ -0,0 +1,237 @@
+"""
+批量无头对局运行器
+
+在进程池中并行运行多局独立的 GameEngine，每局有自己的日志文件和 MCP 工具客户端，
+每局结果写入同一个 JSONL 结果文件，各局的模型用量明细汇总到 usage.jsonl / usage.csv。
+输出目录中已有上一批次的结果时默认拒绝运行，指定 --overwrite 则先清理旧输出。
+
+用法:
+    python -m src.batch --config config.yaml --games 500 --workers 16
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# 源码模块之间使用无前缀导入（from agent import ...），需要把 src 加入路径
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+BATCH_OUTPUT_FILES = ("results.jsonl", "usage.jsonl", "usage.csv")
+
+
+def _existing_outputs(output_dir: str) -> List[str]:
+    """
+    列出输出目录中属于批次运行的旧文件（结果、用量明细以及每局日志）
+    """
+    if not os.path.isdir(output_dir):
+        return []
+    return sorted(
+        os.path.join(output_dir, name)
+        for name in os.listdir(output_dir)
+        if name in BATCH_OUTPUT_FILES or name.startswith("game_")
+    )
+
+
+def _prepare_output_dir(output_dir: str, overwrite: bool):
+    """
+    准备输出目录：对局编号每批都从 00000 开始，旧输出会与新结果混在一起，
+    因此目录非空时默认拒绝运行，overwrite 为 True 时删除旧输出
+
+    Raises:
+        FileExistsError: 目录中已有批次输出且未指定 overwrite
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    existing = _existing_outputs(output_dir)
+    if existing and not overwrite:
+        raise FileExistsError(
+            f"Output directory {output_dir} already contains batch outputs "
+            f"({len(existing)} files, e.g. {os.path.basename(existing[0])}); use --overwrite to replace them"
+        )
+    for path in existing:
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def _failed_result(game_id: str, seed: Optional[int], log_dir: str, exc: BaseException) -> Dict[str, Any]:
+    """
+    工作进程异常退出（如 BrokenProcessPool）时拿不到对局结果，构造一行错误记录
+    """
+    return {
+        "game_id": game_id,
+        "seed": seed,
+        "log_file": os.path.join(log_dir, f"game_{game_id}.log"),
+        "winner": None,
+        "error": f"{type(exc).__name__}: {exc}",
+        "traceback": "".join(traceback.format_exception(type(exc), exc, exc.__traceback__)),
+        "duration_s": None,
+    }
+
+
+def _init_worker(quiet: bool):
+    """
+    工作进程初始化：静默模式下关闭控制台输出，只保留每局的日志文件
+    """
+    if not quiet:
+        return
+    try:
+        from loguru import logger
+        logger.remove()
+    except ImportError:
+        pass
+    sys.stdout = open(os.devnull, "w", encoding="utf-8")
+
+
+def run_single_game(config_path: str, game_id: str, seed: Optional[int], log_dir: str) -> Dict[str, Any]:
+    """
+    在当前进程中运行一局完整游戏
+
+    Args:
+        config_path: 配置文件路径
+        game_id: 对局编号
+        seed: 随机种子
+        log_dir: 日志目录
+
+    Returns:
+        对局结果字典
+    """
+    from game_engine import GameEngine
+
+    started = time.perf_counter()
+    log_file = os.path.join(log_dir, f"game_{game_id}.log")
+    result: Dict[str, Any] = {"game_id": game_id, "seed": seed, "log_file": log_file}
+    engine = None
+    try:
+        engine = GameEngine(config_path, game_id=game_id, seed=seed, log_file=log_file)
+        winner = engine.run_game()
+        result.update({
+            "winner": winner,
+            "days": engine.game_state["day"],
+            "alive_agents": list(engine.game_state["alive_agents"]),
+            "agents": [
+                {"id": agent.agent_id, "role": agent.role, "team": agent.team, "model": model_name}
+                for agent, model_name in zip(engine.agents, engine.model_list)
+            ],
+            "usage": engine.ledger.totals(),
+            "usage_records": engine.ledger.to_dicts(),
+            "error": None,
+        })
+    except Exception as exc:
+        result.update({"winner": None, "error": f"{type(exc).__name__}: {exc}", "traceback": traceback.format_exc()})
+    finally:
+        if engine is not None:
+            engine.close()
+    result["duration_s"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_batch(config_path: str, games: int, workers: int, output_dir: str,
+              base_seed: Optional[int] = None, quiet: bool = True, overwrite: bool = False) -> Dict[str, Any]:
+    """
+    并行运行多局游戏并写出结果文件
+
+    Args:
+        config_path: 配置文件路径
+        games: 对局数量
+        workers: 进程数
+        output_dir: 日志与结果输出目录
+        base_seed: 基础随机种子，第 i 局使用 base_seed + i
+        quiet: 是否关闭工作进程的控制台输出
+        overwrite: 输出目录已有批次输出时是否删除后重跑
+
+    Returns:
+        批次汇总信息
+
+    Raises:
+        FileExistsError: 输出目录已有批次输出且未指定 overwrite
+    """
+    from ledger import UsageLedger
+
+    _prepare_output_dir(output_dir, overwrite)
+    results_path = os.path.join(output_dir, "results.jsonl")
+    usage_path = os.path.join(output_dir, "usage.jsonl")
+    ledger = UsageLedger()
+    winners: Dict[str, int] = {}
+    failed = 0
+    started = time.perf_counter()
+
+    with open(results_path, "w", encoding="utf-8") as results_file, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(quiet,),
+    ) as pool:
+        futures = {}
+        for index in range(games):
+            game_id = f"{index:05d}"
+            seed = None if base_seed is None else base_seed + index
+            futures[pool.submit(run_single_game, config_path, game_id, seed, output_dir)] = (game_id, seed)
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                result = future.result()
+            except Exception as exc:
+                result = _failed_result(*futures[future], output_dir, exc)
+            game_ledger = UsageLedger.from_dicts(result.pop("usage_records", []))
+            game_ledger.to_jsonl(usage_path, append=True)
+            ledger.extend(game_ledger.records)
+            results_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            results_file.flush()
+            if result.get("error"):
+                failed += 1
+            else:
+                winner = str(result.get("winner"))
+                winners[winner] = winners.get(winner, 0) + 1
+            print(f"[{done}/{games}] game {result['game_id']}: "
+                  f"{result.get('winner') or result.get('error')} ({result['duration_s']}s)", flush=True)
+
+    elapsed = time.perf_counter() - started
+    ledger.to_csv(os.path.join(output_dir, "usage.csv"))
+    return {
+        "games": games,
+        "failed": failed,
+        "winners": winners,
+        "elapsed_s": round(elapsed, 3),
+        "games_per_sec": round(games / elapsed, 4) if elapsed > 0 else None,
+        "results_file": results_path,
+        "usage": ledger.summary(("model",)),
+        "usage_file": usage_path,
+    }
+
+
+def main():
+    """
+    批量运行入口
+    """
+    parser = argparse.ArgumentParser(description='Multi-Agent 狼人杀 批量对局')
+    parser.add_argument('--config', type=str, default='config.yaml', help='配置文件路径')
+    parser.add_argument('--games', type=int, default=10, help='对局数量')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='并行进程数')
+    parser.add_argument('--output-dir', type=str, default=None, help='日志与结果输出目录，默认 logs/batch_{timestamp}')
+    parser.add_argument('--seed', type=int, default=None, help='基础随机种子，第 i 局使用 seed + i')
+    parser.add_argument('--verbose', action='store_true', help='保留工作进程的控制台输出')
+    parser.add_argument('--overwrite', action='store_true', help='输出目录已有批次输出时删除后重跑')
+
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or os.path.join("logs", f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    summary = run_batch(
+        config_path=os.path.abspath(args.config),
+        games=args.games,
+        workers=max(1, args.workers),
+        output_dir=output_dir,
+        base_seed=args.seed,
+        quiet=not args.verbose,
+        overwrite=args.overwrite,
+    )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+模型原始响应的调试输出：默认关闭，开启后按比例采样，由后台线程写成紧凑的 JSONL
+
+适配器配置示例：
+    debug:
+      enabled: true
+      sample_rate: 0.1                          # 采样比例，1 表示全部记录
+      path: logs/debug/{adapter}.jsonl          # 支持 {adapter} 占位符；"-" 表示标准输出
+"""
+
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+from typing import Any, Dict, Optional
+
+
+DEFAULT_DEBUG_PATH = "logs/debug/tool_responses.jsonl"
+DEFAULT_QUEUE_SIZE = 10000
+# 写线程每次最多合并写入的记录数
+WRITE_BATCH_SIZE = 256
+
+
+class DebugSink:
+    """
+    后台写线程：调用方只做一次非阻塞入队，序列化和文件 I/O 都在写线程完成；
+    队列满时丢弃新记录并计数，不阻塞模型调用
+
+    Attributes:
+        path: 输出文件路径，"-" 表示标准输出
+        dropped: 因队列已满被丢弃的记录数
+    """
+
+    def __init__(self, path: str, max_queue: int = DEFAULT_QUEUE_SIZE):
+        self.path = path
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def write(self, record: Dict[str, Any]) -> None:
+        try:
+            self._ensure_writer().put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        等待已入队的记录全部写出
+        """
+        pending = self._queue if self._pid == os.getpid() else None
+        if pending is None:
+            return
+        done = threading.Event()
+        try:
+            pending.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                return
+            pending, thread = self._queue, self._thread
+            self._queue = self._thread = None
+        pending.put(None)
+        thread.join(timeout)
+
+    def _ensure_writer(self) -> queue.Queue:
+        # 写线程不会跟随 fork，子进程首次写入时重新启动
+        if self._pid == os.getpid() and self._queue is not None:
+            return self._queue
+        with self._lock:
+            if self._pid != os.getpid() or self._queue is None:
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,), name="debug-sink", daemon=True
+                )
+                self._pid = os.getpid()
+                self._thread.start()
+            return self._queue
+
+    def _run(self, pending: queue.Queue) -> None:
+        if self.path == "-":
+            stream, owned = sys.stdout, False
+        else:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            stream, owned = open(self.path, "a", encoding="utf-8"), True
+        try:
+            while True:
+                batch = [pending.get()]
+                while len(batch) < WRITE_BATCH_SIZE:
+                    try:
+                        batch.append(pending.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = False
+                for item in batch:
+                    if item is None:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        stream.flush()
+                        item.set()
+                    else:
+                        stream.write(json.dumps(item, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+                stream.flush()
+                if stop:
+                    return
+        finally:
+            if owned:
+                stream.close()
+
+
+class DebugChannel:
+    """
+    单个适配器的调试输出：采样判断在构造记录之前完成，未采中的调用不做任何序列化
+
+    Attributes:
+        sink: 共享的 DebugSink
+        sample_rate: 采样比例（0-1）
+    """
+
+    def __init__(self, sink: DebugSink, sample_rate: float = 1.0):
+        self.sink = sink
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        # 独立的随机源：采样不能消耗全局 random，否则带种子的对局不可复现
+        self._random = random.Random()
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or self._random.random() < self.sample_rate
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        self.sink.write(record)
+
+
+_SINKS: Dict[str, DebugSink] = {}
+_SINKS_LOCK = threading.Lock()
+
+
+def open_debug_channel(debug_config: Optional[Dict[str, Any]], adapter_name: Optional[str] = None,
+                       base_dir: str = "") -> Optional[DebugChannel]:
+    """
+    按适配器的 debug 配置打开调试输出；未配置或 enabled 为 false 时返回 None。
+    同一路径在进程内共享一个写线程
+
+    Args:
+        debug_config: {"enabled": ..., "sample_rate": ..., "path": ...}
+        adapter_name: 适配器名称，用于填充路径中的 {adapter}
+        base_dir: 相对路径的基准目录，与响应缓存一致，通常是配置文件所在目录
+    """
+    if not debug_config or not debug_config.get("enabled", True):
+        return None
+    sample_rate = debug_config.get("sample_rate", 1.0)
+    if not sample_rate:
+        return None
+    path = str(debug_config.get("path") or DEFAULT_DEBUG_PATH).format(adapter=adapter_name or "default")
+    if path != "-":
+        path = os.path.abspath(os.path.join(base_dir, path))
+    with _SINKS_LOCK:
+        sink = _SINKS.get(path)
+        if sink is None:
+            sink = DebugSink(path, max_queue=int(debug_config.get("max_queue", DEFAULT_QUEUE_SIZE)))
+            _SINKS[path] = sink
+    return DebugChannel(sink, sample_rate)
+
+
+def close_debug_sinks() -> None:
+    """
+    写出并关闭所有调试输出，进程退出时自动调用
+    """
+    with _SINKS_LOCK:
+        sinks = list(_SINKS.values())
+    for sink in sinks:
+        sink.close()
+
+
+atexit.register(close_debug_sinks)
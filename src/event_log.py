@@ -0,0 +1,186 @@
+"""
+结构化对局事件日志：JSONL 记录按对局分段（如 "第 3 天投票"），可选每段一个 zstd 帧，
+旁边的索引文件记录每段的天数、阶段和字节偏移，回放时直接跳到目标分段而不扫描整个文件
+
+文件布局：
+    game_x.events.jsonl / game_x.events.zst   事件记录，每行一个 JSON 对象
+    game_x.events.jsonl.idx.json              分段索引
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+EVENT_LOG_COMPRESSIONS = ("none", "zstd")
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 1
+
+
+@dataclass
+class EventSection:
+    """
+    事件日志中的一个分段
+
+    Attributes:
+        day: 游戏天数（初始化阶段为 0）
+        phase: 引擎阶段（init / night / day / end）
+        section: 阶段内的分段名（night、speech、vote 等）
+        offset: 分段在事件文件中的起始字节偏移
+        length: 分段的字节长度（压缩时为压缩后的帧长度）
+        records: 分段内的记录数
+    """
+
+    day: int
+    phase: str
+    section: str
+    offset: int = 0
+    length: int = 0
+    records: int = 0
+
+
+def event_log_path(log_file_path: str, compression: str = "none") -> str:
+    """
+    由文本日志路径推出事件日志路径：game_x.log -> game_x.events.jsonl（zstd 时为 .events.zst）
+    """
+    root, _ = os.path.splitext(log_file_path)
+    return root + (".events.zst" if compression == "zstd" else ".events.jsonl")
+
+
+class EventLogWriter:
+    """
+    按分段写事件日志；不是线程安全的，由 GameLogger 的写线程独占使用
+
+    Attributes:
+        path: 事件文件路径
+        compression: none 或 zstd
+        sections: 已开始的分段
+    """
+
+    def __init__(self, path: str, compression: str = "none"):
+        if compression not in EVENT_LOG_COMPRESSIONS:
+            raise ValueError(f"Unsupported event log compression: {compression}; expected one of {EVENT_LOG_COMPRESSIONS}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd event logs require the zstandard package: pip install zstandard")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.compression = compression
+        self.sections: List[EventSection] = []
+        self._file = open(path, "wb")
+        self._pending: List[bytes] = []
+        self._compressor = zstandard.ZstdCompressor() if compression == "zstd" else None
+        self.mark(0, "init", "init")
+
+    def mark(self, day: int, phase: str, section: str) -> None:
+        """
+        结束当前分段并开始新的分段；当前分段为空时直接改名复用
+        """
+        if self.sections and self.sections[-1].records == 0:
+            current = self.sections[-1]
+            current.day, current.phase, current.section = day, phase, section
+            return
+        self._finish_section()
+        self.sections.append(EventSection(day=day, phase=phase, section=section, offset=self._file.tell()))
+
+    def write(self, line: str) -> None:
+        """
+        写入一条已序列化的 JSON 记录（不含换行）
+        """
+        data = line.encode("utf-8") + b"\n"
+        if self._compressor is None:
+            self._file.write(data)
+        else:
+            self._pending.append(data)
+        self.sections[-1].records += 1
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._finish_section()
+        self._file.close()
+        index = {
+            "version": INDEX_VERSION,
+            "compression": self.compression,
+            "sections": [asdict(section) for section in self.sections if section.records],
+        }
+        with open(self.path + INDEX_SUFFIX, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+
+    def _finish_section(self) -> None:
+        if not self.sections:
+            return
+        current = self.sections[-1]
+        if self._compressor is not None and self._pending:
+            # 每个分段压缩成独立的 zstd 帧，读取时可以单独解压
+            self._file.write(self._compressor.compress(b"".join(self._pending)))
+            self._pending = []
+        current.length = self._file.tell() - current.offset
+
+
+class EventLogReader:
+    """
+    读取事件日志；有索引时按分段随机访问，没有索引（如进程异常退出）时退化为顺序扫描
+
+    用法:
+        reader = EventLogReader("logs/game_x.events.jsonl")
+        votes = reader.read(day=3, section="vote")
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.compression = "zstd" if path.endswith(".zst") else "none"
+        self.sections: Optional[List[EventSection]] = None
+        index_path = path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            self.compression = index.get("compression", self.compression)
+            self.sections = [EventSection(**section) for section in index["sections"]]
+
+    def find(self, day: int, section: Optional[str] = None, phase: Optional[str] = None) -> List[EventSection]:
+        """
+        查找匹配的分段；section / phase 为 None 时不按该字段过滤
+        """
+        if self.sections is None:
+            raise ValueError(f"Event log {self.path} has no index; use records() to scan it")
+        return [
+            item for item in self.sections
+            if item.day == day
+            and (section is None or item.section == section)
+            and (phase is None or item.phase == phase)
+        ]
+
+    def read(self, day: int, section: Optional[str] = None, phase: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        读取匹配分段内的全部记录；只读取并解压这些分段
+        """
+        records: List[Dict[str, Any]] = []
+        with open(self.path, "rb") as f:
+            for item in self.find(day, section, phase):
+                f.seek(item.offset)
+                records.extend(self._decode(f.read(item.length)))
+        return records
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """
+        顺序读取全部记录
+        """
+        with open(self.path, "rb") as f:
+            data = f.read()
+        yield from self._decode(data)
+
+    def _decode(self, data: bytes) -> List[Dict[str, Any]]:
+        if self.compression == "zstd":
+            if zstandard is None:
+                raise ImportError("reading zstd event logs requires the zstandard package: pip install zstandard")
+            reader = zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True)
+            data = reader.read()
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
@@ -1,6 +1,8 @@
+import threading
+from collections.abc import Sequence
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Union
 
 
 class VoteKind(str, Enum):
@@ -141,6 +143,84 @@ class VoteSession:
         )
 
 
+class AgentRegistry:
+    """
+    Agent 索引：id -> Agent、角色 -> id 列表（按座位加入顺序）和存活集合，
+    按 id 查找、按角色筛选存活 Agent 都不需要遍历全部 Agent
+
+    淘汰必须经过 eliminate()，引擎用 GameEngine._eliminate 同时更新 game_state 中的名单；
+    各角色的存活人数随淘汰增量维护，胜负判定不需要重新统计
+    """
+
+    def __init__(self, agents: Iterable[Any] = (), alive: Optional[Iterable[int]] = None):
+        self._by_id: Dict[int, Any] = {}
+        self._by_role: Dict[str, List[int]] = {}
+        self._alive_by_role: Dict[str, int] = {}
+        self.alive: Set[int] = set()
+        for agent in agents:
+            self.add(agent)
+        if alive is not None:
+            self.alive = set(alive) & set(self._by_id)
+            self._alive_by_role = {
+                role: sum(agent_id in self.alive for agent_id in ids) for role, ids in self._by_role.items()
+            }
+
+    def add(self, agent: Any, alive: bool = True) -> None:
+        self._by_id[agent.agent_id] = agent
+        self._by_role.setdefault(agent.role, []).append(agent.agent_id)
+        if alive:
+            self.alive.add(agent.agent_id)
+            self._alive_by_role[agent.role] = self._alive_by_role.get(agent.role, 0) + 1
+
+    def get(self, agent_id: Optional[int]) -> Optional[Any]:
+        return self._by_id.get(agent_id)
+
+    def __getitem__(self, agent_id: int) -> Any:
+        return self._by_id[agent_id]
+
+    def __contains__(self, agent_id: int) -> bool:
+        return agent_id in self._by_id
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def ids(self) -> List[int]:
+        return list(self._by_id)
+
+    def is_alive(self, agent_id: Optional[int]) -> bool:
+        return agent_id in self.alive
+
+    def role_of(self, agent_id: Optional[int]) -> Optional[str]:
+        agent = self._by_id.get(agent_id)
+        return agent.role if agent is not None else None
+
+    def alive_count(self, role: Optional[str] = None) -> int:
+        """
+        存活人数；指定 role 时只计该角色
+        """
+        return len(self.alive) if role is None else self._alive_by_role.get(role, 0)
+
+    def ids_with_role(self, role: str, alive_only: bool = True) -> List[int]:
+        ids = self._by_role.get(role, [])
+        return [agent_id for agent_id in ids if agent_id in self.alive] if alive_only else list(ids)
+
+    def with_role(self, role: str, alive_only: bool = True) -> List[Any]:
+        return [self._by_id[agent_id] for agent_id in self.ids_with_role(role, alive_only)]
+
+    def eliminate(self, agent_id: Optional[int]) -> bool:
+        """
+        标记淘汰，返回该 Agent 此前是否存活
+        """
+        if agent_id not in self.alive:
+            return False
+        self.alive.discard(agent_id)
+        self._alive_by_role[self._by_id[agent_id].role] -= 1
+        return True
+
+
 @dataclass(frozen=True)
 class MemoryEvent:
     phase: str
@@ -150,10 +230,147 @@ class MemoryEvent:
     recipients: Optional[List[int]] = None
 
 
+@dataclass(frozen=True)
+class MemoryEntry:
+    phase: str
+    text: str
+    visibility: Visibility
+    recipients: Optional[FrozenSet[int]] = None
+    # 为 True 时只对写入时存活的 Agent 可见（写入位置在其记忆截止游标之前）
+    alive_only: bool = True
+
+    def visible_to(self, agent_id: int, role: str) -> bool:
+        if self.visibility == Visibility.PUBLIC:
+            return True
+        if self.visibility == Visibility.WEREWOLF:
+            return role == "werewolf"
+        return agent_id in (self.recipients or ())
+
+
+class MemoryStore:
+    """
+    对局共享的只追加记忆存储：每条记忆只保存一次并附带可见范围，
+    各 Agent 通过 MemoryView（游标 + 可见性过滤）读取，不再各自复制一份文本。
+    version 为已追加的条数，引擎可能从多个线程追加，写入和计数在锁内完成
+    """
+
+    def __init__(self):
+        self.entries: List[MemoryEntry] = []
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.version
+
+    def append(self, phase: str, text: str, visibility: Visibility,
+               recipients: Optional[Iterable[int]] = None, alive_only: bool = True) -> int:
+        """
+        追加一条记忆，返回其位置
+        """
+        entry = MemoryEntry(
+            phase=phase,
+            text=text,
+            visibility=visibility,
+            recipients=frozenset(recipients) if recipients is not None else None,
+            alive_only=alive_only,
+        )
+        with self._lock:
+            self.entries.append(entry)
+            self.version += 1
+            return self.version - 1
+
+
+class MemoryView(Sequence):
+    """
+    单个 Agent 的短期记忆视图：按可见性过滤 MemoryStore，支持 len、下标和切片。
+    end 为记忆截止游标（Agent 出局时的存储长度），之后的 alive_only 记忆对其不可见；
+    可见记忆在存储中的位置增量记录，下标和切片直接映射到位置列表，不必重新扫描整个存储。
+    version 为最后一条可见记忆之后的存储版本，只有本 Agent 可见的记忆增加时才变化
+
+    Attributes:
+        store: 共享的 MemoryStore
+        agent_id: Agent 编号
+        role: Agent 角色，用于狼人可见性
+        end: 记忆截止游标，存活时为 None
+    """
+
+    def __init__(self, store: MemoryStore, agent_id: int, role: str):
+        self.store = store
+        self.agent_id = agent_id
+        self.role = role
+        self.end: Optional[int] = None
+        self._scanned = 0
+        # 可见记忆在 store.entries 中的位置，按追加顺序
+        self._visible_positions: List[int] = []
+        self._version = 0
+
+    def _visible(self, position: int) -> bool:
+        entry = self.store.entries[position]
+        if entry.alive_only and self.end is not None and position >= self.end:
+            return False
+        return entry.visible_to(self.agent_id, self.role)
+
+    def _sync(self) -> List[int]:
+        # 只检查上次之后新追加的记忆
+        total = self.store.version
+        for position in range(self._scanned, total):
+            if self._visible(position):
+                self._visible_positions.append(position)
+                self._version = position + 1
+        self._scanned = total
+        return self._visible_positions
+
+    @property
+    def version(self) -> int:
+        self._sync()
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self._sync())
+
+    def __iter__(self) -> Iterator[str]:
+        entries = self.store.entries
+        return (entries[position].text for position in list(self._sync()))
+
+    def __reversed__(self) -> Iterator[str]:
+        entries = self.store.entries
+        return (entries[position].text for position in reversed(list(self._sync())))
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        positions = self._sync()
+        entries = self.store.entries
+        if isinstance(index, slice):
+            return [entries[position].text for position in positions[index]]
+        try:
+            return entries[positions[index]].text
+        except IndexError:
+            raise IndexError("memory index out of range") from None
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (list, tuple, MemoryView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MemoryView(agent_id={self.agent_id}, {list(self)!r})"
+
+    def append(self, text: str, phase: str = "") -> None:
+        """
+        追加一条只对本 Agent 可见的记忆；直接写给本 Agent，出局后也可见
+        """
+        self.store.append(phase, text, Visibility.PRIVATE, recipients=[self.agent_id], alive_only=False)
+
+
 class MemoryInjector:
-    def __init__(self, agents: Iterable[Any], game_state: Dict[str, Any]):
-        self.agents = list(agents)
+    def __init__(self, agents: Iterable[Any], game_state: Dict[str, Any], store: Optional[MemoryStore] = None):
+        # 引擎传入自己的 AgentRegistry；其他调用方传 Agent 列表时按 game_state 的存活名单建立索引
+        if isinstance(agents, AgentRegistry):
+            self.registry = agents
+        else:
+            self.registry = AgentRegistry(agents, alive=game_state.get("alive_agents", []))
         self.game_state = game_state
+        # 传入共享存储时每个事件只写入一次，否则逐个调用收件人的 update_memory
+        self.store = store
 
     def inject(self, event: MemoryEvent, alive_only: bool = True) -> List[int]:
         recipients = self._resolve_recipients(event, alive_only)
@@ -161,28 +378,35 @@ class MemoryInjector:
             return []
 
         memory_text = self._format_memory(event)
+        if self.store is not None:
+            self.store.append(
+                event.phase,
+                memory_text,
+                event.visibility,
+                recipients=recipients if event.visibility == Visibility.PRIVATE else None,
+                alive_only=alive_only,
+            )
+            return recipients
         memory_update_info = {
             "memory_updates": {
                 "short_memory_add": [memory_text],
                 "prediction_adjust": [],
             }
         }
-        for agent in self.agents:
-            if agent.agent_id in recipients:
-                agent.update_memory(memory_update_info, event.phase)
+        for agent_id in recipients:
+            self.registry[agent_id].update_memory(memory_update_info, event.phase)
         return recipients
 
     def _resolve_recipients(self, event: MemoryEvent, alive_only: bool) -> List[int]:
-        alive = set(self.game_state.get("alive_agents", []))
         if event.visibility == Visibility.PUBLIC:
-            candidates = [agent.agent_id for agent in self.agents]
+            candidates = self.registry.alive if alive_only else self.registry.ids()
         elif event.visibility == Visibility.WEREWOLF:
-            candidates = [agent.agent_id for agent in self.agents if agent.role == "werewolf"]
+            candidates = self.registry.ids_with_role("werewolf", alive_only)
         else:
-            candidates = list(event.recipients or [])
-
-        if alive_only:
-            candidates = [agent_id for agent_id in candidates if agent_id in alive]
+            candidates = [
+                agent_id for agent_id in event.recipients or []
+                if agent_id in self.registry and (not alive_only or self.registry.is_alive(agent_id))
+            ]
         return sorted(set(candidates))
 
     def _format_memory(self, event: MemoryEvent) -> str:
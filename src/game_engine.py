@@ -1,12 +1,25 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from agent import WerewolfAgent
-from agent_tools import AgentToolRuntime, ToolCall, ToolExecution
-from mcp_tools import MCPToolClient
-from game_control import MemoryEvent, MemoryInjector, TiePolicy, Visibility, VoteKind, VoteSession
+from async_runtime import EventLoopThread
+from agent_tools import AgentToolRuntime, ToolCall, ToolExecution, ToolRequest
+from prompt_builder import estimate_tokens
+from hedging import HedgeBudget
+from ledger import UsageLedger
+from response_cache import open_response_cache
+from retry import PhaseBudget
+from mcp_tools import create_tool_client
+from game_control import (
+    AgentRegistry, MemoryEvent, MemoryInjector, MemoryStore, TiePolicy, Visibility, VoteKind, VoteSession,
+)
 from logger import GameLogger
+from metrics import PerfRecorder
 from utils import load_config, assign_roles
+from models_adapter import aclose_http_clients
+from concurrent.futures import Future
+import asyncio
 import random
 import os
+import time
 try:
     from loguru import logger
 except ImportError:
@@ -15,23 +28,44 @@ except ImportError:
     logger = logging.getLogger(__name__)
 
 
+# 以流式回调逐段推送发言文本的工具调用意图
+STREAMED_SPEECH_INTENTS = ("day_speech",)
+
+
 class GameEngine:
     """
     狼人杀游戏引擎
     """
 
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, game_id: Optional[str] = None, seed: Optional[int] = None,
+                 log_file: Optional[str] = None, tool_transport: Optional[str] = None):
         """
         初始化游戏引擎
         
         Args:
             config_path: 配置文件路径
+            game_id: 对局编号（可选），用于日志文件名和批量结果
+            seed: 随机种子（可选），未指定时读取 game.seed，仍为空则不固定
+            log_file: 日志文件路径模式（可选），覆盖 game.logging.file
+            tool_transport: 工具执行方式（可选），覆盖 game.tool_transport；
+                "inprocess" 在本进程直接执行，"stdio" 通过独立的 FastMCP 子进程执行
         """
         self.config = load_config(config_path)
+        self.game_id = game_id
+        self.seed = seed if seed is not None else self.config["game"].get("seed")
+        if self.seed is not None:
+            random.seed(self.seed)
         # 设置project_root属性
         self.project_root = os.path.dirname(os.path.abspath(config_path))
         print(f"Project root: {self.project_root}")
         self.agents: List[WerewolfAgent] = []
+        # id / 角色 / 存活状态索引，初始化对局时建立，淘汰经由 _eliminate 更新
+        self.registry = AgentRegistry()
+        # 对局共享的只追加记忆存储，各 Agent 的 short_memory 是其上的视图
+        self.memory_store = MemoryStore()
+        # 单条行动提示词的 token 预算；超出时缩短历史窗口，未配置时不裁剪
+        self.prompt_token_budget = (self.config.get("prompt") or {}).get("token_budget")
+        self.tool_runtime = AgentToolRuntime(self.agents, token_budget=self.prompt_token_budget)
         self.game_state: Dict[str, Any] = {
             "day": 0,
             "phase": "init",
@@ -41,6 +75,7 @@ class GameEngine:
             "public_speeches": [],  # 公共交流列表
             "werewolf_private_chat": [],  # 狼人私聊记录
             "vote_history": [],  # 历史投票决议
+            "action_history": [],  # 行动记录（天数、阶段、行动者、类型、目标），用于对局汇总
             "current_speaker": None,  # 当前发言人
             "speaking_order": [],  # 发言顺序
             "last_night_result": None,  # 昨晚结果
@@ -49,12 +84,51 @@ class GameEngine:
         }
         
         # 初始化日志记录器
-        log_pattern = self.config["game"].get("logging", {}).get("file", "logs/game_{timestamp}.log")
-        self.logger = GameLogger(log_pattern)
+        logging_config = self.config["game"].get("logging", {}) or {}
+        log_pattern = log_file or logging_config.get("file", "logs/game_{timestamp}.log")
+        self.logger = GameLogger(
+            log_pattern,
+            game_id=game_id,
+            queue_size=logging_config.get("queue_size", 10000),
+            backpressure=logging_config.get("backpressure", "block"),
+            text=logging_config.get("text", True),
+            events=logging_config.get("events", True),
+            events_compression=logging_config.get("events_compression", "none"),
+        )
+
+        # 耗时统计：提示词构建、模型调用、MCP 往返、日志，以及每个 intent 的端到端工具调用
+        self.metrics = PerfRecorder()
+        self.logger.metrics = self.metrics
         
-        self.tool_mcp_client = MCPToolClient()
+        transport = tool_transport or self.config["game"].get("tool_transport", "inprocess")
+        self.tool_mcp_client = create_tool_client(transport)
+
+        # 同一轮互不依赖的模型请求（如白天投票）并发发出时的最大在途请求数；<=1 时退化为逐个调用
+        # 达到该天数仍未分出胜负则判为平局
+        self.max_days = self.config["game"].get("max_days", 30)
+        concurrency_config = self.config["game"].get("concurrency", {}) or {}
+        self.max_parallel_calls = int(concurrency_config.get("max_parallel_calls", 8))
+        # 白天发言的推测预取：上一位发言的请求在途时，提前为下一位构建提示词骨架并预热连接
+        self.speculative_prefetch = bool(concurrency_config.get("speculative_prefetch", False))
+        self._event_loop: Optional[EventLoopThread] = None
+
+        # 每个日/夜阶段内所有模型调用共享的时间预算（秒）；用完后剩余调用直接走兜底，未配置时不限
+        self.phase_budget_s = self.config["game"].get("phase_budget_s")
+        self.phase_budget = PhaseBudget()
+
+        # 对冲请求（适配器配置 hedge 段）每局最多发出的次数
+        hedging_config = self.config["game"].get("hedging", {}) or {}
+        self.hedge_budget = HedgeBudget(hedging_config.get("max_hedges_per_game", 20))
+        self._hedge_backups: Dict[str, Any] = {}
+
+        # 逐次记录模型调用的 token 用量、延迟和费用；设置 game.logging.usage_file 时在对局结束后导出
+        self.ledger = UsageLedger()
+        self.usage_file = (self.config["game"].get("logging") or {}).get("usage_file")
+
+        # 模型响应缓存（models.cache）：record / replay / read-through，同一进程内按路径共享
+        self.response_cache = open_response_cache(self.config["models"].get("cache"), base_dir=self.project_root)
         
-        # 注意：不再在初始化时设置固定的随机种子，让每次运行都有不同的随机分布
+        # 注意：未配置 seed 时不固定随机种子，让每次运行都有不同的随机分布
 
     def initialize_game(self):
         """
@@ -81,6 +155,10 @@ class GameEngine:
                     "poison_used": False,
                 }
         
+        self.registry = AgentRegistry(self.agents)
+        for agent in self.agents:
+            agent.attach_memory_store(self.memory_store)
+        self.tool_runtime = AgentToolRuntime(self.agents, token_budget=self.prompt_token_budget)
         self.logger.log_system("init", f"Created {len(self.agents)} agents")
         
         # 记录初始状态
@@ -104,9 +182,10 @@ class GameEngine:
         class RealAgent(WerewolfAgent):
             def __init__(self, agent_id: int, role: str, team: str, 
                          model_config: Dict[str, Any], prompt_template: str,
-                         role_allocation: Dict[str, int]):
+                         role_allocation: Dict[str, int], adapter_name: Optional[str] = None,
+                         base_dir: str = ""):
                 super().__init__(agent_id, role, team, model_config, prompt_template, role_allocation=role_allocation)
-                self.model_adapter = ModelsAdapter(model_config)
+                self.model_adapter = ModelsAdapter(model_config, name=adapter_name, base_dir=base_dir)
         
         # 获取模型配置
         # 根据agent_id选择模型，实现每个模型2个Agent
@@ -125,8 +204,14 @@ class GameEngine:
             team=agent_info["team"],
             model_config=model_config,
             prompt_template="",
-            role_allocation=role_allocation
+            role_allocation=role_allocation,
+            adapter_name=selected_model,
+            base_dir=self.project_root,
         )
+        self._attach_adapter(agent.model_adapter)
+        hedge_policy = agent.model_adapter.hedge_policy
+        if hedge_policy is not None and hedge_policy.backup:
+            agent.model_adapter.hedge_backup = self._hedge_backup(hedge_policy.backup)
         
         # 为agent添加config属性和project_root
         agent.config = self.config
@@ -136,20 +221,80 @@ class GameEngine:
         agent.game_engine_ref = self
         return agent,selected_model
 
+    def _attach_adapter(self, adapter):
+        """
+        把本局的统计与预算对象注入模型适配器
+        """
+        adapter.metrics = self.metrics
+        adapter.phase_budget = self.phase_budget
+        adapter.hedge_budget = self.hedge_budget
+        adapter.response_cache = self.response_cache
+        adapter.reset_cache_occurrences()
+        # 同步对冲调用复用本局的后台事件循环（按需创建），不另起进程级事件循环线程
+        adapter.event_loop_provider = self._get_event_loop
+
+    def _hedge_backup(self, adapter_name: str):
+        """
+        取出（按需创建）对冲用的备用适配器，同一局内按名称复用
+        """
+        from models_adapter import ModelsAdapter
+
+        backup = self._hedge_backups.get(adapter_name)
+        if backup is None:
+            backup = ModelsAdapter(
+                self.config["models"]["adapters"][adapter_name], name=adapter_name, base_dir=self.project_root
+            )
+            self._attach_adapter(backup)
+            self._hedge_backups[adapter_name] = backup
+        return backup
+
     def run_night_phase(self):
         """
         执行夜间阶段
+
+        夜间行动按依赖关系调度：预言家查验只依赖存活名单，在狼人私聊和击杀投票期间
+        就提前发出模型请求；女巫需要狼人刀口，等狼人投票结算后再行动。
+        各角色的行动结果仍按 狼人 -> 预言家 -> 女巫 的顺序记录和结算。
+
+        注意：这里的调度是针对预言家写死的，并不是通用的依赖图；新增夜间角色
+        默认仍按顺序执行，需要提前发出请求时须在此处单独处理。
         """
         self.game_state["day"] += 1
         self.game_state["phase"] = "night"
+        self.logger.mark_section(self.game_state["day"], "night", "night")
+        self.phase_budget.start("night", self.phase_budget_s)
         self.logger.log_system("night", f"Starting night {self.game_state['day']}")
         
         # 清空狼人私聊记录
         self.game_state["werewolf_private_chat"] = []
+
+        # 预言家：输入已就绪，模型请求与狼人讨论并行
+        seers = self.registry.with_role("seer")
+        seer_requests = [
+            self._prepare_tool_request(
+                seer,
+                intent="seer_night",
+                eligible_targets=[agent_id for agent_id in self.game_state["alive_agents"] if agent_id != seer.agent_id],
+            )
+            for seer in seers
+        ]
+        pending_seer_calls = self._start_model_tool_calls(seer_requests)
+
+        werewolf_actions = self._run_werewolf_actions()
+        seer_actions = self._settle_seer_actions(
+            seer_requests,
+            self._collect_model_tool_calls(seer_requests, pending_seer_calls),
+        )
+        witch_actions = self._run_witch_actions(werewolf_actions)
         
-        # 按顺序执行各角色夜间行动
-        # 1. 狼人
-        werewolves = [agent for agent in self.agents if agent.role == "werewolf" and agent.agent_id in self.game_state["alive_agents"]]
+        # 夜间结算
+        self._settle_night(werewolf_actions, seer_actions, witch_actions)
+
+    def _run_werewolf_actions(self) -> List[Dict[str, Any]]:
+        """
+        狼人私聊与击杀投票，返回结算后的狼人行动列表
+        """
+        werewolves = self.registry.with_role("werewolf")
         
         # 狼人内部讨论
         if len(werewolves) > 1:
@@ -196,7 +341,7 @@ class GameEngine:
             werewolf_ids = [agent.agent_id for agent in werewolves]
             werewolf_target_ids = [
                 agent_id for agent_id in self.game_state["alive_agents"]
-                if agent_id not in werewolf_ids
+                if self.registry.role_of(agent_id) != "werewolf"
             ]
             decision_context["eligible_targets"] = werewolf_target_ids
             vote_session = VoteSession(
@@ -208,8 +353,11 @@ class GameEngine:
             )
 
             for werewolf in werewolves:
-                # Retry up to 3 times if the tool call returns an invalid target
+                # Re-prompt up to 3 times if the model picks an invalid target.
+                # Transport errors are retried inside the adapter; this loop only
+                # covers bad answers and stops early once the night budget is spent.
                 execution = None
+                valid_target = False
                 for attempt in range(3):
                     execution = self._call_agent_tool(
                         werewolf,
@@ -220,17 +368,20 @@ class GameEngine:
                     action = execution.action
                     target = action.get("target") if action.get("type") == "night_kill" else None
                     if target is not None and target in vote_session.eligible_targets:
+                        valid_target = True
                         break
                     self.logger.log(
                         "night", werewolf.agent_id, "system",
                         f"werewolf_kill retry {attempt + 1}/3: invalid target={target}"
                     )
-                else:
-                    # All 3 retries failed — pick a random eligible target
+                    if self.phase_budget.expired:
+                        break
+                if not valid_target:
+                    # Retries exhausted or out of time — pick a random eligible target
                     fallback = random.choice(vote_session.eligible_targets)
                     self.logger.log(
                         "night", werewolf.agent_id, "system",
-                        f"werewolf_kill fallback after 3 retries: random target={fallback}"
+                        f"werewolf_kill fallback after {attempt + 1} attempt(s): random target={fallback}"
                     )
                     execution = ToolExecution(
                         tool_name="vote_werewolf_kill",
@@ -247,7 +398,7 @@ class GameEngine:
                     vote_session.cast(werewolf.agent_id, target, action.get("explain", "werewolf_kill"))
 
                 werewolf_actions.append(action)
-                self.logger.log_agent_action("night", werewolf.agent_id, action)
+                self._log_agent_action("night", werewolf.agent_id, action)
 
             wolf_resolution = vote_session.resolve()
             self.game_state["current_voting"] = {
@@ -264,23 +415,28 @@ class GameEngine:
             else:
                 werewolf_actions = []
 
-        # 2. 预言家
-        seers = [agent for agent in self.agents if agent.role == "seer" and agent.agent_id in self.game_state["alive_agents"]]
+        return werewolf_actions
+
+    def _settle_seer_actions(self, seer_requests: List[ToolRequest],
+                             model_tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        执行预言家的查验工具调用并记录投票决议
+        
+        Args:
+            seer_requests: 预言家的工具请求
+            model_tool_calls: 与请求一一对应的模型返回
+        """
         seer_actions = []
-        for seer in seers:
-            eligible_targets = [agent_id for agent_id in self.game_state["alive_agents"] if agent_id != seer.agent_id]
+        for request, model_tool_call in zip(seer_requests, model_tool_calls):
+            seer = request.agent
             vote_session = VoteSession(
                 kind=VoteKind.SEER_CHECK,
                 eligible_voters=[seer.agent_id],
-                eligible_targets=eligible_targets,
+                eligible_targets=request.eligible_targets,
                 tie_policy=TiePolicy.SEAT_ORDER,
                 allow_abstain=True,
             )
-            execution = self._call_agent_tool(
-                seer,
-                intent="seer_night",
-                eligible_targets=eligible_targets,
-            )
+            execution = self._complete_tool_call(request, model_tool_call)
             action = execution.action
             target = action.get("target") if action.get("type") == "seer_check" else None
             if vote_session.cast(seer.agent_id, target, action.get("explain", "seer_check")) and target is not None:
@@ -291,11 +447,18 @@ class GameEngine:
                 seer_actions.append(action)
             resolution = vote_session.resolve()
             self.game_state["vote_history"].append(resolution.to_dict())
-            self.logger.log_agent_action("night", seer.agent_id, action)
+            self._log_agent_action("night", seer.agent_id, action)
             self.logger.log_system("night", {"seer_vote_resolution": resolution.to_dict()})
+        return seer_actions
+
+    def _run_witch_actions(self, werewolf_actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        女巫行动：依赖狼人最终刀口
         
-        # 3. 女巫
-        witches = [agent for agent in self.agents if agent.role == "witch" and agent.agent_id in self.game_state["alive_agents"]]
+        Args:
+            werewolf_actions: 狼人结算后的行动列表
+        """
+        witches = self.registry.with_role("witch")
         witch_actions = []
         wolf_kill_targets = [
             a["target"] for a in werewolf_actions
@@ -353,7 +516,8 @@ class GameEngine:
             )
             target = action.get("target") if action_type in {"witch_save", "witch_poison"} else None
             if target is not None:
-                action["actor"] = witch.agent_id
+                # execution.action 已写入工具调用日志，这里另建字典，不修改已记录的内容
+                action = {**action, "actor": witch.agent_id}
             if vote_session.cast(witch.agent_id, target, action.get("explain", action_type or "none")) and target is not None:
                 witch_actions.append(action)
             else:
@@ -362,11 +526,10 @@ class GameEngine:
                 witch_actions.append(action)
             resolution = vote_session.resolve()
             self.game_state["vote_history"].append(resolution.to_dict())
-            self.logger.log_agent_action("night", witch.agent_id, action)
+            self._log_agent_action("night", witch.agent_id, action)
             self.logger.log_system("night", {"witch_vote_resolution": resolution.to_dict()})
-        
-        # 夜间结算
-        self._settle_night(werewolf_actions, seer_actions, witch_actions)
+
+        return witch_actions
 
     def _settle_night(self, werewolf_actions: List[Dict[str, Any]], 
                       seer_actions: List[Dict[str, Any]] = None, 
@@ -392,7 +555,7 @@ class GameEngine:
         if seer_actions:
             for action in seer_actions:
                 if action["type"] == "seer_check" and action["target"] is not None:
-                    target_agent = next((a for a in self.agents if a.agent_id == action["target"]), None)
+                    target_agent = self.registry.get(action["target"])
                     if target_agent:
                         seer_check_result = {
                             "target": action["target"],
@@ -429,16 +592,12 @@ class GameEngine:
             self.logger.log_system("night", f"Witch saved player {witch_save_target}")
         
         # 狼人击杀
-        if final_wolf_target is not None and final_wolf_target in self.game_state["alive_agents"]:
-            self.game_state["alive_agents"].remove(final_wolf_target)
-            self.game_state["eliminated_agents"].append(final_wolf_target)
+        if self._eliminate(final_wolf_target):
             eliminated_players.append(final_wolf_target)
             self.logger.log_system("night", f"Agent {final_wolf_target} was eliminated at night")
         
         # 女巫毒人
-        if witch_poison_target is not None and witch_poison_target in self.game_state["alive_agents"]:
-            self.game_state["alive_agents"].remove(witch_poison_target)
-            self.game_state["eliminated_agents"].append(witch_poison_target)
+        if self._eliminate(witch_poison_target):
             eliminated_players.append(witch_poison_target)
             if witch_poison_actor is not None:
                 self.game_state.setdefault("witch_resources", {}).setdefault(
@@ -450,8 +609,8 @@ class GameEngine:
         # Hunter last shot: any eliminated hunter can shoot before night ends
         hunter_shot_targets = []
         for elim_id in list(eliminated_players):
-            hunter = next((a for a in self.agents if a.agent_id == elim_id and a.role == "hunter"), None)
-            if hunter:
+            hunter = self.registry[elim_id]
+            if hunter.role == "hunter":
                 self.logger.log_system("night", f"Hunter {elim_id} was killed at night, triggering last shot")
                 self._process_hunter_last_shot(hunter, "night")
 
@@ -474,6 +633,8 @@ class GameEngine:
         执行白天阶段
         """
         self.game_state["phase"] = "day"
+        self.logger.mark_section(self.game_state["day"], "day", "speech")
+        self.phase_budget.start("day", self.phase_budget_s)
         self.logger.log_system("day", f"Starting day {self.game_state['day']}")
         
         # 清空之前的公共发言记录
@@ -484,10 +645,19 @@ class GameEngine:
         
         # 按座位顺序发言
         speeches = {}
-        for agent_id in sorted(self.game_state["alive_agents"]):
+        speakers = sorted(self.game_state["alive_agents"])
+        saved_seconds = []
+        for index, agent_id in enumerate(speakers):
             self.game_state["current_speaker"] = agent_id
-            agent = next(a for a in self.agents if a.agent_id == agent_id)
-            execution = self._call_agent_tool(agent, intent="day_speech")
+            agent = self.registry[agent_id]
+            next_agent = None
+            if self.speculative_prefetch and index + 1 < len(speakers):
+                next_agent = self.registry[speakers[index + 1]]
+            if next_agent is None:
+                execution = self._call_agent_tool(agent, intent="day_speech")
+            else:
+                execution, saved = self._call_speech_with_prefetch(agent, next_agent)
+                saved_seconds.append(saved)
             speech = execution.content or execution.action.get("explain", "")
             speeches[agent_id] = speech
             
@@ -505,9 +675,16 @@ class GameEngine:
                 content=speech,
                 visibility=Visibility.PUBLIC,
             )
-        
+
+        if saved_seconds:
+            self.metrics.observe("speculation_saved_ms.day", sum(saved_seconds) * 1000)
+            self.logger.log_system("day", {"speculative_prefetch": {
+                "turns": len(saved_seconds),
+                "saved_ms": round(sum(saved_seconds) * 1000, 3),
+            }})
         
         # 投票
+        self.logger.mark_section(self.game_state["day"], "day", "vote")
         self._notify_frontend_phase("voting")
         alive_voters = sorted(self.game_state["alive_agents"])
         vote_session = VoteSession(
@@ -519,24 +696,30 @@ class GameEngine:
         )
         self.game_state["current_voting"] = {}  # 重置当前投票状态
 
-        # 收集所有玩家的投票
+        # 收集所有玩家的投票：各投票互不依赖，模型请求并发发出，按座位顺序计票
+        vote_requests = []
         for agent_id in alive_voters:
-            agent = next(a for a in self.agents if a.agent_id == agent_id)
+            agent = self.registry[agent_id]
             vote_targets = [target_id for target_id in vote_session.eligible_targets if target_id != agent_id]
-            execution = self._call_agent_tool(
+            vote_requests.append(self._prepare_tool_request(
                 agent,
                 intent="day_vote",
                 eligible_targets=vote_targets,
                 eligible_targets_by_tool={"vote_day": vote_targets, "abstain": []},
                 allowed_tool_names=["vote_day"] if vote_targets else ["abstain"],
-            )
+            ))
+        model_tool_calls = self._request_model_tool_calls(vote_requests)
+
+        for request, model_tool_call in zip(vote_requests, model_tool_calls):
+            agent_id = request.agent.agent_id
+            execution = self._complete_tool_call(request, model_tool_call)
             action = execution.action
             vote_target = action.get("target") if action.get("type") == "vote" else None
             if vote_session.cast(agent_id, vote_target, action.get("explain", "day_elimination")) and vote_target is not None:
                 self.game_state["current_voting"][agent_id] = vote_target
-                self.logger.log_agent_action("day", agent_id, action)
+                self._log_agent_action("day", agent_id, action)
             else:
-                self.logger.log_agent_action("day", agent_id, {
+                self._log_agent_action("day", agent_id, {
                     "type": "abstain",
                     "target": None,
                     "explain": action.get("explain", f"Player {agent_id} abstained or produced an invalid vote")
@@ -563,15 +746,70 @@ class GameEngine:
         )
         action = execution.action
         target = action.get("target")
-        if target is not None and target in self.game_state["alive_agents"]:
-            self.game_state["alive_agents"].remove(target)
-            self.game_state["eliminated_agents"].append(target)
+        if self._eliminate(target):
             self.logger.log_system(phase, f"Hunter {hunter.agent_id} shot and eliminated player {target}")
-            self.logger.log_agent_action(phase, hunter.agent_id, action)
+            self._log_agent_action(phase, hunter.agent_id, action)
             self._update_agents_environmental_awareness(phase, target)
         else:
             self.logger.log_system(phase, f"Hunter {hunter.agent_id} chose not to shoot")
 
+    def _eliminate(self, agent_id: Optional[int]) -> bool:
+        """
+        淘汰存活的 Agent，同时更新索引和 game_state 中的存活 / 淘汰名单
+
+        Returns:
+            是否淘汰成功（目标为空或已出局时为 False）
+        """
+        if not self.registry.eliminate(agent_id):
+            return False
+        self.registry[agent_id].close_memory()
+        self.game_state["alive_agents"].remove(agent_id)
+        self.game_state["eliminated_agents"].append(agent_id)
+        return True
+
+    def _log_agent_action(self, phase: str, agent_id: int, action: Dict[str, Any]):
+        """
+        记录 Agent 行动日志，并在 action_history 中保留一条精简记录
+        """
+        self.logger.log_agent_action(phase, agent_id, action)
+        self.game_state["action_history"].append({
+            "day": self.game_state["day"],
+            "phase": phase,
+            "agent_id": agent_id,
+            "type": action.get("type"),
+            "target": action.get("target"),
+        })
+
+    def game_summary(self, winner: Optional[str] = None) -> Dict[str, Any]:
+        """
+        生成对局汇总，对局结束时写入日志（game_summary 事件），供离线分析读取
+
+        Args:
+            winner: 胜利方名称
+
+        Returns:
+            {"game_id", "seed", "winner", "days", "agents", "actions", "vote_history"}
+        """
+        alive = set(self.game_state["alive_agents"])
+        return {
+            "game_id": self.game_id,
+            "seed": self.seed,
+            "winner": winner,
+            "days": self.game_state["day"],
+            "agents": [
+                {
+                    "agent_id": agent.agent_id,
+                    "role": agent.role,
+                    "team": agent.team,
+                    "model": model_name,
+                    "survived": agent.agent_id in alive,
+                }
+                for agent, model_name in zip(self.agents, self.model_list)
+            ],
+            "actions": self.game_state["action_history"],
+            "vote_history": self.game_state["vote_history"],
+        }
+
     def _notify_frontend_phase(self, phase_label: str):
         """Hook for UI adapters; CLI engine ignores frontend-only phase labels."""
         return None
@@ -585,7 +823,7 @@ class GameEngine:
             visibility=visibility,
             recipients=recipients,
         )
-        injected = MemoryInjector(self.agents, self.game_state).inject(event)
+        injected = MemoryInjector(self.registry, self.game_state, self.memory_store).inject(event)
         self.logger.log_system(phase, {
             "memory_injection": {
                 "source": source,
@@ -607,7 +845,91 @@ class GameEngine:
         """
         MCP 风格的按需工具调用入口：引擎按阶段暴露工具，Agent 只返回 tool_call。
         """
-        runtime = AgentToolRuntime(self.agents)
+        request = self._prepare_tool_request(
+            agent,
+            intent,
+            eligible_targets=eligible_targets,
+            extra_context=extra_context,
+            eligible_targets_by_tool=eligible_targets_by_tool,
+            allowed_tool_names=allowed_tool_names,
+        )
+        model_tool_call = self._call_model_tool(request)
+        return self._complete_tool_call(request, model_tool_call)
+
+    def _call_speech_with_prefetch(self, agent, next_agent) -> Tuple[ToolExecution, float]:
+        """
+        发出 agent 的发言请求，在其在途期间为 next_agent 做推测预取
+
+        下一位的提示词依赖本次发言，不能提前发出；这里先按当前状态构建下一位的提示词骨架，
+        再在后台事件循环上预热其适配器的连接（适配器配置 prompt_cache 时用骨架预热提示词前缀缓存），
+        本次发言结束后下一位只需重新组装提示词，连接和前缀缓存已就绪。
+
+        Returns:
+            (本次发言的执行结果, 估算节省的秒数)：与本次请求重叠完成的预热耗时
+        """
+        request = self._prepare_tool_request(agent, intent="day_speech")
+        loop = self._get_event_loop()
+        pending = loop.submit(self._acall_model_tool(request))
+
+        scaffold = self._build_tool_request(next_agent, intent="day_speech")
+        warm_started = time.perf_counter()
+        warming = loop.submit(self._awarm_up(next_agent, scaffold))
+
+        model_tool_call = pending.result()
+        finished = time.perf_counter()
+        if not warming.done():
+            # 预热仍在进行：只计入与本次请求重叠的部分
+            warm_seconds = finished - warm_started
+        elif warming.exception() is None:
+            warm_seconds = warming.result()
+        else:
+            warm_seconds = 0.0
+        saved = min(finished - warm_started, warm_seconds)
+        return self._complete_tool_call(request, model_tool_call), saved
+
+    async def _awarm_up(self, agent, scaffold: ToolRequest) -> float:
+        """
+        预热 agent 的适配器，返回预热耗时（秒）；适配器不支持或无需预热时返回 0
+        """
+        warm_up = getattr(agent.model_adapter, "awarm_up", None)
+        if warm_up is None:
+            return 0.0
+        started = time.perf_counter()
+        warmed = await warm_up(scaffold.prompt, scaffold.model_tools, getattr(agent, "system_prompt", None))
+        return time.perf_counter() - started if warmed else 0.0
+
+    def _prepare_tool_request(
+        self,
+        agent,
+        intent: str,
+        eligible_targets: Optional[List[int]] = None,
+        extra_context: Optional[Dict[str, Any]] = None,
+        eligible_targets_by_tool: Optional[Dict[str, List[int]]] = None,
+        allowed_tool_names: Optional[List[str]] = None,
+    ) -> ToolRequest:
+        started = time.perf_counter()
+        request = self._build_tool_request(
+            agent,
+            intent,
+            eligible_targets=eligible_targets,
+            extra_context=extra_context,
+            eligible_targets_by_tool=eligible_targets_by_tool,
+            allowed_tool_names=allowed_tool_names,
+        )
+        self._record_timing(request, "prompt", "prompt_build", time.perf_counter() - started)
+        self.metrics.observe(f"prompt_tokens.{intent}", request.prompt_tokens)
+        return request
+
+    def _build_tool_request(
+        self,
+        agent,
+        intent: str,
+        eligible_targets: Optional[List[int]] = None,
+        extra_context: Optional[Dict[str, Any]] = None,
+        eligible_targets_by_tool: Optional[Dict[str, List[int]]] = None,
+        allowed_tool_names: Optional[List[str]] = None,
+    ) -> ToolRequest:
+        runtime = self.tool_runtime
         tools = runtime.available_tools(
             agent,
             intent,
@@ -623,31 +945,189 @@ class GameEngine:
             extra_context=extra_context,
             eligible_targets_by_tool=eligible_targets_by_tool,
         )
-        model_tool_call = agent.model_adapter.call_tool(
-            prompt,
-            tools=runtime.to_model_tools(
+        request = ToolRequest(
+            agent=agent,
+            intent=intent,
+            tools=tools,
+            prompt=prompt,
+            model_tools=runtime.to_model_tools(
                 tools,
                 eligible_targets=eligible_targets,
                 eligible_targets_by_tool=eligible_targets_by_tool,
             ),
-            system_prompt=getattr(agent, "system_prompt", None),
+            eligible_targets=eligible_targets,
+            eligible_targets_by_tool=eligible_targets_by_tool,
+            prompt_tokens=estimate_tokens(prompt),
+        )
+        return request
+
+    def _call_model_tool(self, request: ToolRequest) -> Dict[str, Any]:
+        started = time.perf_counter()
+        model_tool_call = request.agent.model_adapter.call_tool(
+            request.prompt,
+            tools=request.model_tools,
+            system_prompt=getattr(request.agent, "system_prompt", None),
+            **self._stream_kwargs(request, started),
         )
+        self._record_model_call(request, model_tool_call, time.perf_counter() - started)
+        return model_tool_call
+
+    async def _acall_model_tool(self, request: ToolRequest) -> Dict[str, Any]:
+        started = time.perf_counter()
+        model_tool_call = await request.agent.model_adapter.acall_tool(
+            request.prompt,
+            tools=request.model_tools,
+            system_prompt=getattr(request.agent, "system_prompt", None),
+            **self._stream_kwargs(request, started),
+        )
+        self._record_model_call(request, model_tool_call, time.perf_counter() - started)
+        return model_tool_call
+
+    def _record_model_call(self, request: ToolRequest, model_tool_call: Dict[str, Any], seconds: float):
+        """
+        记录模型调用耗时，并把适配器挂在结果上的 usage 取下写入用量账本
+        """
+        self._record_timing(request, "model", f"model_call.{request.intent}", seconds)
+        usage = model_tool_call.pop("usage", None) or {}
+        adapter = request.agent.model_adapter
+        model_config = getattr(adapter, "model_config", None) or {}
+        if "fallback_reason" in model_tool_call:
+            source = "fallback"
+        else:
+            source = usage.get("source", "model")
+        self.ledger.record(
+            pricing=model_config.get("pricing"),
+            game_id=self.game_id,
+            agent_id=request.agent.agent_id,
+            adapter=getattr(adapter, "name", None),
+            model=model_config.get("model"),
+            intent=request.intent,
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            cached_tokens=usage.get("cached_tokens", 0),
+            estimated_prompt_tokens=request.prompt_tokens,
+            latency_s=seconds,
+            source=source,
+        )
+
+    def _stream_kwargs(self, request: ToolRequest, started: float) -> Dict[str, Any]:
+        """
+        发言类请求附带 on_partial 回调；其余请求不传，兼容不支持流式的适配器
+        """
+        if request.intent not in STREAMED_SPEECH_INTENTS:
+            return {}
+        agent_id = request.agent.agent_id
+        first = []
+
+        def on_partial(text: str):
+            if not first:
+                first.append(True)
+                self.metrics.record(f"first_partial.{request.intent}", time.perf_counter() - started)
+            self._on_speech_partial(agent_id, text)
+
+        return {"on_partial": on_partial}
+
+    def _on_speech_partial(self, agent_id: int, text: str):
+        """
+        供界面适配器覆盖的钩子，接收截至目前流式到达的发言全文；命令行引擎忽略。
+        并发调用和对冲调用时在引擎后台事件循环线程上被调用，覆盖实现需保证线程安全。
+        """
+        return None
+
+    def _record_timing(self, request: ToolRequest, stage: str, metric_name: str, seconds: float):
+        request.timings[stage] = seconds
+        self.metrics.record(metric_name, seconds)
+
+    def _complete_tool_call(self, request: ToolRequest, model_tool_call: Dict[str, Any]) -> ToolExecution:
+        tool_call, allowed_names = self._resolve_tool_call(request, model_tool_call)
+        started = time.perf_counter()
+        execution = self.tool_mcp_client.execute(
+            agent=request.agent,
+            tool_call=tool_call,
+            allowed_tool_names=allowed_names,
+            eligible_targets=request.eligible_targets,
+            eligible_targets_by_tool=request.eligible_targets_by_tool,
+        )
+        self._record_timing(request, "mcp", "mcp_roundtrip", time.perf_counter() - started)
+        self._finish_tool_call(request, tool_call, model_tool_call, execution)
+        return execution
+
+    def _finish_tool_call(self, request: ToolRequest, tool_call: ToolCall, model_tool_call: Dict[str, Any],
+                          execution: ToolExecution):
+        started = time.perf_counter()
+        self._log_tool_call(request, tool_call, model_tool_call, execution)
+        request.timings["log"] = time.perf_counter() - started
+        self.metrics.record(f"agent_tool.{request.intent}", sum(request.timings.values()))
+
+    def _request_model_tool_calls(self, requests: List[ToolRequest]) -> List[Dict[str, Any]]:
+        """
+        并发发出一组互不依赖的模型工具调用，返回顺序与 requests 一致。
+
+        Args:
+            requests: 已构建好提示词和工具 schema 的请求列表
+
+        Returns:
+            每个请求对应的模型 tool_call 字典
+        """
+        pending = self._start_model_tool_calls(requests) if len(requests) > 1 else None
+        return self._collect_model_tool_calls(requests, pending)
+
+    def _start_model_tool_calls(self, requests: List[ToolRequest]) -> Optional[Future]:
+        """
+        在后台事件循环上提前发出模型请求；未开启并发时返回 None，由 collect 阶段逐个调用。
+        """
+        if self.max_parallel_calls <= 1 or not requests:
+            return None
+        return self._get_event_loop().submit(self._agather_model_tool_calls(requests))
+
+    def _collect_model_tool_calls(self, requests: List[ToolRequest],
+                                  pending: Optional[Future]) -> List[Dict[str, Any]]:
+        if pending is not None:
+            return list(pending.result())
+        return [self._call_model_tool(request) for request in requests]
+
+    async def _agather_model_tool_calls(self, requests: List[ToolRequest]) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(self.max_parallel_calls)
+
+        async def call(request: ToolRequest):
+            async with semaphore:
+                return await self._acall_model_tool(request)
+
+        return list(await asyncio.gather(*(call(request) for request in requests)))
+
+    def _get_event_loop(self) -> EventLoopThread:
+        if self._event_loop is None:
+            self._event_loop = EventLoopThread()
+        return self._event_loop
+
+    def close(self):
+        """
+        释放引擎持有的后台事件循环、MCP 工具进程和日志文件
+        """
+        if self._event_loop is not None:
+            try:
+                self._event_loop.run(aclose_http_clients(), timeout=5)
+            except Exception as exc:
+                logger.debug(f"Error closing async HTTP clients: {exc}")
+            self._event_loop.close()
+            self._event_loop = None
+        self.tool_mcp_client.close()
+        self.logger.close()
+
+    def _resolve_tool_call(self, request: ToolRequest, model_tool_call: Dict[str, Any]):
         tool_call = ToolCall(
             name=str(model_tool_call.get("name") or "abstain"),
             arguments=model_tool_call.get("arguments") or {},
         )
-        allowed_tool_names = [tool.name for tool in tools]
+        allowed_tool_names = [tool.name for tool in request.tools]
         if model_tool_call.get("fallback_reason") and tool_call.name == "abstain" and "abstain" not in allowed_tool_names:
             allowed_tool_names.append("abstain")
-        execution = self.tool_mcp_client.execute(
-            agent=agent,
-            tool_call=tool_call,
-            allowed_tool_names=allowed_tool_names,
-            eligible_targets=eligible_targets,
-            eligible_targets_by_tool=eligible_targets_by_tool,
-        )
-        self.logger.log("tool", agent.agent_id, "tool_call", {
-            "intent": intent,
+        return tool_call, allowed_tool_names
+
+    def _log_tool_call(self, request: ToolRequest, tool_call: ToolCall, model_tool_call: Dict[str, Any],
+                       execution: ToolExecution):
+        self.logger.log("tool", request.agent.agent_id, "tool_call", {
+            "intent": request.intent,
             "requested": {"name": tool_call.name, "arguments": tool_call.arguments},
             "fallback_reason": model_tool_call.get("fallback_reason"),
             "execution": {
@@ -657,7 +1137,6 @@ class GameEngine:
                 "error": execution.error,
             }
         })
-        return execution
 
     def _settle_day(self, resolution):
         """
@@ -668,9 +1147,7 @@ class GameEngine:
         """
         target = resolution.target
         eliminated_player = None
-        if target is not None and target in self.game_state["alive_agents"]:
-            self.game_state["alive_agents"].remove(target)
-            self.game_state["eliminated_agents"].append(target)
+        if self._eliminate(target):
             eliminated_player = target
             self.logger.log_system("day", f"Agent {target} was eliminated by voting")
         else:
@@ -678,8 +1155,8 @@ class GameEngine:
 
         # Hunter last shot if the eliminated player is a hunter
         if eliminated_player is not None:
-            hunter = next((a for a in self.agents if a.agent_id == eliminated_player and a.role == "hunter"), None)
-            if hunter:
+            hunter = self.registry[eliminated_player]
+            if hunter.role == "hunter":
                 self.logger.log_system("day", f"Hunter {eliminated_player} is eliminated, triggering last shot")
                 self._process_hunter_last_shot(hunter, "day")
 
@@ -698,18 +1175,8 @@ class GameEngine:
             # 构造环境变化信息
             environment_change = f"在{phase}阶段，{eliminated_player}号玩家被淘汰"
             
-            # 为每个存活的Agent创建记忆更新信息
-            memory_update_info = {
-                "memory_updates": {
-                    "short_memory_add": [environment_change],
-                    "prediction_adjust": []
-                }
-            }
-            
-            # 更新所有存活Agent的记忆
-            for agent in self.agents:
-                if agent.agent_id in self.game_state["alive_agents"]:
-                    agent.update_memory(memory_update_info, phase)
+            # 写入共享记忆存储一次，对所有存活Agent可见
+            self.memory_store.append(phase, environment_change, Visibility.PUBLIC)
 
     def check_victory_condition(self) -> Optional[str]:
         """
@@ -718,44 +1185,59 @@ class GameEngine:
         Returns:
             胜利方名称，如果游戏继续则返回None
         """
-        alive_agents = [a for a in self.agents if a.agent_id in self.game_state["alive_agents"]]
-        werewolves = [a for a in alive_agents if a.role == "werewolf"]
-        villagers = [a for a in alive_agents if a.role != "werewolf"]
-        
-        # 记录当前游戏状态
-        game_status = {
+        # 存活人数由 AgentRegistry 在淘汰时增量维护
+        werewolves = self.registry.alive_count("werewolf")
+        villagers = self.registry.alive_count() - werewolves
+        self.logger.log_system("end", {"victory_check": {
             "day": self.game_state["day"],
-            "alive_players": len(alive_agents),
-            "werewolves_count": len(werewolves),
-            "villagers_count": len(villagers),
-            "werewolves": [w.agent_id for w in werewolves],
-            "villagers": [v.agent_id for v in villagers]
-        }
-        
-        self.logger.log_system("end", f"Checking victory condition: {game_status}")
+            "werewolves_count": werewolves,
+            "villagers_count": villagers,
+        }})
+        winner = None
         
         # 狼人数量大于等于村民数量，狼人胜利
-        if len(werewolves) >= len(villagers):
+        if werewolves >= villagers:
             self.logger.log_system("end", "Werewolves win - equal or more werewolves than villagers")
-            return "werewolves"
+            winner = "werewolves"
         
         # 没有狼人，村民胜利
-        if len(werewolves) == 0:
+        elif werewolves == 0:
             self.logger.log_system("end", "Villagers win - no werewolves left")
-            return "villagers"
+            winner = "villagers"
         
         # 达到最大天数，平局
-        if self.game_state["day"] >= self.config["game"].get("max_days", 30):
+        elif self.game_state["day"] >= self.max_days:
             self.logger.log_system("end", "Draw - reached maximum days")
-            return "draw"
+            winner = "draw"
         
-        # 游戏继续
-        self.logger.log_system("game", "Game continues - no victory condition met")
-        return None
+        if winner is None:
+            # 游戏继续
+            self.logger.log_system("game", "Game continues - no victory condition met")
+        else:
+            # 完整的存活名单只在对局结束时生成一次
+            self.logger.log_system("end", {"victory_status": self._victory_status()})
+        return winner
 
-    def run_game(self):
+    def _victory_status(self) -> Dict[str, Any]:
+        """
+        当前存活状态快照（存活人数与双方存活名单）
+        """
+        werewolves = self.registry.ids_with_role("werewolf")
+        return {
+            "day": self.game_state["day"],
+            "alive_players": self.registry.alive_count(),
+            "werewolves_count": len(werewolves),
+            "villagers_count": self.registry.alive_count() - len(werewolves),
+            "werewolves": werewolves,
+            "villagers": sorted(self.registry.alive - set(werewolves)),
+        }
+
+    def run_game(self) -> str:
         """
         运行完整游戏
+        
+        Returns:
+            胜利方名称（"werewolves"/"villagers"/"draw"）
         """
         print()
         print('='*196)
@@ -776,6 +1258,7 @@ class GameEngine:
             # 检查胜利条件
             winner = self.check_victory_condition()
             if winner:
+                self.logger.mark_section(self.game_state["day"], "end", "end")
                 self.logger.log_system("end", f"Game ended. Winner: {winner}")
                 break
             
@@ -785,10 +1268,19 @@ class GameEngine:
             # 检查胜利条件
             winner = self.check_victory_condition()
             if winner:
+                self.logger.mark_section(self.game_state["day"], "end", "end")
                 self.logger.log_system("end", f"Game ended. Winner: {winner}")
                 break
         
+        self.logger.log_system("end", {"game_summary": self.game_summary(winner)})
+        self.logger.log_system("end", {"usage": self.ledger.totals()})
+        if self.usage_file:
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            self.ledger.to_jsonl(os.path.join(
+                self.project_root, self.usage_file.format(timestamp=timestamp, game_id=self.game_id or timestamp)
+            ))
         self.logger.log_system("end", "Game finished")
+        return winner
 
     def _update_seer_check_info(self, seer_check_result: Dict[str, Any]):
         """
@@ -808,10 +1300,8 @@ class GameEngine:
         }
         
         # 更新预言家的记忆
-        for agent in self.agents:
-            if agent.role == "seer" and agent.agent_id in self.game_state["alive_agents"]:
-                agent.update_memory(memory_update_info, "night")
-                break
+        for agent in self.registry.with_role("seer")[:1]:
+            agent.update_memory(memory_update_info, "night")
 
     def _update_witch_skill_info(self, witch_actions: List[Dict[str, Any]]):
         """
@@ -839,7 +1329,5 @@ class GameEngine:
             }
             
             # 更新女巫的记忆
-            for agent in self.agents:
-                if agent.role == "witch" and agent.agent_id in self.game_state["alive_agents"]:
-                    agent.update_memory(memory_update_info, "night")
-                    break
+            for agent in self.registry.with_role("witch")[:1]:
+                agent.update_memory(memory_update_info, "night")
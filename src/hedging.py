@@ -0,0 +1,132 @@
+"""
+对冲请求：请求迟迟未返回时向同一服务商或备用适配器再发一份，先返回合法工具调用的一方胜出
+
+对冲时机取该适配器历史延迟的某个百分位；延迟样本在进程内按适配器名称共享，
+对冲次数按对局计数封顶，保证成本有上限。
+"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+try:
+    from metrics import percentile
+except ImportError:
+    from .metrics import percentile
+
+
+DEFAULT_LATENCY_WINDOW = 200
+
+
+class LatencyTracker:
+    """
+    最近 window 次成功调用的延迟（秒）
+    """
+
+    def __init__(self, window: int = DEFAULT_LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            values = sorted(self._samples)
+        if not values:
+            return None
+        return percentile(values, pct)
+
+
+class LatencyRegistry:
+    """
+    进程级延迟统计，按适配器名称共享
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trackers: Dict[str, LatencyTracker] = {}
+
+    def get(self, name: Optional[str]) -> LatencyTracker:
+        if not name:
+            return LatencyTracker()
+        with self._lock:
+            tracker = self._trackers.get(name)
+            if tracker is None:
+                tracker = LatencyTracker()
+                self._trackers[name] = tracker
+            return tracker
+
+    def reset(self) -> None:
+        with self._lock:
+            self._trackers = {}
+
+
+LATENCY_TRACKERS = LatencyRegistry()
+
+
+class HedgePolicy:
+    """
+    单个适配器的对冲配置，读取适配器配置中的 hedge 段
+
+    Attributes:
+        percentile: 请求超过历史延迟的该百分位仍未返回时发出对冲
+        min_samples: 延迟样本少于该数量时不对冲
+        min_delay: 对冲等待时间下限（秒）
+        backup: 对冲请求发往的备用适配器名称，为空时发往同一适配器
+    """
+
+    def __init__(self, percentile: float = 95, min_samples: int = 20, min_delay: float = 0.2,
+                 backup: Optional[str] = None):
+        self.percentile = float(percentile)
+        self.min_samples = max(1, int(min_samples))
+        self.min_delay = float(min_delay)
+        self.backup = backup
+
+    @classmethod
+    def from_config(cls, model_config: Dict[str, Any]) -> Optional["HedgePolicy"]:
+        hedge_config = model_config.get("hedge")
+        if not hedge_config or not hedge_config.get("enabled", True):
+            return None
+        return cls(
+            percentile=hedge_config.get("percentile", 95),
+            min_samples=hedge_config.get("min_samples", 20),
+            min_delay=hedge_config.get("min_delay", 0.2),
+            backup=hedge_config.get("backup"),
+        )
+
+    def delay(self, tracker: LatencyTracker) -> Optional[float]:
+        """
+        发出对冲前的等待秒数；样本不足时返回 None
+        """
+        if len(tracker) < self.min_samples:
+            return None
+        return max(self.min_delay, tracker.percentile(self.percentile) or 0.0)
+
+
+class HedgeBudget:
+    """
+    一局游戏内可发出的对冲请求总数
+    """
+
+    def __init__(self, max_hedges: Optional[int] = None):
+        self.max_hedges = max_hedges
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.won = 0
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.max_hedges is not None and self.sent >= self.max_hedges:
+                return False
+            self.sent += 1
+            return True
+
+    def record_win(self) -> None:
+        with self._lock:
+            self.won += 1
@@ -0,0 +1,182 @@
+"""
+模型调用用量账本：逐次记录 token 用量、延迟和费用，按对局 / Agent / 模型 / 意图汇总并导出 JSONL、CSV
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+
+# 价格单位：每百万 token
+PRICE_UNIT_TOKENS = 1_000_000
+SUMMARY_FIELDS = (
+    "prompt_tokens",
+    "completion_tokens",
+    "cached_tokens",
+    "estimated_prompt_tokens",
+    "cost",
+    "latency_s",
+)
+
+
+@dataclass
+class UsageRecord:
+    """
+    一次模型工具调用的用量
+
+    Attributes:
+        game_id: 对局编号
+        agent_id: Agent 编号
+        adapter: models.adapters 中的适配器名称
+        model: 模型名称
+        intent: 工具调用意图（day_speech、day_vote 等）
+        prompt_tokens: 服务商报告的提示词 token 数，未报告时为 0
+        completion_tokens: 服务商报告的生成 token 数
+        cached_tokens: 提示词中命中服务商前缀缓存的 token 数
+        estimated_prompt_tokens: 本地估算的提示词 token 数，服务商不报告用量时也可比较提示词大小
+        latency_s: 引擎侧观测到的调用耗时（秒）
+        cost: 按适配器 pricing 计算的费用，未配置价格时为 0
+        source: 结果来源：model（服务商返回）、cache（响应缓存命中）或 fallback（兜底）
+        timestamp: 记录时间（Unix 秒）
+    """
+
+    game_id: Optional[str]
+    agent_id: Optional[int]
+    adapter: Optional[str]
+    model: Optional[str]
+    intent: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    estimated_prompt_tokens: int = 0
+    latency_s: float = 0.0
+    cost: float = 0.0
+    source: str = "model"
+    timestamp: float = field(default_factory=time.time)
+
+
+LEDGER_FIELDS = tuple(item.name for item in fields(UsageRecord))
+
+
+def usage_cost(pricing: Optional[Dict[str, Any]], prompt_tokens: int, completion_tokens: int,
+               cached_tokens: int) -> float:
+    """
+    按适配器的 pricing 计算费用
+
+    Args:
+        pricing: {"input": 每百万输入 token 价格, "output": 每百万输出 token 价格,
+            "cached_input": 每百万命中缓存的输入 token 价格（缺省按 input 计）}
+        prompt_tokens: 提示词 token 数（含命中缓存部分）
+        completion_tokens: 生成 token 数
+        cached_tokens: 命中缓存的提示词 token 数
+    """
+    if not pricing:
+        return 0.0
+    input_price = float(pricing.get("input", 0))
+    cached_price = float(pricing.get("cached_input", input_price))
+    output_price = float(pricing.get("output", 0))
+    cost = ((prompt_tokens - cached_tokens) * input_price
+            + cached_tokens * cached_price
+            + completion_tokens * output_price)
+    return cost / PRICE_UNIT_TOKENS
+
+
+class UsageLedger:
+    """
+    线程安全的用量账本；一局游戏一本，批量运行时合并各局账本
+    """
+
+    def __init__(self, records: Optional[Iterable[UsageRecord]] = None):
+        self._lock = threading.Lock()
+        self._records: List[UsageRecord] = list(records or [])
+
+    def record(self, pricing: Optional[Dict[str, Any]] = None, **values: Any) -> UsageRecord:
+        """
+        追加一条记录；给出 pricing 时按 token 数计算 cost
+        """
+        entry = UsageRecord(**values)
+        if pricing and not entry.cost:
+            entry.cost = usage_cost(pricing, entry.prompt_tokens, entry.completion_tokens, entry.cached_tokens)
+        with self._lock:
+            self._records.append(entry)
+        return entry
+
+    def extend(self, records: Iterable[UsageRecord]) -> None:
+        records = list(records)
+        with self._lock:
+            self._records.extend(records)
+
+    @property
+    def records(self) -> List[UsageRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+    def summary(self, group_by: Sequence[str] = ("model",)) -> Dict[str, Dict[str, float]]:
+        """
+        按字段分组汇总
+
+        Args:
+            group_by: 分组字段（LEDGER_FIELDS 中的名称），多个字段的取值以 "/" 连接作为键；
+                为空时返回键为 "total" 的总计
+
+        Returns:
+            {分组键: {"calls", "prompt_tokens", ..., "cost", "latency_s", "mean_latency_s", "cache_hit_rate"}}
+        """
+        groups: Dict[str, Dict[str, float]] = {}
+        for entry in self.records:
+            key = "/".join(str(getattr(entry, name)) for name in group_by) or "total"
+            totals = groups.setdefault(key, dict.fromkeys(("calls",) + SUMMARY_FIELDS, 0))
+            totals["calls"] += 1
+            for name in SUMMARY_FIELDS:
+                totals[name] += getattr(entry, name)
+        for totals in groups.values():
+            totals["cost"] = round(totals["cost"], 6)
+            totals["latency_s"] = round(totals["latency_s"], 4)
+            totals["mean_latency_s"] = round(totals["latency_s"] / totals["calls"], 4)
+            totals["cache_hit_rate"] = (
+                round(totals["cached_tokens"] / totals["prompt_tokens"], 4) if totals["prompt_tokens"] else 0.0
+            )
+        return groups
+
+    def totals(self) -> Dict[str, float]:
+        return self.summary(()).get("total", {})
+
+    def to_jsonl(self, path: str, append: bool = False) -> None:
+        _ensure_parent(path)
+        with open(path, "a" if append else "w", encoding="utf-8") as f:
+            for entry in self.records:
+                f.write(json.dumps(asdict(entry), ensure_ascii=False) + "\n")
+
+    def to_csv(self, path: str) -> None:
+        _ensure_parent(path)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=LEDGER_FIELDS)
+            writer.writeheader()
+            for entry in self.records:
+                writer.writerow(asdict(entry))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [asdict(entry) for entry in self.records]
+
+    @classmethod
+    def from_dicts(cls, rows: Iterable[Dict[str, Any]]) -> "UsageLedger":
+        return cls(UsageRecord(**{name: row[name] for name in LEDGER_FIELDS if name in row}) for row in rows)
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> "UsageLedger":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dicts(json.loads(line) for line in f if line.strip())
+
+
+def _ensure_parent(path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
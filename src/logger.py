@@ -1,7 +1,13 @@
 import os
+import copy
 import json
+import atexit
+import queue
+import threading
+import time
+import weakref
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, NamedTuple, Optional
 
 try:
     from loguru import logger
@@ -13,30 +19,201 @@ except ImportError:
     # 模拟loguru的add方法
     logger.add = lambda *args, **kwargs: None
 
+try:
+    from event_log import EventLogWriter, event_log_path
+except ImportError:
+    from .event_log import EventLogWriter, event_log_path
+
+
+DEFAULT_QUEUE_SIZE = 10000
+# 缓冲区写满时的处理方式：block 等待写线程腾出空间（不丢日志），drop 丢弃新日志并计数
+BACKPRESSURE_POLICIES = ("block", "drop")
+# 写线程每次最多合并处理的日志条数
+WRITE_BATCH_SIZE = 256
+# block 策略下缓冲区满时每次等待的时长（秒），超时后检查写线程是否还活着
+ENQUEUE_POLL_S = 0.5
+
+_LIVE_LOGGERS: "weakref.WeakSet[GameLogger]" = weakref.WeakSet()
+
+
+class _SectionMark(NamedTuple):
+    day: int
+    phase: str
+    section: str
+
 
 class GameLogger:
     """
     游戏日志记录器
+
+    log 只在调用线程组装日志条目并放入有界缓冲区；JSON 序列化和写文件由后台写线程批量完成，
+    引擎热路径不等待磁盘。入队前会深拷贝 content，调用方之后修改原对象不影响写出的日志。
     """
 
-    def __init__(self, log_file_pattern: str):
+    def __init__(self, log_file_pattern: str, game_id: Optional[str] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, backpressure: str = "block",
+                 text: bool = True, events: bool = False, events_compression: str = "none"):
         """
         初始化日志记录器
         
         Args:
-            log_file_pattern: 日志文件路径模式
+            log_file_pattern: 日志文件路径模式，支持 {timestamp} 和 {game_id} 占位符
+            game_id: 对局编号（可选），批量运行时用于区分各局日志文件
+            queue_size: 待写日志缓冲区的容量
+            backpressure: 缓冲区写满时的处理方式，见 BACKPRESSURE_POLICIES
+            text: 是否写 loguru 文本日志文件
+            events: 是否同时写结构化事件日志（与文本日志同名的 .events.jsonl / .events.zst 及其索引）
+            events_compression: 事件日志压缩方式，none 或 zstd
         """
-        # 创建logs目录（如果不存在）
-        os.makedirs("logs", exist_ok=True)
-        
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unsupported logger backpressure policy: {backpressure}; expected one of {BACKPRESSURE_POLICIES}")
         # 格式化日志文件路径
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_file_path = log_file_pattern.format(timestamp=timestamp)
+        log_file_path = log_file_pattern.format(timestamp=timestamp, game_id=game_id or timestamp)
+
+        # 创建日志目录（如果不存在）
+        os.makedirs(os.path.dirname(log_file_path) or "logs", exist_ok=True)
         
         # 配置loguru
-        logger.add(log_file_path, rotation="10 MB", encoding="utf-8")
+        self._sink_id = logger.add(log_file_path, rotation="10 MB", encoding="utf-8") if text else None
+        # 结构化事件日志，由写线程独占写入
+        self.events: Optional[EventLogWriter] = None
+        self.events_path = event_log_path(log_file_path, events_compression) if events else None
+        if events:
+            self.events = EventLogWriter(self.events_path, events_compression)
         
         self.log_file_path = log_file_path
+        self.game_id = game_id
+        # 可选的 PerfRecorder，设置后记录每条日志的耗时
+        self.metrics = None
+        self.backpressure = backpressure
+        # 因缓冲区已满被丢弃的日志条数（仅 drop 策略）
+        self.dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._closed = False
+        # 保护“是否已关闭”的判断与入队，保证 close 放入结束标记之后不会再有日志入队
+        self._lock = threading.Lock()
+        self._writer = threading.Thread(target=self._run, name=f"game-logger-{game_id or timestamp}", daemon=True)
+        self._writer.start()
+        _LIVE_LOGGERS.add(self)
+
+    def flush(self, timeout: Optional[float] = None):
+        """
+        等待缓冲区中已有的日志全部写出
+        """
+        done = threading.Event()
+        if self._enqueue(done):
+            done.wait(timeout)
+
+    def close(self):
+        """
+        写出缓冲区中的剩余日志，再移除本局的文件 sink，避免同一进程中后续对局继续写入本文件
+        """
+        with self._lock:
+            closing = not self._closed
+            self._closed = True
+            if closing:
+                self._put(None)
+        if closing:
+            self._writer.join()
+            # 写线程异常退出时缓冲区里可能还有日志，在当前线程补写
+            self._drain()
+            if self.dropped:
+                logger.warning(f"Game logger dropped {self.dropped} entries ({self.log_file_path})")
+            if self.events is not None:
+                # 关闭后的日志同步写入文本日志，不再进入已写完索引的事件日志
+                self.events.close()
+                self.events = None
+        if self._sink_id is None:
+            return
+        try:
+            logger.remove(self._sink_id)
+        except ValueError:
+            pass
+        self._sink_id = None
+
+    def _put(self, item: Any) -> bool:
+        """
+        阻塞放入缓冲区；每等待 ENQUEUE_POLL_S 检查一次写线程，写线程已退出时放弃并返回 False
+        """
+        while True:
+            try:
+                self._queue.put(item, timeout=ENQUEUE_POLL_S)
+                return True
+            except queue.Full:
+                if not self._writer.is_alive():
+                    return False
+
+    def _enqueue(self, item: Any) -> bool:
+        """
+        在锁内检查关闭状态并按背压策略入队
+
+        Returns:
+            条目是否已交给写线程处理（drop 策略下被丢弃也算已处理）；
+            返回 False 时调用方需要自行同步写出
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            if self.backpressure == "drop" and not isinstance(item, threading.Event):
+                try:
+                    self._queue.put_nowait(item)
+                except queue.Full:
+                    self.dropped += 1
+                return True
+            return self._put(item)
+
+    def _drain(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+            elif isinstance(item, dict):
+                self._write(item)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if item is None:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif isinstance(item, _SectionMark):
+                    if self.events is not None:
+                        self.events.mark(*item)
+                else:
+                    self._write(item)
+
+    def _write(self, log_entry: Dict[str, Any]):
+        try:
+            line = json.dumps(log_entry, ensure_ascii=False, default=str)
+            logger.info(line)
+            if self.events is not None:
+                self.events.write(line)
+        except Exception as exc:
+            logger.error(f"Failed to write game log entry: {exc}")
+
+    def mark_section(self, day: int, phase: str, section: str):
+        """
+        在事件日志中开始新的分段（如第 3 天的 vote），之后的日志条目都归入该分段
+
+        Args:
+            day: 游戏天数
+            phase: 引擎阶段
+            section: 分段名
+        """
+        if self.events is None:
+            return
+        self._enqueue(_SectionMark(day, phase, section))
 
     def log(self, phase: str, agent_id: Optional[int], log_type: str, content: Any):
         """
@@ -48,19 +225,21 @@ class GameLogger:
             log_type: 日志类型 ("speech"/"action"/"system")
             content: 日志内容（文本或JSON）
         """
+        started = time.perf_counter()
         log_entry = {
             "timestamp": datetime.now().isoformat(),
             "phase": phase,
             "agent_id": agent_id,
             "type": log_type,
-            "content": content
+            # 写线程稍后才序列化，先拷贝一份，避免调用方随后修改 content 导致日志内容取决于写出时机
+            "content": copy.deepcopy(content)
         }
         
-        # 控制台输出
-        #print(json.dumps(log_entry, ensure_ascii=False, indent=2))
-        
-        # 文件记录
-        logger.info(json.dumps(log_entry, ensure_ascii=False))
+        # 控制台与文件输出都由写线程完成；已关闭或写线程已退出时在当前线程同步写出
+        if not self._enqueue(log_entry):
+            self._write(log_entry)
+        if self.metrics is not None:
+            self.metrics.record("logger", time.perf_counter() - started)
 
     def log_system(self, phase: str, content: Any):
         """
@@ -92,4 +271,12 @@ class GameLogger:
             agent_id: Agent ID
             speech: 发言内容
         """
-        self.log(phase, agent_id, "speech", speech)
\ No newline at end of file
+        self.log(phase, agent_id, "speech", speech)
+
+def _close_live_loggers():
+    # 进程退出时写出未关闭日志记录器中的剩余日志
+    for game_logger in list(_LIVE_LOGGERS):
+        game_logger.close()
+
+
+atexit.register(_close_live_loggers)
@@ -22,8 +22,11 @@ def main():
     config_path = os.path.abspath(args.config)
     engine = GameEngine(config_path)
     
-    # 运行游戏
-    engine.run_game()
+    # 运行游戏，结束后写出日志缓冲区并释放后台线程
+    try:
+        engine.run_game()
+    finally:
+        engine.close()
 
 
 if __name__ == "__main__":
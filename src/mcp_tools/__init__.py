@@ -1,5 +1,26 @@
 """FastMCP integration for MAWS agent tools."""
 
 from .client import MCPToolClient
+from .inprocess import InProcessToolClient
 
-__all__ = ["MCPToolClient"]
+TOOL_TRANSPORTS = ("inprocess", "stdio")
+
+
+def create_tool_client(transport: str = "inprocess"):
+    """
+    按传输方式创建工具客户端
+
+    Args:
+        transport: inprocess（本进程直接执行）或 stdio（FastMCP 子进程）
+
+    Returns:
+        工具客户端
+    """
+    if transport == "inprocess":
+        return InProcessToolClient()
+    if transport == "stdio":
+        return MCPToolClient()
+    raise ValueError(f"Unsupported tool transport: {transport}; expected one of {TOOL_TRANSPORTS}")
+
+
+__all__ = ["InProcessToolClient", "MCPToolClient", "TOOL_TRANSPORTS", "create_tool_client"]
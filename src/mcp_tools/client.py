@@ -1,4 +1,6 @@
-"""Synchronous wrapper around a persistent FastMCP stdio client."""
+"""
+常驻 FastMCP stdio 客户端的同步封装
+"""
 
 from __future__ import annotations
 
@@ -37,7 +39,18 @@ class MCPToolClient:
         eligible_targets: Optional[List[int]] = None,
         eligible_targets_by_tool: Optional[Dict[str, List[int]]] = None,
     ) -> ToolExecution:
-        future = asyncio.run_coroutine_threadsafe(
+        future = self._submit(agent, tool_call, allowed_tool_names, eligible_targets, eligible_targets_by_tool)
+        return self._to_execution(future.result(timeout=30), tool_call)
+
+    def _submit(
+        self,
+        agent: Any,
+        tool_call: ToolCall,
+        allowed_tool_names: List[str],
+        eligible_targets: Optional[List[int]],
+        eligible_targets_by_tool: Optional[Dict[str, List[int]]],
+    ) -> Future:
+        return asyncio.run_coroutine_threadsafe(
             self._execute_async(
                 agent=agent,
                 tool_call=tool_call,
@@ -47,7 +60,8 @@ class MCPToolClient:
             ),
             self._loop,
         )
-        payload = future.result(timeout=30)
+
+    def _to_execution(self, payload: Dict[str, Any], tool_call: ToolCall) -> ToolExecution:
         return ToolExecution(
             tool_name=payload.get("tool_name", tool_call.name),
             action=payload.get("action") or {"type": "none", "target": None, "explain": "mcp_empty_action"},
@@ -1,32 +1,52 @@
-"""Pure tool execution logic shared by the FastMCP server."""
+"""
+工具执行逻辑（无 I/O），由 FastMCP 服务端和进程内客户端共用
+"""
 
 from __future__ import annotations
 
 from types import SimpleNamespace
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 try:
-    from agent_tools import ALL_TOOL_SPECS, AgentToolRuntime, ToolCall
+    from agent_tools import ALL_TOOL_SPECS, AgentToolRuntime, ToolCall, ToolExecution
 except ImportError:
-    from ..agent_tools import ALL_TOOL_SPECS, AgentToolRuntime, ToolCall
+    from ..agent_tools import ALL_TOOL_SPECS, AgentToolRuntime, ToolCall, ToolExecution
 
+_RUNTIME = AgentToolRuntime([])
 
-def execute_agent_tool(tool_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-    allowed_names: List[str] = list(payload.get("allowed_tools") or [])
-    if tool_name not in allowed_names:
-        allowed_names.append(tool_name)
+
+def execute_tool_call(
+    agent: Any,
+    tool_call: ToolCall,
+    allowed_tool_names: List[str],
+    eligible_targets: Optional[List[int]] = None,
+    eligible_targets_by_tool: Optional[Dict[str, List[int]]] = None,
+) -> ToolExecution:
+    allowed_names = list(allowed_tool_names or [])
+    if tool_call.name not in allowed_names:
+        allowed_names.append(tool_call.name)
 
     tools = [ALL_TOOL_SPECS[name] for name in allowed_names if name in ALL_TOOL_SPECS]
+    return _RUNTIME.execute(
+        agent=agent,
+        tool_call=tool_call,
+        tools=tools,
+        eligible_targets=eligible_targets or [],
+        eligible_targets_by_tool=eligible_targets_by_tool or {},
+    )
+
+
+def execute_agent_tool(tool_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     agent_payload = payload.get("agent") or {}
     agent = SimpleNamespace(
         agent_id=int(agent_payload.get("id", 0)),
         role=str(agent_payload.get("role", "")),
     )
 
-    execution = AgentToolRuntime([]).execute(
+    execution = execute_tool_call(
         agent=agent,
         tool_call=ToolCall(name=tool_name, arguments=payload.get("arguments") or {}),
-        tools=tools,
+        allowed_tool_names=list(payload.get("allowed_tools") or []),
         eligible_targets=payload.get("eligible_targets") or [],
         eligible_targets_by_tool=payload.get("eligible_targets_by_tool") or {},
     )
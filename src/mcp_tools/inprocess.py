@@ -0,0 +1,39 @@
+"""
+进程内工具客户端：直接调用工具执行逻辑，不启动子进程，也不经过 JSON-RPC
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from .executor import execute_tool_call
+
+try:
+    from agent_tools import ToolCall, ToolExecution
+except ImportError:
+    from ..agent_tools import ToolCall, ToolExecution
+
+
+class InProcessToolClient:
+    """
+    与 MCPToolClient 接口一致的进程内实现，没有进程隔离
+    """
+
+    def execute(
+        self,
+        agent: Any,
+        tool_call: ToolCall,
+        allowed_tool_names: List[str],
+        eligible_targets: Optional[List[int]] = None,
+        eligible_targets_by_tool: Optional[Dict[str, List[int]]] = None,
+    ) -> ToolExecution:
+        return execute_tool_call(
+            agent=agent,
+            tool_call=tool_call,
+            allowed_tool_names=allowed_tool_names,
+            eligible_targets=eligible_targets,
+            eligible_targets_by_tool=eligible_targets_by_tool,
+        )
+
+    def close(self) -> None:
+        return None
@@ -0,0 +1,109 @@
+"""
+轻量的耗时统计，用于基准测试和性能回归对比
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    线性插值百分位数
+
+    Args:
+        sorted_values: 已升序排列的样本
+        pct: 百分位（0-100）
+    """
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+class PerfRecorder:
+    """
+    线程安全的耗时记录器，按名称累积样本（单位：秒）
+
+    非耗时类的数值（如提示词 token 数）通过 observe 单独记录，由 value_summary 汇总。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+        self._values: Dict[str, List[float]] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(name, []).append(seconds)
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            self._values.setdefault(name, []).append(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def merge(self, other: "PerfRecorder") -> None:
+        with other._lock:
+            snapshot = {name: list(values) for name, values in other._samples.items()}
+            value_snapshot = {name: list(values) for name, values in other._values.items()}
+        with self._lock:
+            for name, values in snapshot.items():
+                self._samples.setdefault(name, []).extend(values)
+            for name, values in value_snapshot.items():
+                self._values.setdefault(name, []).extend(values)
+
+    def samples(self, name: str) -> List[float]:
+        with self._lock:
+            return list(self._samples.get(name, []))
+
+    def summary(self, names: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        汇总每个名称的次数、总耗时、均值和 p50/p95/p99（毫秒）
+        """
+        with self._lock:
+            snapshot = {name: sorted(values) for name, values in self._samples.items()}
+        result: Dict[str, Dict[str, float]] = {}
+        for name in sorted(names or snapshot):
+            values = snapshot.get(name, [])
+            total = sum(values)
+            result[name] = {
+                "count": len(values),
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total * 1000 / len(values), 3) if values else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+            }
+        return result
+
+    def value_summary(self, names: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        汇总 observe 记录的数值：次数、总和、均值、p50/p95 和最大值
+        """
+        with self._lock:
+            snapshot = {name: sorted(values) for name, values in self._values.items()}
+        result: Dict[str, Dict[str, float]] = {}
+        for name in sorted(names or snapshot):
+            values = snapshot.get(name, [])
+            total = sum(values)
+            result[name] = {
+                "count": len(values),
+                "total": round(total, 3),
+                "mean": round(total / len(values), 3) if values else 0.0,
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "max": values[-1] if values else 0.0,
+            }
+        return result
@@ -1,8 +1,37 @@
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import asyncio
+import atexit
 import json
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
 import requests
+from requests.adapters import HTTPAdapter
 from loguru import logger
 
+try:
+    from async_runtime import EventLoopThread
+    from debug_sink import open_debug_channel
+    from hedging import LATENCY_TRACKERS, HedgePolicy
+    from prompt_builder import compact_json, estimate_tokens
+    from rate_limit import RATE_LIMITERS
+    from response_cache import response_cache_key
+    from retry import DeadlineExceeded, RetryPolicy
+    from stub_model import StubToolPolicy
+    from tool_stream import PartialCallback, ToolCallStreamParser
+except ImportError:
+    from .async_runtime import EventLoopThread
+    from .debug_sink import open_debug_channel
+    from .hedging import LATENCY_TRACKERS, HedgePolicy
+    from .prompt_builder import compact_json, estimate_tokens
+    from .rate_limit import RATE_LIMITERS
+    from .response_cache import response_cache_key
+    from .retry import DeadlineExceeded, RetryPolicy
+    from .stub_model import StubToolPolicy
+    from .tool_stream import PartialCallback, ToolCallStreamParser
+
 try:
     import httpx
     HTTPX_AVAILABLE = True
@@ -11,26 +40,336 @@ except ImportError:
     HTTPX_AVAILABLE = False
 
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
     logger.warning("OpenAI library not available, will use HTTP requests for all models")
 
 
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+# 桩模型开启 stream 时，发言分几段回调
+STUB_STREAM_CHUNKS = 4
+# 预热请求的超时（秒）
+WARM_UP_TIMEOUT = 5.0
+# 流式请求参数：要求服务商在最后一个 chunk 中附带 usage
+STREAM_OPTIONS = {"stream": True, "stream_options": {"include_usage": True}}
+
+
+class HTTPClientPool:
+    """
+    进程级 HTTP 客户端池。
+
+    同一个 api_base（及相同的代理/超时/连接上限配置）在整个进程生命周期内复用
+    一个 keep-alive 客户端，避免每次发言、投票、夜间行动都重新做 TCP+TLS 握手。
+    OpenAI SDK 路径复用 httpx.Client + OpenAI 实例，requests 路径复用 requests.Session。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._httpx_clients: Dict[Tuple, Any] = {}
+        self._openai_clients: Dict[Tuple, Any] = {}
+        self._sessions: Dict[Tuple, requests.Session] = {}
+        # 异步客户端绑定创建它的事件循环，按循环分别缓存。
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @staticmethod
+    def _limits(model_config: Dict[str, Any]) -> Tuple[int, int, float]:
+        return (
+            int(model_config.get("max_connections", DEFAULT_MAX_CONNECTIONS)),
+            int(model_config.get("max_keepalive_connections", DEFAULT_MAX_KEEPALIVE_CONNECTIONS)),
+            float(model_config.get("keepalive_expiry", DEFAULT_KEEPALIVE_EXPIRY)),
+        )
+
+    def _httpx_options(self, model_config: Dict[str, Any]) -> Tuple[Tuple, Dict[str, Any]]:
+        trust_env = bool(model_config.get("trust_env_proxy", False))
+        timeout = model_config.get("timeout", 60)
+        limits = self._limits(model_config)
+        max_connections, max_keepalive, keepalive_expiry = limits
+        # OpenAI/httpx will otherwise read ALL_PROXY/HTTP_PROXY from the shell.
+        # Some local proxy tools export socks://, which httpx does not accept.
+        # Default to an explicit no-env client; opt back in with trust_env_proxy: true.
+        options = {
+            "trust_env": trust_env,
+            "timeout": timeout,
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        }
+        return (model_config.get("api_base"), trust_env, timeout, limits), options
+
+    def httpx_client(self, model_config: Dict[str, Any]):
+        if not HTTPX_AVAILABLE:
+            return None
+        key, options = self._httpx_options(model_config)
+        with self._lock:
+            client = self._httpx_clients.get(key)
+            if client is None:
+                client = httpx.Client(**options)
+                self._httpx_clients[key] = client
+            return client
+
+    def async_httpx_client(self, model_config: Dict[str, Any]):
+        if not HTTPX_AVAILABLE:
+            return None
+        loop = asyncio.get_running_loop()
+        key, options = self._httpx_options(model_config)
+        key = ("httpx",) + key
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = httpx.AsyncClient(**options)
+                clients[key] = client
+            return client
+
+    def async_openai_client(self, model_config: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        key = (
+            "openai",
+            model_config.get("api_base"),
+            model_config.get("api_key"),
+            bool(model_config.get("trust_env_proxy", False)),
+            model_config.get("timeout", 60),
+            self._limits(model_config),
+        )
+        with self._lock:
+            client = self._async_clients.get(loop, {}).get(key)
+        if client is not None:
+            return client
+        http_client = self.async_httpx_client(model_config)
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = AsyncOpenAI(
+                    api_key=model_config.get("api_key"),
+                    base_url=model_config.get("api_base"),
+                    http_client=http_client,
+                )
+                clients[key] = client
+            return client
+
+    def openai_client(self, model_config: Dict[str, Any]):
+        key = (
+            model_config.get("api_base"),
+            model_config.get("api_key"),
+            bool(model_config.get("trust_env_proxy", False)),
+            model_config.get("timeout", 60),
+            self._limits(model_config),
+        )
+        with self._lock:
+            client = self._openai_clients.get(key)
+        if client is not None:
+            return client
+        http_client = self.httpx_client(model_config)
+        with self._lock:
+            client = self._openai_clients.get(key)
+            if client is None:
+                client = OpenAI(
+                    api_key=model_config.get("api_key"),
+                    base_url=model_config.get("api_base"),
+                    http_client=http_client,
+                )
+                self._openai_clients[key] = client
+            return client
+
+    def session(self, model_config: Dict[str, Any]) -> requests.Session:
+        max_connections, _, _ = self._limits(model_config)
+        key = (model_config.get("api_base"), max_connections)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[key] = session
+            return session
+
+    def close(self) -> None:
+        with self._lock:
+            openai_clients = list(self._openai_clients.values())
+            httpx_clients = list(self._httpx_clients.values())
+            sessions = list(self._sessions.values())
+            self._openai_clients.clear()
+            self._httpx_clients.clear()
+            self._sessions.clear()
+        for client in openai_clients + httpx_clients + sessions:
+            try:
+                client.close()
+            except Exception as exc:
+                logger.debug(f"Error closing pooled HTTP client: {exc}")
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环上创建的异步客户端。"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.pop(loop, {})
+        for client in clients.values():
+            try:
+                if hasattr(client, "aclose"):
+                    await client.aclose()
+                else:
+                    await client.close()
+            except Exception as exc:
+                logger.debug(f"Error closing pooled async HTTP client: {exc}")
+
+    def _reset_after_fork(self) -> None:
+        # 子进程不能继续使用父进程的 socket，直接丢弃引用，按需重建。
+        self._lock = threading.Lock()
+        self._httpx_clients = {}
+        self._openai_clients = {}
+        self._sessions = {}
+        self._async_clients = weakref.WeakKeyDictionary()
+
+
+CLIENT_POOL = HTTPClientPool()
+atexit.register(CLIENT_POOL.close)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=CLIENT_POOL._reset_after_fork)
+
+
+def close_http_clients() -> None:
+    """关闭进程内所有池化的 HTTP 客户端。"""
+    CLIENT_POOL.close()
+
+
+async def aclose_http_clients() -> None:
+    """关闭当前事件循环上池化的异步 HTTP 客户端。"""
+    await CLIENT_POOL.aclose()
+
+
+_HEDGE_LOOP: Optional[EventLoopThread] = None
+_HEDGE_LOOP_LOCK = threading.Lock()
+
+
+def _hedge_loop() -> EventLoopThread:
+    """
+    未注入引擎事件循环时（单独使用适配器），同步调用开启对冲所用的进程级后台事件循环，
+    对冲失败的一方可以被真正取消。
+    """
+    global _HEDGE_LOOP
+    with _HEDGE_LOOP_LOCK:
+        if _HEDGE_LOOP is None:
+            _HEDGE_LOOP = EventLoopThread(name="maws-hedge-loop")
+        return _HEDGE_LOOP
+
+
+def cached_prompt_tokens(usage: Dict[str, Any]) -> int:
+    """
+    读出 usage 中命中服务商提示词缓存的 token 数
+
+    OpenAI / 通义千问报告在 prompt_tokens_details.cached_tokens，DeepSeek 报告在 prompt_cache_hit_tokens；
+    都没有时返回 0。
+    """
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    if cached is None:
+        cached = usage.get("prompt_cache_hit_tokens")
+    return int(cached or 0)
+
+
+def _reset_hedge_loop_after_fork() -> None:
+    global _HEDGE_LOOP, _HEDGE_LOOP_LOCK
+    _HEDGE_LOOP = None
+    _HEDGE_LOOP_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_hedge_loop_after_fork)
+
+
 class ModelsAdapter:
     """
     模型适配器类，用于统一不同模型的调用接口
     """
 
-    def __init__(self, model_config: Dict[str, Any]):
+    def __init__(self, model_config: Dict[str, Any], name: Optional[str] = None, base_dir: str = ""):
         """
         初始化模型适配器
         
         Args:
             model_config: 模型配置字典
+            name: models.adapters 中的适配器名称；配置了 rpm / tpm / max_concurrency 时，
+                同名适配器在进程内共享一个限流器
+            base_dir: 配置中相对路径（如 debug.path）的基准目录，通常是配置文件所在目录
         """
         self.model_config = model_config
+        self.name = name
+        self.rate_limiter = RATE_LIMITERS.get(name, model_config)
+        self.retry_policy = RetryPolicy.from_config(model_config)
+        self.hedge_policy = HedgePolicy.from_config(model_config)
+        self.latency = LATENCY_TRACKERS.get(name)
+        # 由引擎注入：PerfRecorder 记录限流排队等待，PhaseBudget 限制整个阶段的调用时间，
+        # HedgeBudget 限制一局内的对冲次数（未注入时不限），hedge_backup 为对冲用的备用适配器
+        self.metrics = None
+        self.phase_budget = None
+        self.hedge_budget = None
+        self.hedge_backup = None
+        # 由引擎注入：返回本局后台事件循环（EventLoopThread）的可调用对象，同步对冲调用在其上执行
+        self.event_loop_provider: Optional[Callable[[], EventLoopThread]] = None
+        # 由引擎注入的 ResponseCache（models.cache），为 None 时不缓存
+        self.response_cache = None
+        # 同一请求在本局内的出现次数，可能被并发调用和对冲线程同时更新，需加锁；每局注入缓存时清空
+        self._cache_occurrences: Dict[str, int] = {}
+        self._cache_lock = threading.Lock()
+        self._stub_policy = StubToolPolicy(model_config) if model_config.get("type") == "stub" else None
+        # 模型原始响应的调试输出（适配器 debug 段），默认关闭
+        self.debug = open_debug_channel(model_config.get("debug"), name, base_dir=base_dir)
+
+    def _session(self) -> requests.Session:
+        return CLIENT_POOL.session(self.model_config)
+
+    def _request_tokens(
+        self,
+        prompt_text: str,
+        system_prompt: Optional[str] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ) -> int:
+        if self.rate_limiter is None or not self.rate_limiter.counts_tokens:
+            return 0
+        tokens = estimate_tokens(prompt_text) + estimate_tokens(system_prompt or "")
+        if tools:
+            tokens += estimate_tokens(compact_json(tools))
+        return tokens + int(self.model_config.get("max_tokens") or 0)
+
+    @contextmanager
+    def _rate_limited(
+        self,
+        prompt_text: str,
+        system_prompt: Optional[str] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ):
+        if self.rate_limiter is None:
+            yield
+            return
+        with self.rate_limiter.acquire(self._request_tokens(prompt_text, system_prompt, tools)) as waited:
+            self._record_rate_limit_wait(waited)
+            yield
+
+    @asynccontextmanager
+    async def _arate_limited(
+        self,
+        prompt_text: str,
+        system_prompt: Optional[str] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ):
+        if self.rate_limiter is None:
+            yield
+            return
+        async with self.rate_limiter.aacquire(self._request_tokens(prompt_text, system_prompt, tools)) as waited:
+            self._record_rate_limit_wait(waited)
+            yield
+
+    def _record_rate_limit_wait(self, waited: float) -> None:
+        if self.metrics is not None:
+            self.metrics.record(f"rate_limit_wait.{self.name}", waited)
 
     def _build_messages(self, prompt_text: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
         messages: List[Dict[str, str]] = []
@@ -39,27 +378,25 @@ class ModelsAdapter:
         messages.append({"role": "user", "content": prompt_text})
         return messages
 
-    def _print_raw_tool_response(self, message: Any, provider: str) -> None:
-        try:
-            if hasattr(message, "model_dump"):
-                raw_message = message.model_dump(mode="json")
-            elif isinstance(message, dict):
-                raw_message = message
-            else:
-                raw_message = {"repr": repr(message)}
-            debug_payload = {
-                "provider": provider,
-                "model": self.model_config.get("model"),
-                "content": raw_message.get("content"),
-                "reasoning_content": raw_message.get("reasoning_content"),
-                "tool_calls": raw_message.get("tool_calls"),
-                "raw_message": raw_message,
-            }
-            print("\n========== RAW LLM TOOL RESPONSE ==========")
-            print(json.dumps(debug_payload, ensure_ascii=False, indent=2, default=str))
-            print("======== END RAW LLM TOOL RESPONSE ========\n", flush=True)
-        except Exception as exc:
-            print(f"[raw-llm-tool-response-print-failed] {exc}; message={message!r}", flush=True)
+    def _debug_tool_response(self, message: Any, provider: str) -> None:
+        """
+        按适配器的 debug 配置采样记录模型原始响应；未开启或未采中时不做任何序列化
+        """
+        if self.debug is None or not self.debug.sampled():
+            return
+        if hasattr(message, "model_dump"):
+            raw_message = message.model_dump(mode="json", exclude_none=True)
+        elif isinstance(message, dict):
+            raw_message = message
+        else:
+            raw_message = {"repr": repr(message)}
+        self.debug.emit({
+            "ts": time.time(),
+            "adapter": self.name,
+            "provider": provider,
+            "model": self.model_config.get("model"),
+            "message": raw_message,
+        })
 
     def call_model(self, prompt_text: str, system_prompt: Optional[str] = None) -> str:
         """
@@ -74,53 +411,350 @@ class ModelsAdapter:
         model_type = self.model_config.get("type", "openai")
         
         try:
-            if model_type == "openai":
-                return self._call_openai_model(prompt_text, system_prompt)
-            elif model_type == "http":
-                return self._call_http_model(prompt_text, system_prompt)
-            elif model_type == "bailian":
-                return self._call_bailian_model(prompt_text, system_prompt)
-            else:
-                raise ValueError(f"Unsupported model type: {model_type}")
+            with self._rate_limited(prompt_text, system_prompt):
+                if model_type == "openai":
+                    return self._call_openai_model(prompt_text, system_prompt)
+                elif model_type == "http":
+                    return self._call_http_model(prompt_text, system_prompt)
+                elif model_type == "bailian":
+                    return self._call_bailian_model(prompt_text, system_prompt)
+                elif model_type == "stub":
+                    return self._call_stub_model()
+                else:
+                    raise ValueError(f"Unsupported model type: {model_type}")
         except Exception as e:
             logger.error(f"Error calling model: {e}")
             return self._mock_response()  # 返回模拟响应作为默认值
 
+    async def acall_model(self, prompt_text: str, system_prompt: Optional[str] = None) -> str:
+        """
+        call_model 的 asyncio 版本，多个请求可共享同一个事件循环
+        
+        Args:
+            prompt_text: 提示词文本
+            
+        Returns:
+            模型的原始字符串输出
+        """
+        model_type = self.model_config.get("type", "openai")
+
+        try:
+            async with self._arate_limited(prompt_text, system_prompt):
+                if model_type == "openai":
+                    return await self._acall_openai_model(prompt_text, system_prompt)
+                elif model_type == "http":
+                    return await self._apost_model_request(prompt_text, system_prompt)
+                elif model_type == "bailian":
+                    return await self._apost_model_request(prompt_text, system_prompt, openai_compatible=True)
+                elif model_type == "stub":
+                    return await self._acall_stub_model()
+                else:
+                    raise ValueError(f"Unsupported model type: {model_type}")
+        except Exception as e:
+            logger.error(f"Error calling model: {e}")
+            return self._mock_response()
+
     def call_tool(
         self,
         prompt_text: str,
         tools: List[Dict[str, Any]],
         system_prompt: Optional[str] = None,
+        on_partial: Optional[PartialCallback] = None,
     ) -> Dict[str, Any]:
         """
         调用模型原生 tool calling，返回模型选择的工具名和参数。
         不再要求模型在普通文本中手写 JSON。
+
+        配置了 hedge 时在引擎注入的后台事件循环上发起对冲调用（未注入时用进程级事件循环）；
+        注入了响应缓存时按缓存模式读写。
+        配置了 stream 时流式接收响应，speech 参数每增长一段就以已到达的全文回调 on_partial。
+
+        对冲调用期间 on_partial、延迟统计（LATENCY_TRACKERS）和 metrics 在事件循环线程上被调用，
+        与并发模式下的异步调用处于同一线程；LatencyTracker、PerfRecorder 和 HedgeBudget 内部均加锁，
+        on_partial 须是线程安全的，且不能在该事件循环线程上调用本方法。
         """
+        cache_key = self._response_cache_key(prompt_text, tools, system_prompt)
+        cached = self._cached_tool_call(cache_key, tools)
+        if cached is not None:
+            return cached
+        if self.hedge_policy is not None:
+            loop = self.event_loop_provider() if self.event_loop_provider is not None else _hedge_loop()
+            result = loop.run(self._ahedged_tool(prompt_text, tools, system_prompt, on_partial))
+        else:
+            result = self._call_tool_with_retries(prompt_text, tools, system_prompt, on_partial)
+        return self._store_tool_call(cache_key, result)
+
+    def _call_tool_with_retries(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        deadline = self.retry_policy.call_deadline(self.phase_budget)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with self._rate_limited(prompt_text, system_prompt, tools):
+                    timeout = self.retry_policy.attempt_timeout(self.model_config.get("timeout", 60), deadline)
+                    result = self._dispatch_tool(prompt_text, tools, system_prompt, timeout, on_partial)
+                return self._record_tool_latency(result, started)
+            except Exception as e:
+                delay = self.retry_policy.next_delay(e, attempt, deadline)
+                if delay is None:
+                    return self._tool_failure_fallback(tools, e, attempt)
+                logger.warning(f"Retrying model tool call ({self.name}) in {delay:.2f}s after attempt {attempt}: {e}")
+                time.sleep(delay)
+
+    def _dispatch_tool(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str],
+        timeout: float,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
         model_type = self.model_config.get("type", "openai")
-        try:
-            if model_type == "openai" and OPENAI_AVAILABLE:
-                return self._call_openai_tool(prompt_text, tools, system_prompt)
-            return self._call_http_tool(prompt_text, tools, system_prompt)
-        except Exception as e:
-            logger.error(f"Error calling model tool: {e}")
-            return self._deterministic_tool_fallback(tools, "模型工具调用失败，系统按合法工具兜底")
+        if model_type == "stub":
+            return self._call_stub_tool(tools, on_partial)
+        if model_type == "openai" and OPENAI_AVAILABLE:
+            return self._call_openai_tool(prompt_text, tools, system_prompt, timeout, on_partial)
+        return self._call_http_tool(prompt_text, tools, system_prompt, timeout, on_partial)
 
-    def _call_openai_tool(
+    async def acall_tool(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        call_tool 的 asyncio 版本，基于异步 HTTP 客户端，不占用额外线程。
+        """
+        cache_key = self._response_cache_key(prompt_text, tools, system_prompt)
+        cached = self._cached_tool_call(cache_key, tools)
+        if cached is not None:
+            return cached
+        if self.hedge_policy is not None:
+            result = await self._ahedged_tool(prompt_text, tools, system_prompt, on_partial)
+        else:
+            result = await self._acall_tool_with_retries(prompt_text, tools, system_prompt, on_partial)
+        return self._store_tool_call(cache_key, result)
+
+    async def _acall_tool_with_retries(
         self,
         prompt_text: str,
         tools: List[Dict[str, Any]],
         system_prompt: Optional[str] = None,
+        on_partial: Optional[PartialCallback] = None,
     ) -> Dict[str, Any]:
-        http_client = None
-        if HTTPX_AVAILABLE and not self.model_config.get("trust_env_proxy", False):
-            http_client = httpx.Client(trust_env=False, timeout=self.model_config.get("timeout", 60))
-
-        client = OpenAI(
-            api_key=self.model_config.get("api_key"),
-            base_url=self.model_config.get("api_base"),
-            http_client=http_client,
+        started = time.perf_counter()
+        deadline = self.retry_policy.call_deadline(self.phase_budget)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with self._arate_limited(prompt_text, system_prompt, tools):
+                    timeout = self.retry_policy.attempt_timeout(self.model_config.get("timeout", 60), deadline)
+                    result = await asyncio.wait_for(
+                        self._adispatch_tool(prompt_text, tools, system_prompt, timeout, on_partial),
+                        timeout,
+                    )
+                return self._record_tool_latency(result, started)
+            except Exception as e:
+                delay = self.retry_policy.next_delay(e, attempt, deadline)
+                if delay is None:
+                    return self._tool_failure_fallback(tools, e, attempt)
+                logger.warning(f"Retrying model tool call ({self.name}) in {delay:.2f}s after attempt {attempt}: {e}")
+                await asyncio.sleep(delay)
+
+    async def _adispatch_tool(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str],
+        timeout: float,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
+        model_type = self.model_config.get("type", "openai")
+        if model_type == "stub":
+            return await self._acall_stub_tool(tools, on_partial)
+        if model_type == "openai" and OPENAI_AVAILABLE:
+            return await self._acall_openai_tool(prompt_text, tools, system_prompt, timeout, on_partial)
+        return await self._acall_http_tool(prompt_text, tools, system_prompt, timeout, on_partial)
+
+    async def _ahedged_tool(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        主请求超过历史延迟百分位仍未返回时，向备用适配器（未配置时为自身）再发一份；
+        先返回合法工具调用的一方胜出，另一方被取消。流式片段只来自主请求。
+        """
+        primary = asyncio.ensure_future(self._acall_tool_with_retries(prompt_text, tools, system_prompt, on_partial))
+        tasks = [primary]
+        try:
+            delay = self.hedge_policy.delay(self.latency)
+            if delay is None:
+                return await primary
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or (self.hedge_budget is not None and not self.hedge_budget.try_acquire()):
+                return await primary
+
+            target = self.hedge_backup or self
+            hedge = asyncio.ensure_future(target._acall_tool_with_retries(prompt_text, tools, system_prompt))
+            tasks.append(hedge)
+            self._observe(f"hedge_sent.{self.name}")
+            pending = set(tasks)
+            fallback = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if "fallback_reason" not in result:
+                        if task is hedge:
+                            if self.hedge_budget is not None:
+                                self.hedge_budget.record_win()
+                            self._observe(f"hedge_won.{self.name}")
+                        return result
+                    fallback = fallback or result
+            return fallback
+        finally:
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+
+    async def awarm_up(
+        self,
+        prompt_text: Optional[str] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        system_prompt: Optional[str] = None,
+    ) -> bool:
+        """
+        提前建立到服务商的 keep-alive 连接，供接下来的请求复用（须在发起该请求的事件循环上调用）
+
+        适配器配置 prompt_cache: true（服务商支持提示词前缀缓存）且给出 prompt_text 时，
+        改为发送一次 max_tokens=1 的同前缀请求，让服务商提前缓存 system prompt、tools 和提示词前缀。
+        预热失败只记 debug 日志，不影响后续请求。
+
+        Returns:
+            是否实际发出了预热请求
+        """
+        if self.model_config.get("type", "openai") == "stub":
+            return False
+        client = CLIENT_POOL.async_httpx_client(self.model_config)
+        if client is None:
+            return False
+        url, headers = self._tool_http_endpoint()
+        timeout = min(WARM_UP_TIMEOUT, float(self.model_config.get("timeout", 60)))
+        try:
+            if prompt_text is not None and self.model_config.get("prompt_cache", False):
+                data = self._tool_request_payload(prompt_text, tools or [], system_prompt)
+                data["max_tokens"] = 1
+                if not tools:
+                    data.pop("tools")
+                async with self._arate_limited(prompt_text, system_prompt, tools):
+                    await client.post(url, headers=headers, json=data, timeout=timeout)
+            else:
+                # 任意响应（包括 405）都说明连接已建立并回到连接池
+                await client.head(url, headers=headers, timeout=timeout)
+        except Exception as exc:
+            logger.debug(f"Warm-up request for {self.name} failed: {exc}")
+        return True
+
+    def _response_cache_key(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+    ) -> Optional[str]:
+        if self.response_cache is None:
+            return None
+        digest = response_cache_key(
+            self.model_config.get("model"),
+            self._build_messages(prompt_text, system_prompt),
+            tools,
+            self.model_config.get("temperature", 0.7),
         )
-        request_payload = {
+        # 同一适配器重复发出相同请求时按出现次序区分，回放时逐次还原原来的响应
+        with self._cache_lock:
+            occurrence = self._cache_occurrences.get(digest, 0)
+            self._cache_occurrences[digest] = occurrence + 1
+        return f"{digest}:{occurrence}"
+
+    def reset_cache_occurrences(self):
+        """
+        清空响应缓存键的出现次数计数，每局开始时调用，使回放从第 0 次重新对齐且计数不随局数增长
+        """
+        with self._cache_lock:
+            self._cache_occurrences.clear()
+
+    def _cached_tool_call(self, cache_key: Optional[str], tools: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if cache_key is None or not self.response_cache.reads:
+            return None
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            self._observe(f"response_cache_hit.{self.name}")
+            cached["usage"] = {"source": "cache"}
+            return cached
+        if self.response_cache.mode == "replay":
+            logger.warning(f"Replay cache miss for model tool call ({self.name})")
+            return self._deterministic_tool_fallback(tools, "回放缓存未命中，系统按合法工具兜底")
+        return None
+
+    def _store_tool_call(self, cache_key: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+        if cache_key is not None and self.response_cache.writes and "fallback_reason" not in result:
+            # 用量属于本次请求，缓存命中时不应重复计费
+            self.response_cache.put(cache_key, {key: value for key, value in result.items() if key != "usage"})
+        return result
+
+    def _record_tool_latency(self, result: Dict[str, Any], started: float) -> Dict[str, Any]:
+        if "fallback_reason" not in result:
+            self.latency.record(time.perf_counter() - started)
+        return result
+
+    def _with_usage(self, result: Dict[str, Any], usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        记录服务商报告的提示词 token 数和其中命中前缀缓存的部分（两者之比即该适配器的提示词缓存命中率），
+        并把归一化的用量挂在结果的 usage 字段上，供引擎写入用量账本；写入响应缓存前会去掉该字段
+        """
+        if not usage or usage.get("prompt_tokens") is None:
+            return result
+        cached = cached_prompt_tokens(usage)
+        self._observe(f"usage_prompt_tokens.{self.name}", usage["prompt_tokens"])
+        self._observe(f"usage_cached_tokens.{self.name}", cached)
+        result["usage"] = {
+            "prompt_tokens": int(usage["prompt_tokens"]),
+            "completion_tokens": int(usage.get("completion_tokens") or 0),
+            "cached_tokens": cached,
+        }
+        return result
+
+    def _observe(self, name: str, value: float = 1) -> None:
+        if self.metrics is not None:
+            self.metrics.observe(name, value)
+
+    def _tool_failure_fallback(self, tools: List[Dict[str, Any]], error: Exception, attempts: int) -> Dict[str, Any]:
+        if isinstance(error, DeadlineExceeded):
+            logger.error(f"Model tool call ({self.name}) out of time after {attempts - 1} attempt(s)")
+            return self._deterministic_tool_fallback(tools, "模型工具调用超出时间预算，系统按合法工具兜底")
+        logger.error(f"Error calling model tool ({self.name}) after {attempts} attempt(s): {error}")
+        return self._deterministic_tool_fallback(tools, "模型工具调用失败，系统按合法工具兜底")
+
+    def _tool_request_payload(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        payload = {
             "model": self.model_config.get("model"),
             "messages": self._build_messages(prompt_text, system_prompt),
             "temperature": self.model_config.get("temperature", 0.7),
@@ -128,26 +762,10 @@ class ModelsAdapter:
             "tools": tools,
         }
         if self.model_config.get("force_tool_choice", False):
-            request_payload["tool_choice"] = "required"
-        response = client.chat.completions.create(**request_payload)
-        message = response.choices[0].message
-        self._print_raw_tool_response(message, "openai-compatible-sdk")
-        tool_calls = getattr(message, "tool_calls", None) or []
-        if not tool_calls:
-            return self._deterministic_tool_fallback(tools, "模型未返回原生工具调用")
-        call = tool_calls[0]
-        function = call.function
-        return {
-            "name": function.name,
-            "arguments": self._load_tool_arguments(function.arguments),
-        }
+            payload["tool_choice"] = "required"
+        return payload
 
-    def _call_http_tool(
-        self,
-        prompt_text: str,
-        tools: List[Dict[str, Any]],
-        system_prompt: Optional[str] = None,
-    ) -> Dict[str, Any]:
+    def _tool_http_endpoint(self) -> Tuple[str, Dict[str, str]]:
         headers = {
             "Authorization": f"Bearer {self.model_config.get('api_key')}",
             "Content-Type": "application/json",
@@ -163,24 +781,31 @@ class ModelsAdapter:
             url = api_base + "/chat/completions"
         else:
             url = api_base + "/v1/chat/completions"
+        return url, headers
 
-        data = {
-            "model": self.model_config.get("model"),
-            "messages": self._build_messages(prompt_text, system_prompt),
-            "temperature": self.model_config.get("temperature", 0.7),
-            "max_tokens": self.model_config.get("max_tokens", 500),
-            "tools": tools,
+    def _parse_sdk_tool_message(self, message: Any, tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self._debug_tool_response(message, "openai-compatible-sdk")
+        tool_calls = getattr(message, "tool_calls", None) or []
+        if not tool_calls:
+            return self._deterministic_tool_fallback(tools, "模型未返回原生工具调用")
+        call = tool_calls[0]
+        function = call.function
+        return {
+            "name": function.name,
+            "arguments": self._load_tool_arguments(function.arguments),
         }
-        if self.model_config.get("force_tool_choice", False):
-            data["tool_choice"] = "required"
-        response = requests.post(url, headers=headers, json=data, timeout=self.model_config.get("timeout", 60))
-        response.raise_for_status()
-        result = response.json()
+
+    def _parse_http_tool_result(self, result: Dict[str, Any], tools: List[Dict[str, Any]]) -> Dict[str, Any]:
         choices = result.get("choices") or []
         if not choices:
             raise ValueError("Tool call response has no choices")
-        message = choices[0].get("message") or {}
-        self._print_raw_tool_response(message, "openai-compatible-http")
+        return self._with_usage(
+            self._parse_tool_message(choices[0].get("message") or {}, tools, "openai-compatible-http"),
+            result.get("usage"),
+        )
+
+    def _parse_tool_message(self, message: Dict[str, Any], tools: List[Dict[str, Any]], provider: str) -> Dict[str, Any]:
+        self._debug_tool_response(message, provider)
         tool_calls = message.get("tool_calls") or []
         if not tool_calls:
             return self._deterministic_tool_fallback(tools, "模型未返回原生工具调用")
@@ -190,6 +815,147 @@ class ModelsAdapter:
             "arguments": self._load_tool_arguments(function.get("arguments")),
         }
 
+    def _call_openai_tool(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+        timeout: Optional[float] = None,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
+        # 重试由 RetryPolicy 统一负责，关闭 SDK 自带的重试
+        client = CLIENT_POOL.openai_client(self.model_config).with_options(max_retries=0)
+        request_payload = self._tool_request_payload(prompt_text, tools, system_prompt)
+        timeout = timeout or self.model_config.get("timeout", 60)
+        if self.model_config.get("stream", False):
+            parser = ToolCallStreamParser(on_partial)
+            for chunk in client.chat.completions.create(**request_payload, timeout=timeout, **STREAM_OPTIONS):
+                parser.feed_chunk(chunk.model_dump(exclude_none=True))
+            return self._with_usage(self._parse_tool_message(parser.message(), tools, "openai-sdk-stream"), parser.usage)
+        response = client.chat.completions.create(**request_payload, timeout=timeout)
+        return self._with_usage(
+            self._parse_sdk_tool_message(response.choices[0].message, tools),
+            response.usage.model_dump() if response.usage else None,
+        )
+
+    async def _acall_openai_tool(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+        timeout: Optional[float] = None,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
+        client = CLIENT_POOL.async_openai_client(self.model_config).with_options(max_retries=0)
+        request_payload = self._tool_request_payload(prompt_text, tools, system_prompt)
+        timeout = timeout or self.model_config.get("timeout", 60)
+        if self.model_config.get("stream", False):
+            parser = ToolCallStreamParser(on_partial)
+            stream = await client.chat.completions.create(**request_payload, timeout=timeout, **STREAM_OPTIONS)
+            async for chunk in stream:
+                parser.feed_chunk(chunk.model_dump(exclude_none=True))
+            return self._with_usage(self._parse_tool_message(parser.message(), tools, "openai-sdk-stream"), parser.usage)
+        response = await client.chat.completions.create(**request_payload, timeout=timeout)
+        return self._with_usage(
+            self._parse_sdk_tool_message(response.choices[0].message, tools),
+            response.usage.model_dump() if response.usage else None,
+        )
+
+    def _call_http_tool(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+        timeout: Optional[float] = None,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
+        url, headers = self._tool_http_endpoint()
+        data = self._tool_request_payload(prompt_text, tools, system_prompt)
+        timeout = timeout or self.model_config.get("timeout", 60)
+        if self.model_config.get("stream", False):
+            data.update(STREAM_OPTIONS)
+            parser = ToolCallStreamParser(on_partial)
+            with self._session().post(url, headers=headers, json=data, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+                parser.feed_sse_lines(response.iter_lines())
+            return self._with_usage(self._parse_tool_message(parser.message(), tools, "openai-compatible-sse"), parser.usage)
+        response = self._session().post(url, headers=headers, json=data, timeout=timeout)
+        response.raise_for_status()
+        return self._parse_http_tool_result(response.json(), tools)
+
+    async def _acall_http_tool(
+        self,
+        prompt_text: str,
+        tools: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+        timeout: Optional[float] = None,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
+        client = CLIENT_POOL.async_httpx_client(self.model_config)
+        if client is None:
+            return await asyncio.to_thread(self._call_http_tool, prompt_text, tools, system_prompt, timeout, on_partial)
+        url, headers = self._tool_http_endpoint()
+        data = self._tool_request_payload(prompt_text, tools, system_prompt)
+        timeout = timeout or self.model_config.get("timeout", 60)
+        if self.model_config.get("stream", False):
+            data.update(STREAM_OPTIONS)
+            parser = ToolCallStreamParser(on_partial)
+            async with client.stream("POST", url, headers=headers, json=data, timeout=timeout) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not parser.feed_sse_line(line):
+                        break
+            return self._with_usage(self._parse_tool_message(parser.message(), tools, "openai-compatible-sse"), parser.usage)
+        response = await client.post(url, headers=headers, json=data, timeout=timeout)
+        response.raise_for_status()
+        return self._parse_http_tool_result(response.json(), tools)
+
+    def _call_stub_tool(self, tools: List[Dict[str, Any]], on_partial: Optional[PartialCallback] = None) -> Dict[str, Any]:
+        delay = self._stub_policy.latency()
+        result = self._stub_policy.choose_tool(tools)
+        partials = self._stub_partials(result, on_partial)
+        for prefix in partials:
+            if delay:
+                time.sleep(delay / (len(partials) + 1))
+            on_partial(prefix)
+        if delay:
+            time.sleep(delay / (len(partials) + 1))
+        return result
+
+    async def _acall_stub_tool(self, tools: List[Dict[str, Any]], on_partial: Optional[PartialCallback] = None) -> Dict[str, Any]:
+        delay = self._stub_policy.latency()
+        result = self._stub_policy.choose_tool(tools)
+        partials = self._stub_partials(result, on_partial)
+        for prefix in partials:
+            if delay:
+                await asyncio.sleep(delay / (len(partials) + 1))
+            on_partial(prefix)
+        if delay:
+            await asyncio.sleep(delay / (len(partials) + 1))
+        return result
+
+    def _stub_partials(self, result: Dict[str, Any], on_partial: Optional[PartialCallback]) -> List[str]:
+        """
+        桩模型开启 stream 时，把发言拆成逐步变长的前缀，模拟流式到达
+        """
+        speech = (result.get("arguments") or {}).get("speech")
+        if on_partial is None or not speech or not self.model_config.get("stream", False):
+            return []
+        step = max(1, -(-len(speech) // STUB_STREAM_CHUNKS))
+        return [speech[:end] for end in range(step, len(speech) + step, step)]
+
+    def _call_stub_model(self) -> str:
+        delay = self._stub_policy.latency()
+        if delay:
+            time.sleep(delay)
+        return self._stub_policy.choose_text()
+
+    async def _acall_stub_model(self) -> str:
+        delay = self._stub_policy.latency()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._stub_policy.choose_text()
+
     def _load_tool_arguments(self, raw_arguments: Any) -> Dict[str, Any]:
         if isinstance(raw_arguments, dict):
             return raw_arguments
@@ -227,6 +993,14 @@ class ModelsAdapter:
             "fallback_reason": reason,
         }
 
+    def _model_request_kwargs(self, prompt_text: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "model": self.model_config.get("model"),
+            "messages": self._build_messages(prompt_text, system_prompt),
+            "temperature": self.model_config.get("temperature", 0.7),
+            "max_tokens": self.model_config.get("max_tokens", 500),
+        }
+
     def _call_openai_model(self, prompt_text: str, system_prompt: Optional[str] = None) -> str:
         """
         调用OpenAI风格的模型
@@ -242,35 +1016,14 @@ class ModelsAdapter:
             return self._call_http_model(prompt_text, system_prompt)
         
         try:
-            # OpenAI/httpx will otherwise read ALL_PROXY/HTTP_PROXY from the shell.
-            # Some local proxy tools export socks://, which httpx does not accept.
-            # Default to an explicit no-env client; opt back in with trust_env_proxy: true.
-            http_client = None
-            if HTTPX_AVAILABLE and not self.model_config.get("trust_env_proxy", False):
-                http_client = httpx.Client(trust_env=False, timeout=self.model_config.get("timeout", 60))
-
-            client = OpenAI(
-                api_key=self.model_config.get("api_key"),
-                base_url=self.model_config.get("api_base"),
-                http_client=http_client
-            )
-            
-            response = client.chat.completions.create(
-                model=self.model_config.get("model"),
-                messages=self._build_messages(prompt_text, system_prompt),
-                temperature=self.model_config.get("temperature", 0.7),
-                max_tokens=self.model_config.get("max_tokens", 500)
-            )
+            client = CLIENT_POOL.openai_client(self.model_config)
+
+            response = client.chat.completions.create(**self._model_request_kwargs(prompt_text, system_prompt))
             
             content = response.choices[0].message.content
             if not content:
                 logger.warning(f"Empty response from model, retrying once...")
-                response = client.chat.completions.create(
-                    model=self.model_config.get("model"),
-                    messages=self._build_messages(prompt_text, system_prompt),
-                    temperature=self.model_config.get("temperature", 0.7),
-                    max_tokens=self.model_config.get("max_tokens", 500),
-                )
+                response = client.chat.completions.create(**self._model_request_kwargs(prompt_text, system_prompt))
                 content = response.choices[0].message.content
                 if not content:
                     raise ValueError("Model returned empty response after retry")
@@ -279,9 +1032,31 @@ class ModelsAdapter:
             logger.error(f"Error calling OpenAI model: {e}")
             raise  # 重新抛出异常而不是返回模拟响应
 
+    async def _acall_openai_model(self, prompt_text: str, system_prompt: Optional[str] = None) -> str:
+        if not OPENAI_AVAILABLE:
+            logger.warning("OpenAI library not available, falling back to HTTP request")
+            return await self._apost_model_request(prompt_text, system_prompt)
+
+        try:
+            client = CLIENT_POOL.async_openai_client(self.model_config)
+
+            response = await client.chat.completions.create(**self._model_request_kwargs(prompt_text, system_prompt))
+
+            content = response.choices[0].message.content
+            if not content:
+                logger.warning(f"Empty response from model, retrying once...")
+                response = await client.chat.completions.create(**self._model_request_kwargs(prompt_text, system_prompt))
+                content = response.choices[0].message.content
+                if not content:
+                    raise ValueError("Model returned empty response after retry")
+            return content
+        except Exception as e:
+            logger.error(f"Error calling OpenAI model: {e}")
+            raise
+
     def _call_http_model(self, prompt_text: str, system_prompt: Optional[str] = None) -> str:
         """
-        调用HTTP接口的模型
+        调用HTTP接口的模型（DeepSeek、豆包，其余走OpenAI兼容接口）
         
         Args:
             prompt_text: 提示词文本
@@ -290,76 +1065,7 @@ class ModelsAdapter:
             模型的原始字符串输出
         """
         try:
-            headers = {
-                "Authorization": f"Bearer {self.model_config.get('api_key')}"
-            }
-            
-            api_base = self.model_config.get("api_base", "")
-            if "deepseek" in api_base:
-                headers["Content-Type"] = "application/json"
-                data = {
-                    "model": self.model_config.get("model"),
-                    "messages": self._build_messages(prompt_text, system_prompt),
-                    "temperature": self.model_config.get("temperature", 0.7),
-                    "max_tokens": self.model_config.get("max_tokens", 500)
-                }
-                
-                api_base = api_base.rstrip('/')
-                if not api_base.startswith("http"):
-                    api_base = "https://" + api_base
-                
-                # 确保URL格式正确
-                if not api_base.endswith("/v1"):
-                    url = api_base.rstrip('/') + "/v1/chat/completions"
-                else:
-                    url = api_base.rstrip('/') + "/chat/completions"
-                
-                response = requests.post(
-                    url,
-                    headers=headers,
-                    json=data,
-                    timeout=30
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0]["message"]["content"]
-                else:
-                    logger.warning(f"Unexpected response format from DeepSeek: {result}")
-                    raise ValueError("Unexpected response format from DeepSeek")
-            elif "volces.com" in api_base:
-                # 豆包(Doubao) API处理
-                headers["Content-Type"] = "application/json"
-                data = {
-                    "model": self.model_config.get("model"),
-                    "messages": self._build_messages(prompt_text, system_prompt),
-                    "temperature": self.model_config.get("temperature", 0.7),
-                    "max_tokens": self.model_config.get("max_tokens", 500)
-                }
-                
-                if not api_base.startswith("http"):
-                    api_base = "https://" + api_base
-                    
-                url = api_base.rstrip('/') + "/chat/completions"
-                
-                response = requests.post(
-                    url,
-                    headers=headers,
-                    json=data,
-                    timeout=30
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0]["message"]["content"]
-                else:
-                    logger.warning(f"Unexpected response format from Doubao: {result}")
-                    raise ValueError("Unexpected response format from Doubao")
-            else:
-                # 默认的HTTP调用方式
-                return self._call_openai_compatible_model(prompt_text, system_prompt)
+            return self._post_model_request(prompt_text, system_prompt)
         except Exception as e:
             logger.error(f"Error calling HTTP model: {e}")
             raise  # 重新抛出异常而不是返回模拟响应
@@ -387,76 +1093,85 @@ class ModelsAdapter:
             模型的原始字符串输出
         """
         try:
-            headers = {
-                "Authorization": f"Bearer {self.model_config.get('api_key')}"
-            }
-            
-            # 检查是否是阿里云百炼平台
-            if "dashscope" in self.model_config.get("api_base", ""):
-                headers["Content-Type"] = "application/json"
-                headers["X-DashScope-SSE"] = "enable"
-                data = {
-                    "model": self.model_config.get("model"),
-                    "messages": self._build_messages(prompt_text, system_prompt),
-                    "temperature": self.model_config.get("temperature", 0.2),
-                    "max_tokens": self.model_config.get("max_tokens", 500)
-                }
-                
-                api_base = self.model_config.get("api_base", "").rstrip('/')
-                if not api_base.startswith("http"):
-                    api_base = "https://" + api_base
-                
-                # 百炼平台使用标准的/chat/completions端点
-                url = api_base + "/chat/completions"
-                
-                response = requests.post(
-                    url,
-                    headers=headers,
-                    json=data,
-                    timeout=60
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0 and "message" in result["choices"][0]:
-                    return result["choices"][0]["message"]["content"]
-                else:
-                    logger.warning(f"Unexpected response format from DashScope: {result}")
-                    raise ValueError("Unexpected response format from DashScope")
-            else:
-                # 标准的OpenAI兼容API
-                headers["Content-Type"] = "application/json"
-                data = {
-                    "model": self.model_config.get("model"),
-                    "messages": self._build_messages(prompt_text, system_prompt),
-                    "temperature": self.model_config.get("temperature", 0.7),
-                    "max_tokens": self.model_config.get("max_tokens", 500)
-                }
-                
-                api_base = self.model_config.get("api_base", "").rstrip('/')
-                if not api_base.startswith("http"):
-                    api_base = "https://" + api_base
-                    
-                # 确保URL格式正确
-                url = api_base.rstrip('/') + "/v1/chat/completions"
-                
-                response = requests.post(
-                    url,
-                    headers=headers,
-                    json=data,
-                    timeout=30
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0]["message"]["content"]
-                else:
-                    logger.warning(f"Unexpected response format from OpenAI-compatible API: {result}")
-                    raise ValueError("Unexpected response format from OpenAI-compatible API")
+            return self._post_model_request(prompt_text, system_prompt, openai_compatible=True)
         except Exception as e:
             logger.error(f"Error calling OpenAI compatible model: {e}")
             raise  # 重新抛出异常而不是返回模拟响应
+
+    def _model_http_request(
+        self,
+        prompt_text: str,
+        system_prompt: Optional[str] = None,
+        openai_compatible: bool = False,
+    ) -> Tuple[str, Dict[str, str], Dict[str, Any], int, str]:
+        """
+        构造纯文本调用的 HTTP 请求
+        
+        Args:
+            prompt_text: 提示词文本
+            openai_compatible: 为 True 时跳过 DeepSeek/豆包 专用分支
+            
+        Returns:
+            (url, headers, data, timeout, 服务商名称)
+        """
+        api_base = self.model_config.get("api_base", "")
+        headers = {
+            "Authorization": f"Bearer {self.model_config.get('api_key')}",
+            "Content-Type": "application/json",
+        }
+        data = self._model_request_kwargs(prompt_text, system_prompt)
+
+        base_url = api_base.rstrip('/')
+        if not base_url.startswith("http"):
+            base_url = "https://" + base_url
+
+        if not openai_compatible and "deepseek" in api_base:
+            # 确保URL格式正确
+            if not base_url.endswith("/v1"):
+                return base_url + "/v1/chat/completions", headers, data, 30, "DeepSeek"
+            return base_url + "/chat/completions", headers, data, 30, "DeepSeek"
+        if not openai_compatible and "volces.com" in api_base:
+            # 豆包(Doubao) API处理
+            return base_url + "/chat/completions", headers, data, 30, "Doubao"
+        if "dashscope" in api_base:
+            # 百炼平台使用标准的/chat/completions端点
+            headers["X-DashScope-SSE"] = "enable"
+            data["temperature"] = self.model_config.get("temperature", 0.2)
+            return base_url + "/chat/completions", headers, data, 60, "DashScope"
+        # 标准的OpenAI兼容API
+        return base_url + "/v1/chat/completions", headers, data, 30, "OpenAI-compatible API"
+
+    def _read_model_content(self, result: Dict[str, Any], provider: str) -> str:
+        choices = result.get("choices") or []
+        if choices and "message" in choices[0]:
+            return choices[0]["message"]["content"]
+        logger.warning(f"Unexpected response format from {provider}: {result}")
+        raise ValueError(f"Unexpected response format from {provider}")
+
+    def _post_model_request(
+        self,
+        prompt_text: str,
+        system_prompt: Optional[str] = None,
+        openai_compatible: bool = False,
+    ) -> str:
+        url, headers, data, timeout, provider = self._model_http_request(prompt_text, system_prompt, openai_compatible)
+        response = self._session().post(url, headers=headers, json=data, timeout=timeout)
+        response.raise_for_status()
+        return self._read_model_content(response.json(), provider)
+
+    async def _apost_model_request(
+        self,
+        prompt_text: str,
+        system_prompt: Optional[str] = None,
+        openai_compatible: bool = False,
+    ) -> str:
+        client = CLIENT_POOL.async_httpx_client(self.model_config)
+        if client is None:
+            return await asyncio.to_thread(self._post_model_request, prompt_text, system_prompt, openai_compatible)
+        url, headers, data, timeout, provider = self._model_http_request(prompt_text, system_prompt, openai_compatible)
+        response = await client.post(url, headers=headers, json=data, timeout=timeout)
+        response.raise_for_status()
+        return self._read_model_content(response.json(), provider)
     
     def _mock_response(self) -> str:
         """
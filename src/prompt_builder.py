@@ -0,0 +1,85 @@
+"""
+提示词组装工具：紧凑序列化、按状态指纹缓存的段落和 token 估算
+"""
+
+import json
+import math
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数
+
+    中日韩字符大致按 1 字 1 token 计，其余字符按 4 字符 1 token 计；中日韩字符在 UTF-8 中占 3 字节，
+    由编码后多出的字节数即可算出其数量，不必逐字符判断。只用于预算控制和成本观测，
+    不追求与具体模型的分词器完全一致。
+
+    Args:
+        text: 待估算文本
+
+    Returns:
+        估算的 token 数
+    """
+    if not text:
+        return 0
+    cjk = (len(text.encode("utf-8")) - len(text)) // 2
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def compact_json(value: Any) -> str:
+    """
+    无缩进、无多余空格的 JSON 序列化
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def join_json_fields(fields: Iterable[Tuple[str, str]]) -> str:
+    """
+    把已经序列化好的字段值拼成一个 JSON 对象，缓存的片段不必重新序列化
+
+    Args:
+        fields: (字段名, 已序列化的 JSON 值) 序列
+    """
+    return "{" + ",".join(f"{compact_json(key)}:{value}" for key, value in fields) + "}"
+
+
+class SectionCache:
+    """
+    按状态指纹缓存的提示词段落
+
+    每个 key 只保留最近一次的结果，指纹变化时重建，因此缓存大小以“Agent 数 × 段落数”为上限。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sections: Dict[Hashable, Tuple[Hashable, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, fingerprint: Optional[Hashable], build: Callable[[], str]) -> str:
+        """
+        取出段落，指纹不一致时调用 build 重建
+
+        Args:
+            key: 段落标识，如 ("memory", agent_id, window)
+            fingerprint: 段落依赖状态的指纹；为 None 时不缓存
+            build: 重建段落的函数
+        """
+        if fingerprint is None:
+            return build()
+        with self._lock:
+            cached = self._sections.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                self.hits += 1
+                return cached[1]
+        text = build()
+        with self._lock:
+            self._sections[key] = (fingerprint, text)
+            self.misses += 1
+        return text
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sections.clear()
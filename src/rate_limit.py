@@ -0,0 +1,236 @@
+"""
+按适配器限流：令牌桶（每分钟请求数 / 每分钟 token 数）加最大在途请求数
+
+同一进程内的所有 Agent 和对局共享一份限流器，按 models.adapters 中的适配器名称区分。
+同步调用和事件循环上的异步调用在同一套计数上排队，等待时间计入 PerfRecorder。
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional
+
+try:
+    from metrics import PerfRecorder
+except ImportError:
+    from .metrics import PerfRecorder
+
+
+class TokenBucket:
+    """
+    预约式令牌桶：余量不足时直接扣成负数并返回需要等待的秒数，先到先得
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        预约 amount 个令牌
+
+        Returns:
+            调用方需要等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class _SlotWaiter:
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self) -> bool:
+        if self.loop is None:
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self._set_result)
+        except RuntimeError:
+            # 等待方的事件循环已关闭，把名额交给下一个等待者
+            return False
+        return True
+
+    def _set_result(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class RateLimiter:
+    """
+    单个适配器的限流器
+
+    Attributes:
+        name: 适配器名称
+        rpm: 每分钟请求数上限
+        tpm: 每分钟 token 数上限（按提示词估算）
+        max_concurrency: 最大在途请求数
+        metrics: 排队等待耗时，名称为 rate_limit_wait.{name}
+    """
+
+    def __init__(self, name: str, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 max_concurrency: Optional[int] = None):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.metrics = PerfRecorder()
+        self._requests = TokenBucket(rpm) if rpm else None
+        self._tokens = TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: Deque[_SlotWaiter] = deque()
+
+    @property
+    def counts_tokens(self) -> bool:
+        return self._tokens is not None
+
+    @contextmanager
+    def acquire(self, tokens: int = 0) -> Iterator[float]:
+        """
+        同步占用一个请求名额，返回排队等待的秒数
+        """
+        started = time.perf_counter()
+        waiter = self._enqueue(None)
+        if waiter is not None:
+            waiter.event.wait()
+        try:
+            delay = self._reserve(tokens)
+            if delay > 0:
+                time.sleep(delay)
+            waited = self._record_wait(started)
+            yield waited
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aacquire(self, tokens: int = 0) -> AsyncIterator[float]:
+        """
+        acquire 的 asyncio 版本，排队期间不阻塞事件循环
+        """
+        started = time.perf_counter()
+        waiter = self._enqueue(asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+        try:
+            delay = self._reserve(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            waited = self._record_wait(started)
+            yield waited
+        finally:
+            self._release()
+
+    def _enqueue(self, loop: Optional[asyncio.AbstractEventLoop]) -> Optional[_SlotWaiter]:
+        with self._lock:
+            if self.max_concurrency is None or (self._in_flight < self.max_concurrency and not self._waiters):
+                self._in_flight += 1
+                return None
+            waiter = _SlotWaiter(loop)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter: _SlotWaiter) -> None:
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                return
+        # 名额已经移交给被取消的等待者，归还给下一个
+        self._release()
+
+    def _release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                # 名额直接移交给队首等待者，在途计数不变
+                if self._waiters.popleft().wake():
+                    return
+            self._in_flight -= 1
+
+    def _reserve(self, tokens: int) -> float:
+        delay = 0.0
+        if self._requests is not None:
+            delay = max(delay, self._requests.reserve(1))
+        if self._tokens is not None and tokens > 0:
+            delay = max(delay, self._tokens.reserve(tokens))
+        return delay
+
+    def _record_wait(self, started: float) -> float:
+        waited = time.perf_counter() - started
+        self.metrics.record(f"rate_limit_wait.{self.name}", waited)
+        return waited
+
+
+class RateLimiterRegistry:
+    """
+    进程级限流器注册表，按适配器名称共享
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def get(self, name: Optional[str], model_config: Dict[str, Any]) -> Optional[RateLimiter]:
+        """
+        取出适配器的限流器；适配器未配置 rpm / tpm / max_concurrency 时返回 None
+
+        同名适配器以第一次注册时的配置为准。
+        """
+        rpm = model_config.get("rpm")
+        tpm = model_config.get("tpm")
+        max_concurrency = model_config.get("max_concurrency")
+        if not name or not (rpm or tpm or max_concurrency):
+            return None
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                limiter = RateLimiter(
+                    name,
+                    rpm=float(rpm) if rpm else None,
+                    tpm=float(tpm) if tpm else None,
+                    max_concurrency=int(max_concurrency) if max_concurrency else None,
+                )
+                self._limiters[name] = limiter
+            return limiter
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        汇总所有限流器的排队等待耗时
+        """
+        combined = PerfRecorder()
+        with self._lock:
+            limiters = list(self._limiters.values())
+        for limiter in limiters:
+            combined.merge(limiter.metrics)
+        return combined.summary()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._limiters = {}
+
+    def _reset_after_fork(self) -> None:
+        # 子进程各自限流，不继承父进程的桶余量和在途计数
+        self._lock = threading.Lock()
+        self._limiters = {}
+
+
+RATE_LIMITERS = RateLimiterRegistry()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=RATE_LIMITERS._reset_after_fork)
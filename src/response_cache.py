@@ -0,0 +1,198 @@
+"""
+按内容寻址的模型响应缓存（SQLite）
+
+键为 (model, messages, tools, temperature) 的 sha256，支持三种模式：
+    record        每次都请求模型，并把结果写入缓存
+    replay        只读缓存，未命中时不访问网络，直接走兜底
+    read-through  先查缓存，未命中时请求模型并写入
+缓存总大小超过上限时按最近访问时间淘汰。命中时只在内存中记下访问时间，
+在下一次写入、累计到 ACCESS_FLUSH_SIZE 条或关闭时批量写回，回放时读缓存不产生写事务。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+CACHE_MODES = ("off", "record", "replay", "read-through")
+DEFAULT_MAX_SIZE_MB = 512
+# 缓冲的访问时间累计到这么多条时写回一次
+ACCESS_FLUSH_SIZE = 1000
+
+
+def response_cache_key(
+    model: Optional[str],
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Dict[str, Any]]],
+    temperature: Optional[float],
+) -> str:
+    """
+    计算请求内容的 sha256 摘要
+    """
+    payload = json.dumps(
+        {"model": model, "messages": messages, "tools": tools, "temperature": temperature},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite 响应缓存，线程安全；多个进程可以同时打开同一个文件
+
+    缓存总大小在打开时统计一次，之后随本进程的写入和淘汰增减；其他进程同时写入的部分
+    要到本进程下次打开时才计入。
+
+    Attributes:
+        path: 数据库文件路径
+        mode: 缓存模式，见 CACHE_MODES
+        max_bytes: 缓存值总大小上限（字节）
+    """
+
+    def __init__(self, path: str, mode: str = "read-through", max_size_mb: float = DEFAULT_MAX_SIZE_MB):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unsupported response cache mode: {mode}; expected one of {CACHE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = int(float(max_size_mb) * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # 缓存值总大小（字节），随连接打开时加载
+        self._total = 0
+        # 尚未写回的命中访问时间：key -> last_access
+        self._pending_access: Dict[str, float] = {}
+
+    @property
+    def reads(self) -> bool:
+        return self.mode in ("replay", "read-through")
+
+    @property
+    def writes(self) -> bool:
+        return self.mode in ("record", "read-through")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._pending_access[key] = time.time()
+            if len(self._pending_access) >= ACCESS_FLUSH_SIZE:
+                self._flush_access(conn)
+                conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        size = len(encoded.encode("utf-8"))
+        with self._lock:
+            conn = self._connection()
+            self._flush_access(conn)
+            previous = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, size, now, now),
+            )
+            self._total += size - (previous[0] if previous else 0)
+            self._evict(conn)
+            conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._flush_access(self._conn)
+                self._conn.commit()
+                self._conn.close()
+            self._conn = None
+            self._pending_access.clear()
+
+    def _connection(self) -> sqlite3.Connection:
+        # 连接不能跨 fork 使用，子进程按需重新打开
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            conn.commit()
+            self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            # fork 前缓冲的访问时间属于父进程
+            self._pending_access.clear()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _flush_access(self, conn: sqlite3.Connection) -> None:
+        if not self._pending_access:
+            return
+        conn.executemany(
+            "UPDATE responses SET last_access = ? WHERE key = ?",
+            [(accessed, key) for key, accessed in self._pending_access.items()],
+        )
+        self._pending_access.clear()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self._total <= self.max_bytes:
+            return
+        excess = self._total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self._total -= freed
+
+
+_CACHES: Dict[Tuple[str, str], ResponseCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def open_response_cache(cache_config: Optional[Dict[str, Any]], base_dir: str = "") -> Optional[ResponseCache]:
+    """
+    按 models.cache 配置打开缓存；同一进程内相同路径和模式共享一个实例
+
+    Args:
+        cache_config: {"mode": ..., "path": ..., "max_size_mb": ...}；mode 为空或 off 时返回 None
+        base_dir: 相对路径的基准目录，通常是配置文件所在目录
+    """
+    mode = (cache_config or {}).get("mode")
+    # YAML 会把不带引号的 off 解析成 False
+    if not mode or mode == "off":
+        return None
+    path = os.path.abspath(os.path.join(base_dir, cache_config.get("path", "cache/responses.sqlite")))
+    key = (path, mode)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = ResponseCache(
+                path,
+                mode=mode,
+                max_size_mb=cache_config.get("max_size_mb", DEFAULT_MAX_SIZE_MB),
+            )
+            _CACHES[key] = cache
+        return cache
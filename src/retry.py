@@ -0,0 +1,160 @@
+"""
+模型调用重试策略：可重试错误判定、带抖动的指数退避、单次调用截止时间和阶段时间预算
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+_RETRYABLE_EXCEPTIONS = [TimeoutError, ConnectionError, asyncio.TimeoutError, requests.Timeout, requests.ConnectionError]
+if httpx is not None:
+    _RETRYABLE_EXCEPTIONS.append(httpx.TransportError)
+if openai is not None:
+    _RETRYABLE_EXCEPTIONS.append(openai.APIConnectionError)
+RETRYABLE_EXCEPTIONS = tuple(_RETRYABLE_EXCEPTIONS)
+
+
+class DeadlineExceeded(Exception):
+    """
+    单次调用截止时间或阶段时间预算已用完
+    """
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    单个适配器的重试策略，读取适配器配置中的 retry 段
+
+    Attributes:
+        max_attempts: 最多尝试次数（含第一次）
+        base_delay: 第一次重试的退避上限（秒），之后每次翻倍
+        max_delay: 单次退避上限（秒）
+        deadline: 单次调用（含全部重试）的截止时间（秒），None 表示不限
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 deadline: Optional[float] = 90.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.deadline = float(deadline) if deadline else None
+        # 独立的随机源：退避抖动不能消耗全局 random，否则带种子的对局不可复现
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, model_config: Dict[str, Any]) -> "RetryPolicy":
+        retry_config = model_config.get("retry") or {}
+        return cls(
+            max_attempts=retry_config.get("max_attempts", 3),
+            base_delay=retry_config.get("base_delay", 0.5),
+            max_delay=retry_config.get("max_delay", 8.0),
+            deadline=retry_config.get("deadline", 90.0),
+        )
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        if isinstance(exc, DeadlineExceeded):
+            return False
+        status = _status_code(exc)
+        if status is not None:
+            return status in RETRYABLE_STATUS_CODES
+        return isinstance(exc, RETRYABLE_EXCEPTIONS)
+
+    def call_deadline(self, phase_budget: Optional["PhaseBudget"] = None) -> Optional[float]:
+        """
+        本次调用的截止时刻（time.monotonic），取单次调用截止时间与阶段预算中较早者
+        """
+        deadlines = []
+        if self.deadline is not None:
+            deadlines.append(time.monotonic() + self.deadline)
+        if phase_budget is not None and phase_budget.deadline is not None:
+            deadlines.append(phase_budget.deadline)
+        return min(deadlines) if deadlines else None
+
+    def attempt_timeout(self, timeout: float, deadline: Optional[float]) -> float:
+        """
+        单次请求的超时：配置的超时与剩余时间中较小者；已无剩余时间时抛出 DeadlineExceeded
+        """
+        if deadline is None:
+            return timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("model call deadline exceeded")
+        return min(timeout, remaining)
+
+    def next_delay(self, exc: BaseException, attempt: int, deadline: Optional[float]) -> Optional[float]:
+        """
+        第 attempt 次尝试失败后的退避秒数；不应再重试时返回 None
+
+        Args:
+            exc: 本次尝试抛出的异常
+            attempt: 已完成的尝试次数（从 1 开始）
+            deadline: 本次调用的截止时刻
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(exc):
+            return None
+        with self._lock:
+            # full jitter：在 [0, min(max_delay, base_delay * 2^(attempt-1))] 中均匀取值
+            delay = self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+
+class PhaseBudget:
+    """
+    一个游戏阶段内所有模型调用共享的时间预算，由引擎在每个阶段开始时重置
+    """
+
+    def __init__(self):
+        self.phase: Optional[str] = None
+        self.deadline: Optional[float] = None
+
+    def start(self, phase: str, seconds: Optional[float]) -> None:
+        self.phase = phase
+        self.deadline = time.monotonic() + float(seconds) if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
@@ -0,0 +1,101 @@
+"""
+离线桩模型：不访问网络，按带种子的策略直接返回合法的工具调用。
+
+用于在没有 LLM 的情况下全速跑完整局游戏，衡量引擎、MCP 和日志本身的开销。
+在 config.yaml 的 models.adapters 中配置 ``type: stub`` 即可启用。
+"""
+
+import random
+import threading
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_STUB_SPEECHES = [
+    "我是好人，昨晚没有信息，先听后置位发言再决定投票。",
+    "我觉得前面有人发言太保守，像是在隐藏身份，我会重点关注。",
+    "目前票型还看不清，我倾向于跟着逻辑最清晰的玩家走。",
+    "我怀疑发言前后矛盾的玩家，今天建议大家集中投票。",
+    "我这轮先给出我的怀疑方向，投票时会明确表态。",
+]
+
+DEFAULT_STUB_REASON = "桩模型按随机合法目标行动"
+
+
+class StubToolPolicy:
+    """
+    带种子的工具选择策略
+
+    Attributes:
+        latency_ms: 每次调用的人工延迟（毫秒）
+        latency_jitter_ms: 人工延迟的随机抖动上限（毫秒）
+        abstain_rate: 有 abstain 工具时主动弃权的概率
+        speeches: 发言工具使用的脚本化发言
+    """
+
+    def __init__(self, model_config: Dict[str, Any]):
+        seed = model_config.get("seed")
+        # 未指定种子时从全局 random 派生：对局设置了 seed 时仍然可复现
+        self._random = random.Random(seed if seed is not None else random.getrandbits(32))
+        self._lock = threading.Lock()
+        self.latency_ms = float(model_config.get("latency_ms", 0))
+        self.latency_jitter_ms = float(model_config.get("latency_jitter_ms", 0))
+        self.abstain_rate = float(model_config.get("abstain_rate", 0.0))
+        self.speeches: List[str] = list(model_config.get("speeches") or DEFAULT_STUB_SPEECHES)
+
+    def latency(self) -> float:
+        """
+        返回本次调用应等待的秒数
+        """
+        if self.latency_ms <= 0 and self.latency_jitter_ms <= 0:
+            return 0.0
+        with self._lock:
+            jitter = self._random.uniform(0, self.latency_jitter_ms) if self.latency_jitter_ms > 0 else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def choose_tool(self, tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        从本轮暴露的工具中选择一个合法调用
+
+        Args:
+            tools: OpenAI 兼容的 tools schema 列表
+
+        Returns:
+            {"name": 工具名, "arguments": 参数}
+        """
+        with self._lock:
+            candidates = []
+            abstain: Optional[Dict[str, Any]] = None
+            for tool in tools:
+                function = tool.get("function") or {}
+                name = function.get("name")
+                properties = (function.get("parameters") or {}).get("properties") or {}
+                if name == "abstain":
+                    abstain = function
+                    continue
+                target_schema = properties.get("target")
+                if target_schema is not None and not target_schema.get("enum"):
+                    continue
+                candidates.append(function)
+
+            if abstain is not None and (not candidates or self._random.random() < self.abstain_rate):
+                return {"name": "abstain", "arguments": {"reason": "桩模型选择弃权"}}
+            if not candidates:
+                return {"name": "abstain", "arguments": {"reason": "桩模型没有可用工具"}}
+
+            function = self._random.choice(candidates)
+            properties = (function.get("parameters") or {}).get("properties") or {}
+            arguments: Dict[str, Any] = {}
+            if "speech" in properties:
+                arguments["speech"] = self._random.choice(self.speeches)
+            if "target" in properties:
+                arguments["target"] = self._random.choice(properties["target"]["enum"])
+            if "reason" in properties:
+                arguments["reason"] = DEFAULT_STUB_REASON
+            return {"name": function.get("name"), "arguments": arguments}
+
+    def choose_text(self) -> str:
+        """
+        纯文本调用时返回一条脚本化发言
+        """
+        with self._lock:
+            return self._random.choice(self.speeches)
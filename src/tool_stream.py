@@ -0,0 +1,157 @@
+"""
+流式 tool calling 解析：累积 tool_calls 参数增量，参数 JSON 尚未完整时就提取已到达的 speech 文本
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+PartialCallback = Callable[[str], None]
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def partial_json_string(arguments: str, key: str) -> Optional[str]:
+    """
+    从可能不完整的 JSON 对象文本中读出字符串字段已到达的部分
+
+    Args:
+        arguments: 目前为止收到的参数文本
+        key: 字段名
+
+    Returns:
+        已解码的字段前缀；字段尚未出现时返回 None
+    """
+    marker = arguments.find(f'"{key}"')
+    if marker < 0:
+        return None
+    position = marker + len(key) + 2
+    length = len(arguments)
+    while position < length and arguments[position] in " \t\r\n:":
+        position += 1
+    if position >= length or arguments[position] != '"':
+        return None
+    position += 1
+
+    chars: List[str] = []
+    while position < length:
+        char = arguments[position]
+        if char == '"':
+            break
+        if char != "\\":
+            chars.append(char)
+            position += 1
+            continue
+        if position + 1 >= length:
+            break
+        escape = arguments[position + 1]
+        if escape == "u":
+            # \uXXXX 未收全时停在转义符之前
+            if position + 6 > length:
+                break
+            try:
+                chars.append(chr(int(arguments[position + 2:position + 6], 16)))
+            except ValueError:
+                break
+            position += 6
+            continue
+        chars.append(_ESCAPES.get(escape, escape))
+        position += 2
+    return "".join(chars)
+
+
+class ToolCallStreamParser:
+    """
+    累积 OpenAI 兼容流式响应中的 content 与第一个 tool_call
+
+    每收到一段参数增量就尝试提取 speech 前缀，文本变长时回调 on_partial。
+
+    Attributes:
+        content: 普通文本部分
+        name: 工具名
+        arguments: 工具参数原文（JSON 字符串）
+        usage: 服务商在最后一个 chunk 中附带的 usage（请求了 include_usage 时）
+    """
+
+    def __init__(self, on_partial: Optional[PartialCallback] = None, partial_key: str = "speech"):
+        self.on_partial = on_partial
+        self.partial_key = partial_key
+        self.content = ""
+        self.name: Optional[str] = None
+        self.arguments = ""
+        self.usage: Optional[Dict[str, Any]] = None
+        self._tool_index: Optional[int] = None
+        self._emitted = ""
+
+    def feed_delta(self, delta: Dict[str, Any]) -> None:
+        """
+        处理一个 choices[0].delta
+        """
+        if delta.get("content"):
+            self.content += delta["content"]
+        for tool_call in delta.get("tool_calls") or []:
+            index = tool_call.get("index", 0)
+            if self._tool_index is None:
+                self._tool_index = index
+            if index != self._tool_index:
+                # 单轮只采纳第一个工具调用
+                continue
+            function = tool_call.get("function") or {}
+            if function.get("name"):
+                self.name = function["name"]
+            if function.get("arguments"):
+                self.arguments += function["arguments"]
+                self._emit_partial()
+
+    def feed_chunk(self, chunk: Dict[str, Any]) -> None:
+        """
+        处理一个完整的流式 chunk（chat.completion.chunk）
+        """
+        if chunk.get("usage"):
+            self.usage = chunk["usage"]
+        for choice in chunk.get("choices") or []:
+            if choice.get("index", 0) == 0:
+                self.feed_delta(choice.get("delta") or {})
+
+    def feed_sse_lines(self, lines: Iterable[Any]) -> None:
+        """
+        处理 SSE 文本行（data: {...}），遇到 [DONE] 结束
+        """
+        for line in lines:
+            if not self.feed_sse_line(line):
+                break
+
+    def feed_sse_line(self, line: Any) -> bool:
+        """
+        处理一行 SSE；返回 False 表示流已结束
+        """
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line.startswith("data:"):
+            return True
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return False
+        self.feed_chunk(json.loads(data))
+        return True
+
+    def message(self) -> Dict[str, Any]:
+        """
+        拼出与非流式响应相同结构的 assistant message
+        """
+        message: Dict[str, Any] = {"role": "assistant", "content": self.content or None}
+        if self.name:
+            message["tool_calls"] = [{
+                "type": "function",
+                "function": {"name": self.name, "arguments": self.arguments or "{}"},
+            }]
+        return message
+
+    def _emit_partial(self) -> None:
+        if self.on_partial is None:
+            return
+        text = partial_json_string(self.arguments, self.partial_key)
+        if text and text != self._emitted:
+            self._emitted = text
+            self.on_partial(text)
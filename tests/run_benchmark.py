@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+端到端对局基准测试
+
+使用离线桩模型（type: stub）跑若干局完整游戏，统计：
+- 吞吐：games/sec
+- 每个工具调用 intent（day_speech、day_vote、werewolf_kill、witch_night ...）的 p50/p95/p99 延迟
+- MCP 往返、提示词构建、日志写入的耗时
+
+结果保存为 JSON，可用 --baseline 与历史结果比较，发现跨提交的性能回归。
+
+用法:
+    python tests/run_benchmark.py --games 20 --latency-ms 0
+    python tests/run_benchmark.py --games 20 --baseline logs/benchmarks/bench_<commit>.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import yaml
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from game_engine import GameEngine
+from metrics import PerfRecorder
+from utils import load_config
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def build_stub_config(directory, latency_ms, latency_jitter_ms):
+    """把 config.yaml 中的模型全部替换为桩模型"""
+    config = load_config(os.path.join(PROJECT_ROOT, 'config.yaml'))
+    config["models"]["adapters"] = {
+        name: {
+            "type": "stub",
+            "model": f"stub-{name}",
+            "latency_ms": latency_ms,
+            "latency_jitter_ms": latency_jitter_ms,
+        }
+        for name in config["models"]["adapters"]
+    }
+    config["game"]["logging"]["file"] = os.path.join(directory, "game_{game_id}.log")
+    config_path = os.path.join(directory, "config.yaml")
+    with open(config_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, allow_unicode=True)
+    return config_path
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def run_benchmark(games, latency_ms, latency_jitter_ms, seed):
+    """运行基准对局并汇总指标"""
+    recorder = PerfRecorder()
+    winners = {}
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = build_stub_config(directory, latency_ms, latency_jitter_ms)
+        started = time.perf_counter()
+        for index in range(games):
+            engine = GameEngine(config_path, game_id=f"bench{index:04d}", seed=seed + index)
+            try:
+                game_started = time.perf_counter()
+                winner = engine.run_game()
+                recorder.record("game", time.perf_counter() - game_started)
+                winners[winner] = winners.get(winner, 0) + 1
+                recorder.merge(engine.metrics)
+            finally:
+                engine.close()
+        elapsed = time.perf_counter() - started
+
+    return {
+        "commit": current_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "params": {
+            "games": games,
+            "latency_ms": latency_ms,
+            "latency_jitter_ms": latency_jitter_ms,
+            "seed": seed,
+        },
+        "games_per_sec": round(games / elapsed, 4) if elapsed > 0 else None,
+        "elapsed_s": round(elapsed, 3),
+        "winners": winners,
+        "metrics": recorder.summary(),
+        "values": recorder.value_summary(),
+    }
+
+
+def compare(result, baseline, threshold):
+    """与历史结果比较 p50/p95，返回超过阈值的回归项"""
+    regressions = []
+    for name, stats in result["metrics"].items():
+        base = baseline.get("metrics", {}).get(name)
+        if not base:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if base[key] > 0 and stats[key] > base[key] * (1 + threshold):
+                regressions.append(f"{name}.{key}: {base[key]} -> {stats[key]}")
+    base_rate = baseline.get("games_per_sec")
+    if base_rate and result["games_per_sec"] < base_rate * (1 - threshold):
+        regressions.append(f"games_per_sec: {base_rate} -> {result['games_per_sec']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MAWS 端到端对局基准测试')
+    parser.add_argument('--games', type=int, default=10, help='对局数量')
+    parser.add_argument('--latency-ms', type=float, default=0, help='桩模型人工延迟（毫秒）')
+    parser.add_argument('--latency-jitter-ms', type=float, default=0, help='桩模型延迟抖动（毫秒）')
+    parser.add_argument('--seed', type=int, default=1000, help='基础随机种子')
+    parser.add_argument('--output', type=str, default=None, help='结果 JSON 路径，默认 logs/benchmarks/bench_{commit}_{timestamp}.json')
+    parser.add_argument('--baseline', type=str, default=None, help='用于比较的历史结果 JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定回归的相对阈值')
+    args = parser.parse_args()
+
+    result = run_benchmark(args.games, args.latency_ms, args.latency_jitter_ms, args.seed)
+
+    output = args.output or os.path.join(
+        PROJECT_ROOT, "logs", "benchmarks",
+        f"bench_{result['commit']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(json.dumps({k: v for k, v in result.items() if k not in ("metrics", "values")}, ensure_ascii=False, indent=2))
+    for name, stats in result["metrics"].items():
+        print(f"  {name:32s} n={stats['count']:<6d} p50={stats['p50_ms']:>9.3f}ms "
+              f"p95={stats['p95_ms']:>9.3f}ms p99={stats['p99_ms']:>9.3f}ms")
+    for name, stats in result["values"].items():
+        print(f"  {name:32s} n={stats['count']:<6d} mean={stats['mean']:>9.1f} "
+              f"p95={stats['p95']:>9.1f} max={stats['max']:>9.1f}")
+    print(f"结果已保存: {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print("发现性能回归:")
+            for item in regressions:
+                print(f"  {item}")
+            sys.exit(1)
+        print("未发现性能回归")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent_tools import (
+    ALL_TOOL_SPECS,
+    PROMPT_HISTORY_WINDOWS,
+    PROMPT_RULES,
+    AgentToolRuntime,
+    ToolSpec,
+    _cached_model_tools,
+)
+from prompt_builder import estimate_tokens
+
+
+class TestToolSchemaCache(unittest.TestCase):
+    """测试 tools schema 缓存"""
+
+    def setUp(self):
+        self.runtime = AgentToolRuntime([])
+        self.tools = [ALL_TOOL_SPECS["vote_day"], ALL_TOOL_SPECS["abstain"]]
+
+    def test_same_target_pool_reuses_schema(self):
+        """测试相同工具与目标池直接复用缓存的 schema"""
+        _cached_model_tools.cache_clear()
+        first = self.runtime.to_model_tools(self.tools, eligible_targets=[1, 2, 3])
+        second = AgentToolRuntime([]).to_model_tools(self.tools, eligible_targets=[1, 2, 3])
+
+        self.assertIs(first[0], second[0])
+        self.assertEqual(_cached_model_tools.cache_info().hits, 1)
+
+    def test_target_pool_changes_enum(self):
+        """测试不同目标池生成不同的 enum"""
+        schema = self.runtime.to_model_tools(
+            self.tools,
+            eligible_targets=[1, 2],
+            eligible_targets_by_tool={"vote_day": [4]},
+        )
+
+        self.assertEqual(schema[0]["function"]["parameters"]["properties"]["target"]["enum"], [4])
+
+    def test_custom_tool_spec_is_not_cached(self):
+        """测试非内置工具定义不走缓存，按原样生成 schema"""
+        custom = ToolSpec(
+            name="vote_day",
+            description="自定义投票",
+            parameters={"target": "目标"},
+            allowed_roles=["villager"],
+            action_type="vote",
+            requires_target=True,
+        )
+        schema = self.runtime.to_model_tools([custom], eligible_targets=[2])
+
+        self.assertTrue(schema[0]["function"]["description"].startswith("自定义投票"))
+
+
+
+class TestPromptBudget(unittest.TestCase):
+    """测试提示词的 token 预算与段落缓存"""
+
+    def setUp(self):
+        self.agent = SimpleNamespace(
+            agent_id=1,
+            role="villager",
+            team="villagers",
+            short_memory=[f"第{i}条记忆：{i}号玩家发言可疑" for i in range(12)],
+            prediction_memory={},
+            memory_version=1,
+        )
+        self.game_state = {
+            "day": 2,
+            "phase": "day",
+            "alive_agents": [1, 2, 3, 4],
+            "eliminated_agents": [],
+            "public_speeches": [
+                {"speaker": i % 4 + 1, "speech": "我怀疑发言前后矛盾的玩家，今天建议大家集中投票。" * 2}
+                for i in range(12)
+            ],
+        }
+        self.tools = [ALL_TOOL_SPECS["vote_day"], ALL_TOOL_SPECS["abstain"]]
+
+    def _build(self, runtime: AgentToolRuntime) -> str:
+        return runtime.build_prompt(self.agent, "day_vote", self.game_state, self.tools, eligible_targets=[2, 3, 4])
+
+    def test_budget_shortens_history(self):
+        """测试超出预算时缩短历史窗口"""
+        full = self._build(AgentToolRuntime([self.agent]))
+        budget = estimate_tokens(full) - 200
+        with mock.patch("agent_tools.logger") as logger:
+            trimmed = self._build(AgentToolRuntime([self.agent], token_budget=budget))
+
+        self.assertLessEqual(estimate_tokens(trimmed), budget)
+        self.assertIn("trimmed to history window", logger.info.call_args[0][0])
+        self.assertIn("第11条记忆", trimmed)
+        self.assertNotIn("第4条记忆", trimmed)
+
+    def test_memory_section_rebuilt_only_after_update(self):
+        """测试记忆版本不变时复用段落，更新后重建"""
+        runtime = AgentToolRuntime([self.agent])
+        self._build(runtime)
+        self._build(runtime)
+        misses = runtime._sections.misses
+
+        self.agent.short_memory.append("新的记忆")
+        self.agent.memory_version += 1
+        prompt = self._build(runtime)
+
+        self.assertIn("新的记忆", prompt)
+        self.assertEqual(runtime._sections.misses, misses + 1)
+
+    def test_volatile_state_comes_after_stable_prefix(self):
+        """测试阶段与状态变化只影响提示词尾部，固定说明和记忆保持为公共前缀"""
+        runtime = AgentToolRuntime([self.agent])
+        before = self._build(runtime)
+        self.game_state["alive_agents"] = [1, 2, 4]
+        self.game_state["eliminated_agents"] = [3]
+        after = runtime.build_prompt(self.agent, "day_speech", self.game_state, [ALL_TOOL_SPECS["speak_public"]])
+
+        prefix = os.path.commonprefix([before, after])
+        self.assertIn(PROMPT_RULES, prefix)
+        self.assertIn("第11条记忆", prefix)
+        self.assertNotIn("当前阶段注入", prefix)
+
+    def test_memory_prefix_only_grows_within_day(self):
+        """测试同一天相邻两次提示词共享完整的记忆前缀，新记忆只追加在末尾"""
+        runtime = AgentToolRuntime([self.agent])
+        first = self._build(runtime)
+        self.agent.short_memory.append("第12条记忆：新的夜间信息")
+        self.agent.memory_version += 1
+        self.agent.prediction_memory = {"3": {"role": "werewolf", "confidence": 0.6}}
+        second = self._build(runtime)
+
+        memory_block = first[:first.index("\n\n当前任务")]
+        self.assertIn("第4条记忆", memory_block)
+        self.assertTrue(second.startswith(memory_block))
+        self.assertIn("第12条记忆", second[len(memory_block):second.index("当前任务")])
+
+        self.game_state["day"] = 3
+        next_day = self._build(runtime)
+        self.assertNotIn("第4条记忆", next_day)
+        self.assertIn("第12条记忆", next_day)
+
+    def test_long_day_memory_stays_within_budget(self):
+        """测试同一天持续追加记忆时记忆段落有上限，提示词不超过预算"""
+        runtime = AgentToolRuntime([self.agent])
+        budget = estimate_tokens(self._build(runtime)) + 200
+        runtime = AgentToolRuntime([self.agent], token_budget=budget)
+        for index in range(12, 80):
+            self.agent.short_memory.append(f"第{index}条记忆：{index % 4 + 1}号玩家发言可疑")
+            self.agent.memory_version += 1
+            prompt = self._build(runtime)
+            self.assertLessEqual(estimate_tokens(prompt), budget)
+            memory_block = prompt[prompt.index("你的短期记忆"):prompt.index("当前任务")]
+            self.assertIn(f"第{index}条记忆", memory_block)
+            self.assertLessEqual(memory_block.count("条记忆"), 2 * PROMPT_HISTORY_WINDOWS[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
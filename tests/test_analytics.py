@@ -0,0 +1,99 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from analytics import GameTables, elo_ratings, load_tables, vote_accuracy, win_rates
+from game_engine import GameEngine
+from tests.test_game_engine import write_stub_config
+
+
+def summary(game_id: str, winner: str, wolf_model: str, villager_model: str):
+    """两狼（1、2 号）对两民（3、4 号）的对局汇总，白天两名村民都投 1 号"""
+    return {
+        "game_id": game_id,
+        "seed": None,
+        "winner": winner,
+        "days": 1,
+        "agents": [
+            {"agent_id": 1, "role": "werewolf", "team": "werewolves", "model": wolf_model, "survived": winner == "werewolves"},
+            {"agent_id": 2, "role": "werewolf", "team": "werewolves", "model": wolf_model, "survived": True},
+            {"agent_id": 3, "role": "seer", "team": "villagers", "model": villager_model, "survived": True},
+            {"agent_id": 4, "role": "villager", "team": "villagers", "model": villager_model, "survived": False},
+        ],
+        "actions": [
+            {"day": 1, "phase": "night", "agent_id": 1, "type": "night_kill", "target": 4},
+            {"day": 1, "phase": "day", "agent_id": 3, "type": "vote", "target": 1},
+            {"day": 1, "phase": "day", "agent_id": 4, "type": "vote", "target": 1},
+            {"day": 1, "phase": "day", "agent_id": 1, "type": "abstain", "target": None},
+            {"day": 1, "phase": "day", "agent_id": 2, "type": "vote", "target": 3},
+        ],
+    }
+
+
+class TestAnalytics(unittest.TestCase):
+    """测试对局日志的列式汇总与统计"""
+
+    def setUp(self):
+        self.tables = GameTables.from_summaries([
+            summary("g1", "villagers", "alpha", "beta"),
+            summary("g2", "villagers", "alpha", "beta"),
+            summary("g3", "werewolves", "beta", "alpha"),
+            None,
+        ])
+
+    def test_columnar_tables(self):
+        """测试每局展开为对齐的列"""
+        self.assertEqual(len(self.tables.games), 3)
+        self.assertEqual(len(self.tables.agents), 12)
+        self.assertEqual(len(self.tables.votes), 15)
+        self.assertEqual(self.tables.votes["kind"][:2], ["werewolf_kill", "day_elimination"])
+
+    def test_win_rate_and_vote_accuracy(self):
+        """测试 模型 × 角色 胜率和按阵营的投票准确率"""
+        rates = win_rates(self.tables)
+        self.assertEqual(rates["beta/villager"]["win_rate"], 1.0)
+        self.assertEqual(rates["beta/werewolf"]["games"], 2)
+        self.assertEqual(rates["beta/werewolf"]["win_rate"], 1.0)
+        self.assertEqual(rates["alpha/werewolf"]["survival_rate"], 0.5)
+
+        accuracy = vote_accuracy(self.tables)
+        self.assertEqual(accuracy["beta/villagers"]["accuracy"], 1.0)
+        self.assertEqual(accuracy["alpha/werewolves"]["abstains"], 2)
+        self.assertEqual(accuracy["alpha/werewolves"]["accuracy"], 1.0)
+
+    def test_elo_favours_winning_model(self):
+        """测试 Elo 分随胜负更新且总分守恒"""
+        ratings = elo_ratings(self.tables)
+        self.assertGreater(ratings["beta"], ratings["alpha"])
+        self.assertAlmostEqual(ratings["alpha"] + ratings["beta"], 3000, places=1)
+
+    def test_load_stub_game_logs(self):
+        """测试从事件日志和文本日志读取桩模型对局的汇总"""
+        with tempfile.TemporaryDirectory() as directory:
+            engine = GameEngine(write_stub_config(directory), game_id="events", seed=123)
+            try:
+                winner = engine.run_game()
+            finally:
+                engine.close()
+            os.remove(engine.logger.events_path)
+            text_only = load_tables(directory)
+            engine = GameEngine(write_stub_config(directory), game_id="events", seed=123)
+            try:
+                engine.run_game()
+            finally:
+                engine.close()
+            from_events = load_tables(directory)
+
+        for tables in (text_only, from_events):
+            self.assertEqual(tables.games["winner"], [winner])
+            self.assertEqual(len(tables.agents), len(engine.agents))
+            self.assertGreater(len(tables.votes), 0)
+        self.assertTrue(from_events.games["log_file"][0].endswith(".events.jsonl"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from batch import run_batch
+from tests.test_game_engine import write_stub_config
+
+
+class TestRunBatch(unittest.TestCase):
+    """测试批量对局的结果与用量输出"""
+
+    def test_batch_outputs_and_rerun(self):
+        """测试两局两进程的结果与用量文件，以及重跑时的目录保护"""
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = write_stub_config(directory)
+            output_dir = os.path.join(directory, "batch")
+            summary = run_batch(config_path, games=2, workers=2, output_dir=output_dir, base_seed=7)
+
+            with open(os.path.join(output_dir, "results.jsonl"), encoding="utf-8") as f:
+                results = [json.loads(line) for line in f]
+            with open(os.path.join(output_dir, "usage.jsonl"), encoding="utf-8") as f:
+                usage = [json.loads(line) for line in f]
+            with open(os.path.join(output_dir, "usage.csv"), encoding="utf-8") as f:
+                usage_rows = list(csv.DictReader(f))
+
+            self.assertEqual(summary["failed"], 0)
+            self.assertEqual(sorted(result["game_id"] for result in results), ["00000", "00001"])
+            self.assertTrue(all(result["error"] is None for result in results))
+            self.assertEqual({record["game_id"] for record in usage}, {"00000", "00001"})
+            self.assertEqual(len(usage_rows), len(usage))
+
+            with self.assertRaises(FileExistsError):
+                run_batch(config_path, games=2, workers=2, output_dir=output_dir, base_seed=7)
+
+            run_batch(config_path, games=2, workers=2, output_dir=output_dir, base_seed=7, overwrite=True)
+            with open(os.path.join(output_dir, "results.jsonl"), encoding="utf-8") as f:
+                self.assertEqual(len(f.readlines()), 2)
+            with open(os.path.join(output_dir, "usage.jsonl"), encoding="utf-8") as f:
+                self.assertEqual(len(f.readlines()), len(usage))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from debug_sink import open_debug_channel
+from models_adapter import ModelsAdapter
+
+
+TOOLS = [{"type": "function", "function": {"name": "abstain", "parameters": {"properties": {}}}}]
+
+
+class TestDebugSink(unittest.TestCase):
+    """测试模型原始响应的调试输出"""
+
+    def test_disabled_by_default(self):
+        """测试未配置 debug 时适配器不创建调试输出"""
+        self.assertIsNone(ModelsAdapter({"type": "stub"}).debug)
+        self.assertIsNone(open_debug_channel({"enabled": False}))
+        self.assertIsNone(open_debug_channel({"sample_rate": 0}))
+
+    def test_adapter_writes_compact_records(self):
+        """测试开启后原始响应由后台线程写成 JSONL，路径按适配器名称展开"""
+        with tempfile.TemporaryDirectory() as directory:
+            adapter = ModelsAdapter(
+                {"type": "http", "model": "test", "debug": {"path": os.path.join(directory, "{adapter}.jsonl")}},
+                name="deepseek",
+            )
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"type": "function", "function": {"name": "abstain", "arguments": "{}"}},
+            ]}
+            for _ in range(3):
+                adapter._parse_tool_message(message, TOOLS, "openai-compatible-http")
+            adapter.debug.sink.flush(timeout=5)
+
+            with open(os.path.join(directory, "deepseek.jsonl"), encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            adapter.debug.sink.close()
+
+        self.assertEqual(len(lines), 3)
+        record = json.loads(lines[0])
+        self.assertEqual(record["adapter"], "deepseek")
+        self.assertEqual(record["message"], message)
+        self.assertNotIn("\n  ", lines[0])
+
+    def test_sampling_skips_records(self):
+        """测试采样比例生效"""
+        with tempfile.TemporaryDirectory() as directory:
+            channel = open_debug_channel({"sample_rate": 0.2, "path": os.path.join(directory, "sampled.jsonl")})
+            sampled = sum(channel.sampled() for _ in range(2000))
+            channel.sink.close()
+
+        self.assertGreater(sampled, 250)
+        self.assertLess(sampled, 550)
+
+    def test_relative_path_resolves_against_base_dir(self):
+        """测试相对路径按 base_dir 解析，与启动时的工作目录无关"""
+        with tempfile.TemporaryDirectory() as directory:
+            channel = open_debug_channel({"path": "debug/{adapter}.jsonl"}, "qwen", base_dir=directory)
+            channel.sink.close()
+
+        self.assertEqual(channel.sink.path, os.path.join(directory, "debug", "qwen.jsonl"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from event_log import EventLogReader, EventLogWriter, zstandard
+from logger import GameLogger
+
+
+def write_days(path: str, compression: str = "none", days: int = 5) -> None:
+    writer = EventLogWriter(path, compression)
+    writer.write(json.dumps({"phase": "init", "index": 0}))
+    for day in range(1, days + 1):
+        for section in ("speech", "vote"):
+            writer.mark(day, "day", section)
+            for index in range(3):
+                writer.write(json.dumps({"day": day, "section": section, "index": index}))
+    writer.close()
+
+
+class TestEventLog(unittest.TestCase):
+    """测试分段索引的事件日志"""
+
+    def test_read_single_section(self):
+        """测试按索引只读取某一天的某个分段"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "game.events.jsonl")
+            write_days(path)
+            reader = EventLogReader(path)
+            votes = reader.read(day=3, section="vote")
+            whole_day = reader.read(day=3)
+            total = len(list(reader.records()))
+
+        self.assertEqual([(r["day"], r["section"]) for r in votes], [(3, "vote")] * 3)
+        self.assertEqual(len(whole_day), 6)
+        self.assertEqual(total, 31)
+
+    def test_scan_without_index(self):
+        """测试索引缺失时仍可顺序读取全部记录"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "game.events.jsonl")
+            write_days(path, days=2)
+            os.remove(path + ".idx.json")
+            reader = EventLogReader(path)
+            with self.assertRaises(ValueError):
+                reader.find(day=1)
+            records = list(reader.records())
+
+        self.assertEqual(len(records), 13)
+
+    @unittest.skipIf(zstandard is None, "zstandard not installed")
+    def test_zstd_sections(self):
+        """测试 zstd 压缩时每段可以单独解压"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "game.events.zst")
+            write_days(path, compression="zstd")
+            reader = EventLogReader(path)
+            votes = reader.read(day=4, section="vote")
+            total = len(list(reader.records()))
+
+        self.assertEqual([r["day"] for r in votes], [4] * 3)
+        self.assertEqual(total, 31)
+
+    def test_game_logger_writes_sections(self):
+        """测试 GameLogger 按入队顺序把日志写入对应分段，并可关闭文本日志"""
+        with tempfile.TemporaryDirectory() as directory:
+            game_logger = GameLogger(os.path.join(directory, "game_{game_id}.log"), game_id="events",
+                                     text=False, events=True)
+            game_logger.log_system("init", "setup")
+            game_logger.mark_section(1, "day", "vote")
+            game_logger.log_agent_action("day", 2, {"type": "vote", "target": 5})
+            game_logger.close()
+
+            reader = EventLogReader(game_logger.events_path)
+            votes = reader.read(day=1, section="vote")
+            text_log_exists = os.path.exists(game_logger.log_file_path)
+
+        self.assertEqual(len(votes), 1)
+        self.assertEqual(votes[0]["agent_id"], 2)
+        self.assertFalse(text_log_exists)
+
+
+if __name__ == '__main__':
+    unittest.main()
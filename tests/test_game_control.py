@@ -0,0 +1,139 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent import WerewolfAgent
+from game_control import AgentRegistry, MemoryEvent, MemoryInjector, MemoryStore, Visibility
+
+
+class RecordingAgent(SimpleNamespace):
+    def update_memory(self, memory_update_info, phase):
+        self.memories.append(memory_update_info["memory_updates"]["short_memory_add"][0])
+
+
+def make_agents():
+    roles = ["werewolf", "seer", "werewolf", "villager", "witch"]
+    return [RecordingAgent(agent_id=index, role=role, memories=[]) for index, role in enumerate(roles, start=1)]
+
+
+class TestAgentRegistry(unittest.TestCase):
+    """测试 Agent 索引与记忆注入的收件人解析"""
+
+    def test_lookup_and_elimination(self):
+        """测试按 id、角色查找，淘汰后存活集合同步更新"""
+        registry = AgentRegistry(make_agents())
+        self.assertEqual(registry[3].role, "werewolf")
+        self.assertIsNone(registry.get(9))
+        self.assertEqual(registry.ids_with_role("werewolf"), [1, 3])
+
+        self.assertTrue(registry.eliminate(1))
+        self.assertFalse(registry.eliminate(1))
+        self.assertFalse(registry.eliminate(None))
+        self.assertEqual([agent.agent_id for agent in registry.with_role("werewolf")], [3])
+        self.assertEqual(registry.ids_with_role("werewolf", alive_only=False), [1, 3])
+        self.assertFalse(registry.is_alive(1))
+
+    def test_alive_counts_follow_eliminations(self):
+        """测试各角色存活人数随淘汰增量更新"""
+        registry = AgentRegistry(make_agents(), alive=[1, 2, 3, 5])
+        self.assertEqual((registry.alive_count(), registry.alive_count("werewolf")), (4, 2))
+        registry.eliminate(3)
+        registry.eliminate(5)
+        registry.eliminate(4)
+        self.assertEqual((registry.alive_count(), registry.alive_count("werewolf")), (2, 1))
+        self.assertEqual(registry.alive_count("witch"), 0)
+
+    def test_memory_injector_uses_alive_state(self):
+        """测试传入 Agent 列表时按 game_state 的存活名单解析收件人"""
+        agents = make_agents()
+        game_state = {"alive_agents": [2, 3, 4, 5], "eliminated_agents": [1], "day": 2, "phase": "night"}
+        injector = MemoryInjector(agents, game_state)
+
+        wolves = injector.inject(MemoryEvent("night", "狼人私聊", "刀 2 号", Visibility.WEREWOLF))
+        private = injector.inject(MemoryEvent("night", "查验", "3 号是狼人", Visibility.PRIVATE, recipients=[1, 2]))
+        public = injector.inject(MemoryEvent("day", "公告", "平安夜", Visibility.PUBLIC))
+
+        self.assertEqual(wolves, [3])
+        self.assertEqual(private, [2])
+        self.assertEqual(public, [2, 3, 4, 5])
+        self.assertEqual(agents[0].memories, [])
+        self.assertEqual(len(agents[2].memories), 2)
+
+
+
+class TestMemoryStore(unittest.TestCase):
+    """测试共享记忆存储与各 Agent 的记忆视图"""
+
+    def setUp(self):
+        roles = ["werewolf", "seer", "werewolf", "villager"]
+        self.agents = [WerewolfAgent(index, role, "", {}, "") for index, role in enumerate(roles, start=1)]
+        self.store = MemoryStore()
+        for agent in self.agents:
+            agent.attach_memory_store(self.store)
+        self.registry = AgentRegistry(self.agents)
+        self.game_state = {"alive_agents": [1, 2, 3, 4], "eliminated_agents": [], "day": 1, "phase": "night"}
+
+    def inject(self, visibility, content, recipients=None):
+        injector = MemoryInjector(self.registry, self.game_state, self.store)
+        return injector.inject(MemoryEvent("night", "系统", content, visibility, recipients=recipients))
+
+    def test_events_stored_once_and_filtered(self):
+        """测试每个事件只存一次，各 Agent 按可见性读取"""
+        self.inject(Visibility.PUBLIC, "天黑请闭眼")
+        self.inject(Visibility.WEREWOLF, "刀 2 号")
+        self.inject(Visibility.PRIVATE, "3 号是狼人", recipients=[2])
+
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual([len(agent.short_memory) for agent in self.agents], [2, 2, 2, 1])
+        self.assertTrue(self.agents[1].short_memory[-1].endswith("3 号是狼人"))
+        self.assertTrue(self.agents[0].short_memory[-1:][0].endswith("刀 2 号"))
+
+    def test_eliminated_agent_stops_receiving(self):
+        """测试出局后的事件对该 Agent 不可见，直接写入的私有记忆仍可见"""
+        self.inject(Visibility.PUBLIC, "第一夜")
+        self.registry.eliminate(4)
+        self.agents[3].close_memory()
+        self.game_state["alive_agents"].remove(4)
+        self.inject(Visibility.PUBLIC, "第二夜")
+        self.agents[3].update_memory({"memory_updates": {"short_memory_add": ["遗言"]}}, "day")
+
+        self.assertEqual(len(self.agents[3].short_memory), 2)
+        self.assertEqual(self.agents[3].short_memory[-1], "遗言")
+        self.assertEqual(len(self.agents[0].short_memory), 2)
+
+    def test_memory_version_tracks_visible_entries(self):
+        """测试可见记忆增加时版本号变化，不可见记忆不影响"""
+        seer, villager = self.agents[1], self.agents[3]
+        before = (seer.memory_version, villager.memory_version)
+        self.inject(Visibility.PRIVATE, "查验结果", recipients=[2])
+        self.assertGreater(seer.memory_version, before[0])
+        self.assertEqual(villager.memory_version, before[1])
+
+        villager.short_memory = ["旧记忆"]
+        self.assertEqual(list(villager.short_memory), ["旧记忆"])
+        self.assertEqual(villager.serialize()["short_memory"], ["旧记忆"])
+        self.assertGreater(villager.memory_version, before[1])
+
+    def test_view_slices_follow_visible_positions(self):
+        """测试任意切片与下标与可见记忆列表一致"""
+        for index in range(6):
+            self.inject(Visibility.PUBLIC, f"公告{index}")
+            self.inject(Visibility.WEREWOLF, f"私聊{index}")
+        wolf, villager = self.agents[0].short_memory, self.agents[3].short_memory
+        self.assertEqual(self.store.version, 12)
+        expected = list(villager)
+        self.assertEqual(len(expected), 6)
+        for index in (slice(2, None), slice(-3, None), slice(1, 4), slice(None, None, 2), slice(-2, -1)):
+            self.assertEqual(villager[index], expected[index])
+        self.assertEqual((villager[0], villager[-1]), (expected[0], expected[-1]))
+        self.assertEqual(len(wolf), 12)
+        with self.assertRaises(IndexError):
+            villager[6]
+
+
+if __name__ == '__main__':
+    unittest.main()
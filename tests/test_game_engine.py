@@ -0,0 +1,254 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+import yaml
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent_tools import ToolRequest
+from event_log import EventLogReader
+from game_engine import GameEngine
+from ledger import UsageLedger
+from metrics import PerfRecorder
+from utils import load_config
+
+
+def write_stub_config(directory: str, **game_overrides) -> str:
+    """把 config.yaml 中的所有模型替换为桩模型，写入临时目录"""
+    config = load_config(os.path.join(os.path.dirname(__file__), '..', 'config.yaml'))
+    config["models"]["adapters"] = {
+        name: {"type": "stub", "model": f"stub-{name}"}
+        for name in config["models"]["adapters"]
+    }
+    config["game"]["logging"]["file"] = os.path.join(directory, "game_{game_id}.log")
+    config["game"].update(game_overrides)
+    config_path = os.path.join(directory, "config.yaml")
+    with open(config_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, allow_unicode=True)
+    return config_path
+
+
+class DelayedAdapter:
+    """按固定延迟返回投票的假适配器"""
+
+    def __init__(self, target: int, delay: float):
+        self.target = target
+        self.delay = delay
+
+    def call_tool(self, prompt_text, tools, system_prompt=None):
+        time.sleep(self.delay)
+        return {"name": "vote_day", "arguments": {"target": self.target, "reason": "test"}}
+
+    async def acall_tool(self, prompt_text, tools, system_prompt=None):
+        await asyncio.sleep(self.delay)
+        return {"name": "vote_day", "arguments": {"target": self.target, "reason": "test"}}
+
+
+class TestParallelToolCalls(unittest.TestCase):
+    """测试同一轮互不依赖的工具调用并发执行"""
+
+    def _engine(self, max_parallel_calls: int) -> GameEngine:
+        engine = GameEngine.__new__(GameEngine)
+        engine.max_parallel_calls = max_parallel_calls
+        engine._event_loop = None
+        engine.metrics = PerfRecorder()
+        engine.ledger = UsageLedger()
+        engine.game_id = "parallel"
+        return engine
+
+    def _requests(self):
+        requests = []
+        for agent_id, delay in [(1, 0.3), (2, 0.1), (3, 0.2), (4, 0.05)]:
+            agent = SimpleNamespace(agent_id=agent_id, model_adapter=DelayedAdapter(agent_id % 4 + 1, delay))
+            requests.append(ToolRequest(agent=agent, intent="day_vote", tools=[], prompt="", model_tools=[]))
+        return requests
+
+    def test_parallel_results_keep_seat_order(self):
+        """测试并发结果与逐个调用结果一致且顺序不变"""
+        requests = self._requests()
+        sequential = self._engine(1)._request_model_tool_calls(requests)
+
+        engine = self._engine(8)
+        try:
+            started = time.perf_counter()
+            parallel = engine._request_model_tool_calls(requests)
+            elapsed = time.perf_counter() - started
+        finally:
+            engine._event_loop.close()
+
+        self.assertEqual(parallel, sequential)
+        self.assertLess(elapsed, 0.5)
+
+
+class TimedAdapter:
+    """在真实适配器外加固定延迟，并记录每次调用的起止时间"""
+
+    def __init__(self, inner, delay: float, role: str, calls: list):
+        self.inner = inner
+        self.delay = delay
+        self.role = role
+        self.calls = calls
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def call_tool(self, *args, **kwargs):
+        started = time.perf_counter()
+        time.sleep(self.delay)
+        result = self.inner.call_tool(*args, **kwargs)
+        self.calls.append((self.role, started, time.perf_counter()))
+        return result
+
+    async def acall_tool(self, *args, **kwargs):
+        started = time.perf_counter()
+        await asyncio.sleep(self.delay)
+        result = await self.inner.acall_tool(*args, **kwargs)
+        self.calls.append((self.role, started, time.perf_counter()))
+        return result
+
+
+class TestNightSchedule(unittest.TestCase):
+    """测试夜间预言家请求与狼人讨论重叠执行"""
+
+    def _run_night(self, directory: str, max_parallel_calls: int):
+        config_path = write_stub_config(directory, concurrency={"max_parallel_calls": max_parallel_calls})
+        engine = GameEngine(config_path, game_id=f"night_{max_parallel_calls}", seed=123)
+        calls = []
+        settled = []
+        try:
+            engine.initialize_game()
+            for agent in engine.agents:
+                delay = 0.3 if agent.role == "seer" else 0.05
+                agent.model_adapter = TimedAdapter(agent.model_adapter, delay, agent.role, calls)
+
+            settle_night = engine._settle_night
+
+            def capture(werewolf_actions, seer_actions=None, witch_actions=None):
+                settled.append((werewolf_actions, seer_actions, witch_actions))
+                return settle_night(werewolf_actions, seer_actions, witch_actions)
+
+            engine._settle_night = capture
+            engine.run_night_phase()
+            return calls, settled[0], engine.game_state["alive_agents"]
+        finally:
+            engine.close()
+
+    def test_seer_overlaps_werewolf_deliberation(self):
+        """测试预言家请求在狼人讨论期间发出，结算输入与串行执行一致"""
+        with tempfile.TemporaryDirectory() as directory:
+            serial_calls, serial_settled, serial_alive = self._run_night(directory, 1)
+            calls, settled, alive = self._run_night(directory, 8)
+
+        seer_calls = [call for call in calls if call[0] == "seer"]
+        werewolf_calls = [call for call in calls if call[0] == "werewolf"]
+        self.assertTrue(seer_calls and werewolf_calls)
+        # 预言家请求早于最后一次狼人调用开始，且与狼人调用的时间区间有交叠
+        self.assertLess(seer_calls[0][1], werewolf_calls[-1][2])
+        self.assertTrue(any(
+            start < seer_calls[0][2] and seer_calls[0][1] < end
+            for _, start, end in werewolf_calls
+        ))
+        # 串行执行时预言家请求在所有狼人调用结束之后才开始
+        serial_seer = [call for call in serial_calls if call[0] == "seer"]
+        serial_werewolf = [call for call in serial_calls if call[0] == "werewolf"]
+        self.assertGreaterEqual(serial_seer[0][1], serial_werewolf[-1][2])
+
+        self.assertEqual(settled, serial_settled)
+        self.assertEqual(alive, serial_alive)
+
+
+class TestStubGame(unittest.TestCase):
+    """测试使用桩模型离线跑完整局游戏"""
+
+    def _run(self, config_path: str, game_id: str):
+        engine = GameEngine(config_path, game_id=game_id, seed=123)
+        try:
+            winner = engine.run_game()
+            return winner, engine.game_state["vote_history"], engine.game_state["eliminated_agents"]
+        finally:
+            engine.close()
+
+    def test_seeded_stub_game_is_reproducible(self):
+        """测试相同种子的桩模型对局结果完全一致"""
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = write_stub_config(directory)
+            first = self._run(config_path, "first")
+            second = self._run(config_path, "second")
+
+        self.assertIn(first[0], {"werewolves", "villagers", "draw"})
+        self.assertEqual(first, second)
+
+    def test_event_log_indexes_vote_sections(self):
+        """测试对局事件日志按天索引投票分段"""
+        with tempfile.TemporaryDirectory() as directory:
+            engine = GameEngine(write_stub_config(directory), game_id="events", seed=123)
+            try:
+                engine.run_game()
+            finally:
+                engine.close()
+            reader = EventLogReader(engine.logger.events_path)
+            votes = reader.read(day=1, section="vote")
+
+        self.assertTrue(any("day_vote_resolution" in str(record.get("content")) for record in votes))
+        self.assertFalse(any("Starting day" in str(record.get("content")) for record in votes))
+        self.assertEqual(reader.sections[-1].phase, "end")
+
+    def test_speculative_prefetch_keeps_results(self):
+        """测试开启发言推测预取后对局结果不变，并按天记录节省的耗时"""
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = self._run(write_stub_config(directory), "baseline")
+            config_path = write_stub_config(
+                directory, concurrency={"max_parallel_calls": 8, "speculative_prefetch": True}
+            )
+            engine = GameEngine(config_path, game_id="speculative", seed=123)
+            try:
+                winner = engine.run_game()
+                speculative = (winner, engine.game_state["vote_history"], engine.game_state["eliminated_agents"])
+                saved = engine.metrics.value_summary(["speculation_saved_ms.day"])
+            finally:
+                engine.close()
+
+        self.assertEqual(speculative, baseline)
+        self.assertGreater(saved["speculation_saved_ms.day"]["count"], 0)
+
+    def test_inprocess_and_stdio_transports_agree(self):
+        """测试进程内执行与 FastMCP 子进程执行得到相同的对局结果"""
+        with tempfile.TemporaryDirectory() as directory:
+            inprocess = self._run(write_stub_config(directory, tool_transport="inprocess"), "inprocess")
+            stdio = self._run(write_stub_config(directory, tool_transport="stdio"), "stdio")
+
+        self.assertEqual(inprocess, stdio)
+
+    def test_replay_cache_reproduces_recorded_game(self):
+        """测试 record 模式录制的对局可以在 replay 模式下离线复现"""
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = write_stub_config(directory)
+            config = load_config(config_path)
+            cache_path = os.path.join(directory, "responses.sqlite")
+            for index, adapter in enumerate(config["models"]["adapters"].values()):
+                adapter["seed"] = index
+            config["models"]["cache"] = {"mode": "record", "path": cache_path}
+            with open(config_path, "w", encoding="utf-8") as f:
+                yaml.safe_dump(config, f, allow_unicode=True)
+            recorded = self._run(config_path, "record")
+
+            # 回放时模型不可达：结果只能来自缓存
+            for adapter in config["models"]["adapters"].values():
+                adapter.update({"type": "http", "api_base": "http://127.0.0.1:9/v1", "timeout": 1})
+                adapter.pop("seed")
+            config["models"]["cache"] = {"mode": "replay", "path": cache_path}
+            with open(config_path, "w", encoding="utf-8") as f:
+                yaml.safe_dump(config, f, allow_unicode=True)
+            replayed = self._run(config_path, "replay")
+
+        self.assertEqual(recorded, replayed)
+
+
+if __name__ == '__main__':
+    unittest.main()
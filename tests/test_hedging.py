@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from async_runtime import EventLoopThread
+from hedging import HedgeBudget
+from metrics import PerfRecorder
+from models_adapter import ModelsAdapter
+
+
+TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "vote_day",
+        "parameters": {"properties": {"target": {"type": "integer", "enum": [2]}, "reason": {"type": "string"}}},
+    },
+}]
+
+
+class TestHedgedToolCalls(unittest.TestCase):
+    """测试慢请求的对冲"""
+
+    def _adapter(self, budget: HedgeBudget) -> ModelsAdapter:
+        adapter = ModelsAdapter({
+            "type": "stub",
+            "latency_ms": 400,
+            "hedge": {"percentile": 50, "min_samples": 1, "min_delay": 0.05},
+        })
+        adapter.latency.record(0.05)
+        adapter.hedge_budget = budget
+        adapter.hedge_backup = ModelsAdapter({"type": "stub"})
+        adapter.metrics = PerfRecorder()
+        return adapter
+
+    def test_backup_wins_when_primary_is_slow(self):
+        """测试主请求超过历史延迟后由备用适配器先返回"""
+        budget = HedgeBudget(5)
+        adapter = self._adapter(budget)
+
+        started = time.perf_counter()
+        result = adapter.call_tool("prompt", TOOLS)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(result["name"], "vote_day")
+        self.assertLess(elapsed, 0.3)
+        self.assertEqual((budget.sent, budget.won), (1, 1))
+        self.assertEqual(adapter.metrics.value_summary()["hedge_won.None"]["count"], 1)
+
+    def test_budget_caps_hedges(self):
+        """测试对冲次数用完后只等待主请求"""
+        budget = HedgeBudget(0)
+        adapter = self._adapter(budget)
+
+        started = time.perf_counter()
+        adapter.call_tool("prompt", TOOLS)
+
+        self.assertGreaterEqual(time.perf_counter() - started, 0.4)
+        self.assertEqual(budget.sent, 0)
+
+    def test_sync_hedge_runs_on_injected_loop(self):
+        """测试同步对冲调用在引擎注入的事件循环线程上执行，回调与统计在该线程上完成"""
+        budget = HedgeBudget(5)
+        adapter = self._adapter(budget)
+        loop = EventLoopThread(name="test-engine-loop")
+        adapter.event_loop_provider = lambda: loop
+        threads = []
+        call_with_retries = adapter._acall_tool_with_retries
+
+        async def record_thread(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return await call_with_retries(*args, **kwargs)
+
+        adapter._acall_tool_with_retries = record_thread
+        try:
+            result = adapter.call_tool("prompt", TOOLS)
+        finally:
+            loop.close()
+
+        self.assertEqual(result["name"], "vote_day")
+        self.assertEqual(threads, ["test-engine-loop"])
+        self.assertEqual(adapter.metrics.value_summary()["hedge_sent.None"]["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ledger import UsageLedger
+
+
+class TestUsageLedger(unittest.TestCase):
+    """测试模型用量账本的计费、汇总与导出"""
+
+    def setUp(self):
+        self.ledger = UsageLedger()
+        pricing = {"input": 2.0, "cached_input": 0.5, "output": 8.0}
+        for agent_id, intent, cached in [(1, "day_speech", 0), (1, "day_vote", 600), (2, "day_speech", 800)]:
+            self.ledger.record(
+                pricing=pricing,
+                game_id="g1",
+                agent_id=agent_id,
+                adapter="deepseek",
+                model="deepseek-chat",
+                intent=intent,
+                prompt_tokens=1000,
+                completion_tokens=100,
+                cached_tokens=cached,
+                estimated_prompt_tokens=950,
+                latency_s=1.5,
+            )
+        self.ledger.record(game_id="g1", agent_id=3, adapter="stub", model="stub", intent="day_vote",
+                           estimated_prompt_tokens=900, source="fallback")
+
+    def test_cost_uses_cached_price(self):
+        """测试命中缓存的 token 按缓存价格计费"""
+        costs = [entry.cost for entry in self.ledger.records]
+        self.assertAlmostEqual(costs[0], (1000 * 2.0 + 100 * 8.0) / 1e6)
+        self.assertAlmostEqual(costs[1], (400 * 2.0 + 600 * 0.5 + 100 * 8.0) / 1e6)
+        self.assertEqual(costs[3], 0.0)
+
+    def test_summary_groups_by_fields(self):
+        """测试按模型和意图分组汇总"""
+        by_model = self.ledger.summary(("model",))
+        self.assertEqual(by_model["deepseek-chat"]["calls"], 3)
+        self.assertEqual(by_model["deepseek-chat"]["prompt_tokens"], 3000)
+        self.assertAlmostEqual(by_model["deepseek-chat"]["cache_hit_rate"], 1400 / 3000, places=4)
+        self.assertEqual(by_model["stub"]["estimated_prompt_tokens"], 900)
+
+        by_intent = self.ledger.summary(("model", "intent"))
+        self.assertEqual(by_intent["deepseek-chat/day_speech"]["calls"], 2)
+        self.assertEqual(self.ledger.totals()["calls"], 4)
+
+    def test_jsonl_and_csv_export(self):
+        """测试导出 JSONL 后可以读回，CSV 每条记录一行"""
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl_path = os.path.join(directory, "usage.jsonl")
+            csv_path = os.path.join(directory, "usage.csv")
+            self.ledger.to_jsonl(jsonl_path)
+            self.ledger.to_csv(csv_path)
+
+            restored = UsageLedger.from_jsonl(jsonl_path)
+            with open(csv_path, encoding="utf-8") as f:
+                rows = f.read().strip().splitlines()
+
+        self.assertEqual(restored.summary(("agent_id",)), self.ledger.summary(("agent_id",)))
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(rows[0].startswith("game_id,agent_id,adapter,model,intent"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from logger import GameLogger
+
+
+class BlockedLogger(GameLogger):
+    """写线程在 release 之前不写出任何日志"""
+
+    def __init__(self, *args, **kwargs):
+        self.release = threading.Event()
+        self.written = []
+        super().__init__(*args, **kwargs)
+
+    def _write(self, log_entry):
+        self.release.wait(5)
+        self.written.append(log_entry)
+
+
+class TestQueuedGameLogger(unittest.TestCase):
+    """测试后台批量写出的游戏日志"""
+
+    def test_close_flushes_entries_in_order(self):
+        """测试关闭时写出全部日志且保持顺序"""
+        with tempfile.TemporaryDirectory() as directory:
+            game_logger = GameLogger(os.path.join(directory, "game_{game_id}.log"), game_id="order")
+            for index in range(500):
+                game_logger.log_system("day", {"index": index})
+            game_logger.close()
+            with open(game_logger.log_file_path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+
+        indexes = [json.loads(line.split(" - ", 1)[1])["content"]["index"] for line in lines]
+        self.assertEqual(indexes, list(range(500)))
+
+    def test_drop_policy_never_blocks(self):
+        """测试 drop 策略在缓冲区写满时丢弃新日志而不阻塞"""
+        with tempfile.TemporaryDirectory() as directory:
+            game_logger = BlockedLogger(os.path.join(directory, "game_{game_id}.log"), game_id="drop",
+                                        queue_size=4, backpressure="drop")
+            for index in range(50):
+                game_logger.log_system("day", {"index": index})
+            self.assertGreater(game_logger.dropped, 0)
+
+            game_logger.release.set()
+            game_logger.close()
+
+        self.assertEqual(len(game_logger.written) + game_logger.dropped, 50)
+        self.assertEqual(game_logger.written[0]["content"], {"index": 0})
+
+    def test_content_mutated_after_log_is_unchanged(self):
+        """测试记录后修改 content 不影响写出的日志行"""
+        with tempfile.TemporaryDirectory() as directory:
+            game_logger = BlockedLogger(os.path.join(directory, "game_{game_id}.log"), game_id="copy")
+            action = {"type": "witch_save", "target": 3}
+            game_logger.log("tool", 5, "tool_call", {"execution": {"action": action}})
+            action["actor"] = 5
+            game_logger.release.set()
+            game_logger.close()
+
+        self.assertEqual(game_logger.written[0]["content"], {"execution": {"action": {"type": "witch_save", "target": 3}}})
+
+    def test_block_policy_survives_dead_writer(self):
+        """测试写线程退出后 block 策略不会卡死，日志改为同步写出"""
+        with tempfile.TemporaryDirectory() as directory:
+            game_logger = BlockedLogger(os.path.join(directory, "game_{game_id}.log"), game_id="dead",
+                                        queue_size=1)
+            game_logger.release.set()
+            # 直接放入结束标记让写线程退出，模拟写线程异常死亡
+            game_logger._queue.put(None)
+            game_logger._writer.join(5)
+
+            def log_and_close():
+                for index in range(3):
+                    game_logger.log_system("day", {"index": index})
+                game_logger.close()
+
+            worker = threading.Thread(target=log_and_close, daemon=True)
+            worker.start()
+            worker.join(10)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(sorted(entry["content"]["index"] for entry in game_logger.written), [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
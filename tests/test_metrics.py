@@ -0,0 +1,39 @@
+import os
+import sys
+import unittest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metrics import PerfRecorder, percentile
+
+
+class TestPerfRecorder(unittest.TestCase):
+    """测试耗时统计"""
+
+    def test_percentile_interpolates(self):
+        """测试百分位线性插值"""
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.assertEqual(percentile(values, 50), 3.0)
+        self.assertAlmostEqual(percentile(values, 95), 4.8)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_summary_and_merge(self):
+        """测试汇总结果与合并多个记录器"""
+        first = PerfRecorder()
+        second = PerfRecorder()
+        for seconds in (0.001, 0.002, 0.003):
+            first.record("model_call.day_vote", seconds)
+        second.record("model_call.day_vote", 0.004)
+        with second.timer("logger"):
+            pass
+
+        first.merge(second)
+        summary = first.summary()
+        self.assertEqual(summary["model_call.day_vote"]["count"], 4)
+        self.assertAlmostEqual(summary["model_call.day_vote"]["total_ms"], 10.0)
+        self.assertEqual(summary["logger"]["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,15 @@
+import asyncio
 import unittest
 import os
 import sys
 
+import requests
+
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from models_adapter import ModelsAdapter
+from models_adapter import CLIENT_POOL, ModelsAdapter, aclose_http_clients
+from retry import PhaseBudget
 from utils import load_config
 
 
@@ -131,6 +135,101 @@ class TestModelsAdapter(unittest.TestCase):
             qwen_adapter = ModelsAdapter(qwen_config)
             self.assertTrue(hasattr(qwen_adapter, '_call_bailian_model'))
 
+    def test_http_clients_are_pooled_per_api_base(self):
+        """测试相同api_base的适配器复用同一个HTTP客户端"""
+        config = {
+            "type": "bailian",
+            "model": "qwen-plus",
+            "api_key": "test-key",
+            "api_base": "https://dashscope.aliyuncs.com/compatible-mode/v1",
+        }
+        first = ModelsAdapter(config)
+        second = ModelsAdapter(dict(config, model="glm-4.6"))
+        self.assertIs(first._session(), second._session())
+
+        other = ModelsAdapter(dict(config, api_base="https://api.deepseek.com"))
+        self.assertIsNot(first._session(), other._session())
+
+        if CLIENT_POOL.httpx_client(config) is not None:
+            self.assertIs(CLIENT_POOL.httpx_client(config), CLIENT_POOL.httpx_client(dict(config)))
+
+    def test_acall_tool_falls_back_when_provider_unreachable(self):
+        """测试异步工具调用失败时返回合法兜底工具"""
+        adapter = ModelsAdapter({
+            "type": "http",
+            "model": "deepseek-chat",
+            "api_key": "test-key",
+            "api_base": "http://127.0.0.1:9/v1",
+            "timeout": 2,
+        })
+        tools = [{
+            "type": "function",
+            "function": {
+                "name": "speak_public",
+                "parameters": {"type": "object", "properties": {"speech": {"type": "string"}}},
+            },
+        }]
+
+        async def run():
+            try:
+                return await adapter.acall_tool("prompt", tools)
+            finally:
+                await aclose_http_clients()
+
+        result = asyncio.run(run())
+        self.assertEqual(result["name"], "speak_public")
+        self.assertIn("fallback_reason", result)
+
+
+
+class FlakyAdapter(ModelsAdapter):
+    """前几次调用抛出指定异常的适配器"""
+
+    def __init__(self, errors, **retry_config):
+        super().__init__({"type": "openai", "model": "test", "retry": {"base_delay": 0.01, **retry_config}})
+        self.errors = list(errors)
+        self.attempts = 0
+
+    def _dispatch_tool(self, prompt_text, tools, system_prompt, timeout, on_partial=None):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"name": "vote_day", "arguments": {"target": 2}}
+
+
+class TestToolCallRetry(unittest.TestCase):
+    """测试工具调用的重试策略"""
+
+    tools = [{"type": "function", "function": {"name": "abstain", "parameters": {"properties": {}}}}]
+
+    def test_transient_errors_are_retried(self):
+        """测试连接错误重试后成功"""
+        adapter = FlakyAdapter([requests.ConnectionError("reset"), requests.Timeout("slow")])
+        result = adapter.call_tool("prompt", self.tools)
+
+        self.assertEqual(result["name"], "vote_day")
+        self.assertEqual(adapter.attempts, 3)
+
+    def test_non_retryable_error_falls_back_immediately(self):
+        """测试非可重试错误直接兜底"""
+        adapter = FlakyAdapter([ValueError("bad response")])
+        result = adapter.call_tool("prompt", self.tools)
+
+        self.assertEqual(result["name"], "abstain")
+        self.assertIn("fallback_reason", result)
+        self.assertEqual(adapter.attempts, 1)
+
+    def test_expired_phase_budget_skips_call(self):
+        """测试阶段时间预算用完后不再发起请求"""
+        adapter = FlakyAdapter([])
+        adapter.phase_budget = PhaseBudget()
+        adapter.phase_budget.start("day", 1e-9)
+
+        result = adapter.call_tool("prompt", self.tools)
+
+        self.assertIn("fallback_reason", result)
+        self.assertEqual(adapter.attempts, 0)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
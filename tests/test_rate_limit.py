@@ -0,0 +1,86 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from rate_limit import RateLimiter, RateLimiterRegistry
+
+
+class TestRateLimiter(unittest.TestCase):
+    """测试按适配器限流"""
+
+    def test_max_concurrency_bounds_async_calls(self):
+        """测试异步调用的在途数量不超过 max_concurrency"""
+        limiter = RateLimiter("test", max_concurrency=2)
+        in_flight = []
+        peak = []
+
+        async def call():
+            async with limiter.aacquire():
+                in_flight.append(1)
+                peak.append(len(in_flight))
+                await asyncio.sleep(0.05)
+                in_flight.pop()
+
+        async def main():
+            await asyncio.gather(*(call() for _ in range(6)))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+
+        self.assertEqual(max(peak), 2)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.14)
+        self.assertEqual(len(limiter.metrics.samples("rate_limit_wait.test")), 6)
+
+    def test_sync_and_async_share_slots(self):
+        """测试同步线程与事件循环上的调用共用名额"""
+        limiter = RateLimiter("shared", max_concurrency=1)
+        order = []
+
+        def hold():
+            with limiter.acquire():
+                order.append("sync-start")
+                time.sleep(0.1)
+                order.append("sync-end")
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        time.sleep(0.02)
+
+        async def call():
+            async with limiter.aacquire():
+                order.append("async")
+
+        asyncio.run(call())
+        thread.join()
+
+        self.assertEqual(order, ["sync-start", "sync-end", "async"])
+
+    def test_rpm_bucket_delays_burst(self):
+        """测试超出每分钟请求数后按补充速率等待"""
+        limiter = RateLimiter("rpm", rpm=600)
+        for _ in range(600):
+            limiter._reserve(0)
+
+        started = time.perf_counter()
+        with limiter.acquire() as waited:
+            pass
+
+        self.assertGreaterEqual(waited, 0.09)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.09)
+
+    def test_registry_skips_unlimited_adapters(self):
+        """测试未配置限流的适配器不创建限流器，同名适配器共享限流器"""
+        registry = RateLimiterRegistry()
+
+        self.assertIsNone(registry.get("deepseek", {"type": "openai"}))
+        self.assertIs(registry.get("qwen", {"rpm": 60}), registry.get("qwen", {"rpm": 60}))
+
+
+if __name__ == '__main__':
+    unittest.main()
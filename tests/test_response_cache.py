@@ -0,0 +1,103 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models_adapter import ModelsAdapter
+from response_cache import ResponseCache, open_response_cache, response_cache_key
+
+
+class TestResponseCache(unittest.TestCase):
+    """测试模型响应缓存"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "responses.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_key_depends_on_request_content(self):
+        """测试键由模型、消息、工具和温度共同决定"""
+        messages = [{"role": "user", "content": "投票"}]
+        key = response_cache_key("m", messages, [], 0.7)
+
+        self.assertEqual(key, response_cache_key("m", [dict(messages[0])], [], 0.7))
+        self.assertNotEqual(key, response_cache_key("m", messages, [], 0.2))
+        self.assertNotEqual(key, response_cache_key("other", messages, [], 0.7))
+
+    def test_evicts_least_recently_used(self):
+        """测试超出容量时淘汰最久未访问的条目"""
+        value = {"name": "speak_public", "arguments": {"speech": "x" * 400}}
+        cache = ResponseCache(self.path, mode="read-through", max_size_mb=1000 / (1024 * 1024))
+        try:
+            cache.put("a", value)
+            time.sleep(0.01)
+            cache.put("b", value)
+            time.sleep(0.01)
+            cache.get("a")
+            time.sleep(0.01)
+            cache.put("c", value)
+
+            self.assertIsNotNone(cache.get("a"))
+            self.assertIsNone(cache.get("b"))
+            self.assertIsNotNone(cache.get("c"))
+        finally:
+            cache.close()
+
+    def test_running_total_matches_stored_sizes(self):
+        """测试覆盖写入和淘汰后累计大小与表中实际大小一致，命中的访问时间在关闭时写回"""
+        cache = ResponseCache(self.path, mode="read-through", max_size_mb=1000 / (1024 * 1024))
+        try:
+            cache.put("a", {"speech": "x" * 300})
+            cache.put("a", {"speech": "x" * 100})
+            for key in "bcdef":
+                cache.put(key, {"speech": "y" * 300})
+            cache.get("f")
+            stored = cache._connection().execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self.assertEqual(cache._total, stored)
+            self.assertLessEqual(cache._total, cache.max_bytes)
+            self.assertEqual(list(cache._pending_access), ["f"])
+        finally:
+            cache.close()
+        self.assertEqual(cache._pending_access, {})
+
+    def test_off_mode_disables_cache(self):
+        """测试未配置或 off（含 YAML 解析出的 False）时不启用缓存"""
+        self.assertIsNone(open_response_cache(None))
+        self.assertIsNone(open_response_cache({"mode": False}))
+        self.assertIsNone(open_response_cache({"mode": "off"}))
+
+    def test_occurrence_keys_are_unique_across_threads(self):
+        """测试多线程并发生成相同请求的键时出现次序不重复，重置后从 0 开始"""
+        cache = ResponseCache(self.path, mode="record")
+        adapter = ModelsAdapter({"type": "stub", "model": "stub"}, name="stub")
+        adapter.response_cache = cache
+        keys = []
+
+        def make_keys():
+            for _ in range(200):
+                keys.append(adapter._response_cache_key("投票", []))
+
+        try:
+            threads = [threading.Thread(target=make_keys) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            adapter.reset_cache_occurrences()
+            first_key = adapter._response_cache_key("投票", [])
+        finally:
+            cache.close()
+
+        self.assertEqual(len(set(keys)), 800)
+        self.assertTrue(first_key.endswith(":0"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metrics import PerfRecorder
+from models_adapter import ModelsAdapter, aclose_http_clients, cached_prompt_tokens
+from tool_stream import ToolCallStreamParser, partial_json_string
+
+
+SPEECH = '我是预言家，昨晚查验 3 号是"狼人"。'
+ARGUMENTS = json.dumps({"speech": SPEECH}, ensure_ascii=True)
+USAGE = {"prompt_tokens": 120, "completion_tokens": 30, "prompt_cache_hit_tokens": 64}
+TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "speak_public",
+        "parameters": {"type": "object", "properties": {"speech": {"type": "string"}}},
+    },
+}]
+
+
+def sse_chunks(arguments: str, size: int = 7):
+    """把工具参数切成若干段，拼成 OpenAI 兼容的 SSE 响应行"""
+    first = {"choices": [{"index": 0, "delta": {"tool_calls": [
+        {"index": 0, "id": "call_0", "type": "function", "function": {"name": "speak_public", "arguments": ""}},
+    ]}}]}
+    lines = [f"data: {json.dumps(first)}"]
+    for start in range(0, len(arguments), size):
+        delta = {"tool_calls": [{"index": 0, "function": {"arguments": arguments[start:start + size]}}]}
+        lines.append(f"data: {json.dumps({'choices': [{'index': 0, 'delta': delta}]})}")
+    lines.append(f"data: {json.dumps({'choices': [], 'usage': USAGE})}")
+    lines.append("data: [DONE]")
+    return lines
+
+
+class SSEHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for line in sse_chunks(ARGUMENTS):
+            self.wfile.write(f"{line}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestToolCallStreamParser(unittest.TestCase):
+    """测试流式工具参数的增量解析"""
+
+    def test_partial_string_decodes_escapes(self):
+        """测试未完整的 JSON 中逐步读出 speech 前缀"""
+        self.assertIsNone(partial_json_string('{"spe', "speech"))
+        self.assertEqual(partial_json_string('{"speech": "a\\nb', "speech"), "a\nb")
+        self.assertEqual(partial_json_string('{"speech": "\\u4f60\\u59', "speech"), "你")
+        self.assertEqual(partial_json_string(ARGUMENTS, "speech"), SPEECH)
+
+    def test_parser_emits_growing_prefixes(self):
+        """测试每段增量只在文本变长时回调，最终消息与完整参数一致"""
+        partials = []
+        parser = ToolCallStreamParser(partials.append)
+        parser.feed_sse_lines(sse_chunks(ARGUMENTS, size=3))
+
+        self.assertEqual(partials[-1], SPEECH)
+        self.assertEqual(len(partials), len(set(partials)))
+        self.assertTrue(all(SPEECH.startswith(text) for text in partials))
+        tool_call = parser.message()["tool_calls"][0]["function"]
+        self.assertEqual(tool_call["name"], "speak_public")
+        self.assertEqual(json.loads(tool_call["arguments"]), {"speech": SPEECH})
+
+
+class TestStreamingAdapter(unittest.TestCase):
+    """测试适配器通过 SSE 流式接收工具调用"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SSEHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.config = {
+            "type": "http",
+            "model": "test",
+            "api_key": "test-key",
+            "api_base": f"http://127.0.0.1:{self.server.server_port}/v1",
+            "stream": True,
+            "timeout": 5,
+        }
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_sync_and_async_streams_parse_final_call(self):
+        """测试同步与异步流式调用都推送发言前缀并返回完整工具调用"""
+        partials = []
+        adapter = ModelsAdapter(self.config, name="sse")
+        adapter.metrics = PerfRecorder()
+        result = adapter.call_tool("prompt", TOOLS, on_partial=partials.append)
+
+        async_partials = []
+
+        async def run():
+            try:
+                return await ModelsAdapter(self.config).acall_tool("prompt", TOOLS, on_partial=async_partials.append)
+            finally:
+                await aclose_http_clients()
+
+        async_result = asyncio.run(run())
+
+        expected = {"name": "speak_public", "arguments": {"speech": SPEECH}}
+        self.assertEqual({"name": result["name"], "arguments": result["arguments"]}, expected)
+        self.assertEqual({"name": async_result["name"], "arguments": async_result["arguments"]}, expected)
+        self.assertGreater(len(partials), 1)
+        self.assertEqual(partials[-1], SPEECH)
+        self.assertEqual(async_partials[-1], SPEECH)
+        self.assertTrue(all(request["stream"] for request in self.server.requests))
+        usage = adapter.metrics.value_summary()
+        self.assertEqual(usage["usage_prompt_tokens.sse"]["total"], 120)
+        self.assertEqual(usage["usage_cached_tokens.sse"]["total"], 64)
+
+    def test_cached_tokens_across_providers(self):
+        """测试兼容各服务商报告缓存命中 token 的字段"""
+        self.assertEqual(cached_prompt_tokens({"prompt_tokens_details": {"cached_tokens": 1024}}), 1024)
+        self.assertEqual(cached_prompt_tokens({"prompt_cache_hit_tokens": 64, "prompt_cache_miss_tokens": 10}), 64)
+        self.assertEqual(cached_prompt_tokens({"prompt_tokens": 10}), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()